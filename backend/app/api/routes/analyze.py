@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException, Depends, Request
 from ...models.schemas import AnalysisRequest, AnalysisResponse
 from ...services.openai_service import OpenAIService
+from ...services.llm_gateway import LLMGatewayBusy
 from ...core.config import settings
 import logging
 from typing import Optional
@@ -69,6 +70,12 @@ async def analyze_text(
         logger.info(f"Analysis completed successfully for URL: {body.url}")
         return result
         
+    except LLMGatewayBusy as busy:
+        logger.warning(f"Analysis rejected by the LLM gateway: {busy}")
+        raise HTTPException(
+            status_code=503,
+            detail="The analysis service is busy, please try again shortly"
+        )
     except Exception as e:
         logger.error(f"Error analyzing text: {str(e)}", exc_info=True)
         raise HTTPException(
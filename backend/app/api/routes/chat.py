@@ -1,9 +1,12 @@
 from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
 from ...models.schemas import ChatRequest, ChatResponse
 from ...services.openai_service import OpenAIService
+from ...services.llm_gateway import LLMGatewayBusy
 from ...core.config import settings
+import json
 import logging
-from typing import List
+from typing import AsyncIterator
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 
@@ -70,6 +73,12 @@ async def chat(
             
             logger.info("Chat request processed successfully")
             return response
+        except LLMGatewayBusy as busy:
+            logger.warning(f"Chat request rejected by the LLM gateway: {busy}")
+            raise HTTPException(
+                status_code=503,
+                detail="The assistant is busy, please try again shortly"
+            )
         except Exception as e:
             logger.error(f"Error in chat processing: {str(e)}", exc_info=True)
             raise HTTPException(
@@ -84,4 +93,103 @@ async def chat(
         raise HTTPException(
             status_code=500,
             detail=f"An unexpected error occurred: {str(e)}"
-        ) 
\ No newline at end of file
+        ) 
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format a Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post(
+    "/chat/stream",
+    tags=["chat"],
+    summary="Chat with the AI assistant (streaming)",
+    description="Same as /chat, but streams the answer as Server-Sent Events: `token` events while the answer is generated and a final `done` event with the complete ChatMessage. Answers 503 before streaming when the assistant is busy; later failures are sent as an `error` event with `detail` and `status`."
+)
+@limiter.limit(f"{settings.RATE_LIMIT_PER_MINUTE}/minute")
+async def chat_stream(
+    request: Request,
+    body: ChatRequest,
+    limiter: Limiter = Depends(lambda: limiter)
+) -> StreamingResponse:
+    """
+    Process a chat request and stream the AI's response as Server-Sent Events.
+    
+    Args:
+        request: The HTTP request object (required for slowapi)
+        body: The chat request containing the conversation messages
+        limiter: Rate limiter instance
+        
+    Returns:
+        StreamingResponse: text/event-stream with `token`, `done` and `error` events
+        
+    Raises:
+        HTTPException: If the request is invalid, the OpenAI API key is missing (503)
+            or the LLM gateway is busy (503)
+    """
+    logger.info("Processing streaming chat request")
+
+    # Validate OpenAI API key
+    if not settings.OPENAI_API_KEY:
+        raise HTTPException(
+            status_code=503,
+            detail="OpenAI API key is not configured"
+        )
+
+    # Validate messages
+    if not body.messages:
+        raise HTTPException(
+            status_code=400,
+            detail="No messages provided in the request"
+        )
+
+    events = openai_service.chat_stream(
+        messages=body.messages,
+        article_text=body.article_text,
+        analysis_result=body.analysis_result,
+        use_web_search=body.use_web_search
+    )
+
+    def to_sse(event: dict) -> str:
+        if event["type"] == "token":
+            return _sse_event("token", {"content": event["content"]})
+        return _sse_event("done", ChatResponse(message=event["message"]).dict())
+
+    # Wait for the first event before sending headers, so a busy gateway is a plain 503
+    try:
+        first_event = await events.__anext__()
+        first_error = None
+    except StopAsyncIteration:
+        first_event, first_error = None, None
+    except LLMGatewayBusy as busy:
+        logger.warning(f"Streaming chat request rejected by the LLM gateway: {busy}")
+        raise HTTPException(
+            status_code=503,
+            detail="The assistant is busy, please try again shortly"
+        )
+    except Exception as e:
+        first_event, first_error = None, e
+
+    async def event_stream() -> AsyncIterator[str]:
+        try:
+            if first_error is not None:
+                raise first_error
+            if first_event is not None:
+                yield to_sse(first_event)
+            async for event in events:
+                yield to_sse(event)
+            logger.info("Streaming chat request processed successfully")
+        except LLMGatewayBusy as busy:
+            # Headers are already sent, so errors are reported in-band
+            logger.warning(f"Streaming chat request rejected by the LLM gateway: {busy}")
+            yield _sse_event("error", {"detail": "The assistant is busy, please try again shortly", "status": 503})
+        except Exception as e:
+            logger.error(f"Error in streaming chat processing: {str(e)}", exc_info=True)
+            yield _sse_event("error", {"detail": f"Error processing chat request: {str(e)}", "status": 500})
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -0,0 +1,43 @@
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse, Response
+from typing import Any, Dict, List
+from ...utils.profiler import profile_store, is_admin_token, render_flamegraph
+from ...core.config import settings
+
+def require_admin(x_profile_token: str = Header("")) -> None:
+    """Admin routes answer 404 while profiling is disabled and 403 without the token."""
+    if not settings.PROFILING_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not is_admin_token(x_profile_token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+router = APIRouter(
+    prefix="/admin/profiles",
+    tags=["admin"],
+    dependencies=[Depends(require_admin)],
+    include_in_schema=False
+)
+
+@router.get("")
+async def list_profiles() -> List[Dict[str, Any]]:
+    """Recent request profiles (newest first) with their stage timings."""
+    return profile_store.list()
+
+@router.get("/{profile_id}")
+async def get_profile(profile_id: str, format: str = "svg") -> Response:
+    """
+    Flame graph of a profiled request.
+
+    Args:
+        profile_id: Id from the X-Profile-Id response header or the profile list
+        format: 'svg' for the flame graph, 'folded' for collapsed stacks (flamegraph.pl, speedscope)
+    """
+    profile = profile_store.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "folded":
+        return PlainTextResponse(profile.folded())
+    if format != "svg":
+        raise HTTPException(status_code=400, detail="format must be 'svg' or 'folded'")
+    title = f"{profile.method} {profile.path} - {profile.duration_ms} ms"
+    return Response(render_flamegraph(profile.stacks, title), media_type="image/svg+xml")
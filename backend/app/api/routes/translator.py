@@ -1,13 +1,15 @@
 from fastapi import APIRouter, HTTPException
 from app.models.schemas import TranslationRequest, TranslationResponse
-from app.prompts.translation_prompts import get_translation_prompt
 from app.services.openai_service import OpenAIService
-from elevenlabs.client import ElevenLabs
+from app.services.translation_service import TranslationService
+from app.services.llm_gateway import llm_gateway, LLMGatewayBusy, Priority
+from elevenlabs.client import AsyncElevenLabs, ElevenLabs
 import os, uuid, json, logging
 from datetime import datetime
 from typing import Dict, Optional
 from app.services.storage_service import StorageService
 from app.services.cache_manager import CacheManager
+from app.core.config import settings
 
 router = APIRouter(
     prefix="/translator",
@@ -16,7 +18,19 @@ router = APIRouter(
 )
 
 openai_service = OpenAIService()
-elevenlabs_client = ElevenLabs(api_key=os.getenv("ELEVENLABS_API_KEY"))
+translation_service = TranslationService(openai_service)
+# The SDK adds the API version to its paths, so it takes the host part of ELEVENLABS_BASE_URL
+elevenlabs_client = ElevenLabs(
+    api_key=os.getenv("ELEVENLABS_API_KEY"),
+    base_url=settings.ELEVENLABS_BASE_URL.rstrip("/").removesuffix("/v1")
+)
+# Speech synthesis uses the async client: a timed-out or cancelled call closes its request
+# instead of leaving a thread running outside the gateway's concurrency limit
+async_elevenlabs_client = AsyncElevenLabs(
+    api_key=os.getenv("ELEVENLABS_API_KEY"),
+    base_url=settings.ELEVENLABS_BASE_URL.rstrip("/").removesuffix("/v1"),
+    timeout=settings.LLM_TIMEOUT_SECONDS
+)
 logger = logging.getLogger(__name__)
 storage_service = StorageService()
 cache_manager = CacheManager(storage_service)
@@ -80,21 +94,13 @@ async def translate_text(request: TranslationRequest):
     Translate text from source language to target language using the specified translation mode.
     """
     try:
-        # Get translation from GPT using the modularized prompt
-        response = await openai_service.client.chat.completions.create(
-            model=openai_service.model,
-            messages=[
-                {"role": "system", "content": "You are a professional translator."},
-                {"role": "user", "content": get_translation_prompt(
-                    style=request.translation_mode,
-                    target_lang=request.target_language,
-                    text=request.text
-                )}
-            ],
-            temperature=0.3,
-            max_tokens=1000
+        # Get translation from GPT (long texts are translated in parallel chunks)
+        translated_text = await translation_service.translate(
+            text=request.text,
+            style=request.translation_mode,
+            target_lang=request.target_language,
+            long_document=request.long_document
         )
-        translated_text = response.choices[0].message.content.strip()
         logger.info(f"Text translated successfully from: {request.source_language} to: {request.target_language}")
         # Save input and result to database
         storage_service.save_analysis(
@@ -113,6 +119,9 @@ async def translate_text(request: TranslationRequest):
             target_language=request.target_language,
             translation_mode=request.translation_mode
         )
+    except LLMGatewayBusy as busy:
+        logger.warning(f"Translation rejected by the LLM gateway: {busy}")
+        raise HTTPException(status_code=503, detail="The translation service is busy. Please try again shortly.")
     except ValueError as ve:
         logger.error(f"Invalid translation style: {ve}")
         raise HTTPException(status_code=400, detail=str(ve))
@@ -122,58 +131,48 @@ async def translate_text(request: TranslationRequest):
 
 @router.post("/translate-voice")
 async def translate_and_generate_voice(request: TranslationRequest):
-    logger.info(f"Received request: {request}")
+    logger.info(f"Received translate-voice request: {len(request.text)} chars, {request.source_language} -> {request.target_language}, mode {request.translation_mode}")
     try:
         # Clean up old files periodically
         storage_service.cleanup_old_files(max_age_hours=24)
-        
-        # 1. Generate prompt and log
-        prompt = get_translation_prompt(
+
+        # 1. Translation with OpenAI (long texts are translated in parallel chunks)
+        translated_text = await translation_service.translate(
+            text=request.text,
             style=request.translation_mode,
             target_lang=request.target_language,
-            text=request.text
-        )
-        logger.info(f"Generated prompt: {prompt}")
-
-        # 2. Translation with OpenAI
-        response = await openai_service.client.chat.completions.create(
-            model=openai_service.model,
-            messages=[
-                {"role": "system", "content": "You are a professional translator."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3,
-            max_tokens=1000
+            long_document=request.long_document
         )
-        translated_text = response.choices[0].message.content.strip()
-        logger.info(f"Translated text: {translated_text}")
+        logger.info(f"Translated text: {len(translated_text)} chars")
 
-        # 3. Voice selection
+        # 2. Voice selection
         voice_id = get_voice_for_language(request.target_language)
         logger.info(f"Selected voice_id: {voice_id} for language: {request.target_language}")
 
-        # 4. Audio generation
-        audio_gen = elevenlabs_client.text_to_speech.convert(
-            text=translated_text,
-            voice_id=voice_id,
-            model_id="eleven_multilingual_v2",
-            output_format="mp3_44100_128"
+        # 3. Audio generation (through the LLM gateway, which does the retries)
+        async def synthesize() -> bytes:
+            audio_gen = async_elevenlabs_client.text_to_speech.convert(
+                text=translated_text,
+                voice_id=voice_id,
+                model_id="eleven_multilingual_v2",
+                output_format="mp3_44100_128",
+                request_options={"max_retries": 0}
+            )
+            return b"".join([chunk async for chunk in audio_gen])
+
+        audio_data = await llm_gateway.call(
+            "elevenlabs", "eleven_multilingual_v2", "tts", Priority.STANDARD, synthesize
         )
 
-        # 5. Save audio file using storage service
+        # 4. Save audio file using storage service
         uid = str(uuid.uuid4())
         audio_filename = f"voice_{uid}.mp3"
         
-        # Collect audio data
-        audio_data = b""
-        for chunk in audio_gen:
-            audio_data += chunk
-        
         # Save audio file
         audio_path = storage_service.save_audio_file(audio_data, audio_filename)
         logger.info(f"Audio file saved: {audio_path}")
 
-        # 6. Save metadata
+        # 5. Save metadata
         metadata = {
             "original_text": request.text,
             "translated_text": translated_text,
@@ -187,7 +186,7 @@ async def translate_and_generate_voice(request: TranslationRequest):
         storage_service.save_metadata(metadata, metadata_filename)
         logger.info(f"Metadata saved for id: {uid}")
 
-        # 7. Save to database
+        # 6. Save to database
         storage_service.save_analysis(
             tipo_analisis="traduccion_voz",
             input_original=request.text,
@@ -207,6 +206,9 @@ async def translate_and_generate_voice(request: TranslationRequest):
             "id": uid
         }
 
+    except LLMGatewayBusy as busy:
+        logger.warning(f"Translate-voice rejected by the LLM gateway: {busy}")
+        raise HTTPException(status_code=503, detail="Translation or voice generation is busy. Please try again shortly.")
     except Exception as e:
         logger.error(f"Error in translate-and-generate-voice: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Translation or voice generation failed")
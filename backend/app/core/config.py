@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
-from typing import List
+from typing import Dict, List
 import logging
 
 # Configure logging
@@ -25,11 +25,46 @@ class Settings(BaseSettings):
 
     # OpenAI Settings
     OPENAI_API_KEY: str
+    OPENAI_BASE_URL: str = ""  # Empty uses the official API (set for proxies and local stand-ins)
     OPENAI_MODEL: str = "gpt-4o"
+    OPENAI_SUMMARY_MODEL: str = "gpt-4o-mini"
+
+    # Chat History Settings
+    CHAT_HISTORY_KEEP_TURNS: int = 4
+    CHAT_MAX_PROMPT_TOKENS: int = 12000
+    CHAT_MAX_ARTICLE_TOKENS: int = 6000
+    CHAT_SUMMARY_MAX_TOKENS: int = 300
+    CHAT_SUMMARY_CACHE_SIZE: int = 1024
+    CHAT_SUMMARY_CACHE_TTL_SECONDS: int = 3600
+    CHAT_CONTEXT_CACHE_SIZE: int = 256
+    CHAT_CONTEXT_CACHE_TTL_SECONDS: int = 3600
+    CHAT_ANSWER_CACHE_SIZE: int = 1024
+    CHAT_ANSWER_CACHE_TTL_SECONDS: int = 1800
 
     # Serper API Settings
     SERPER_API_KEY: str
     SERPER_API_URL: str = "https://google.serper.dev/search"
+    SERPER_GEO_LOCATION: str = "us"
+    SERPER_CONNECT_TIMEOUT: float = 3.0
+    SERPER_READ_TIMEOUT: float = 8.0
+    SERPER_MAX_CONCURRENCY: int = 10
+    SERPER_BATCH_SIZE: int = 10
+
+    # Fact-check Settings (claim-level web search in chat)
+    FACT_CHECK_MAX_CLAIMS: int = 4
+    FACT_CHECK_MAX_SOURCES: int = 10
+    FACT_CHECK_EVIDENCE_MAX_CHARS: int = 6000
+
+    # Local BM25 index over past analyses and search snippets
+    LOCAL_INDEX_ENABLED: bool = True
+    LOCAL_INDEX_MAX_DOCUMENTS: int = 20000
+    LOCAL_INDEX_MIN_RESULTS: int = 3
+    LOCAL_INDEX_MIN_COVERAGE: float = 0.7
+
+    # Search Cache Settings (SEARCH_CACHE_DIR enables the on-disk tier)
+    SEARCH_CACHE_TTL_SECONDS: int = 1800
+    SEARCH_CACHE_MAX_ENTRIES: int = 2048
+    SEARCH_CACHE_DIR: str = ""
 
     # ElevenLabs Settings
     ELEVENLABS_API_KEY: str
@@ -41,6 +76,102 @@ class Settings(BaseSettings):
     SUPABASE_URL: str
     SUPABASE_KEY: str
 
+    # Local storage for saved analyses and generated audio (empty uses app/data/temp)
+    STORAGE_DIR: str = ""
+
+    # Translation Settings (long-document mode)
+    TRANSLATION_CHUNK_CHARS: int = 3000
+    TRANSLATION_CHUNK_OVERLAP_CHARS: int = 300
+    TRANSLATION_CHUNK_MAX_TOKENS: int = 2000
+    TRANSLATION_MAX_CONCURRENCY: int = 4
+
+    # Shared HTTP client pool
+    HTTP_POOL_SIZE: int = 100
+    HTTP_POOL_PER_HOST: int = 20
+    HTTP_KEEPALIVE_SECONDS: float = 30.0
+
+    # Image Analysis Settings (IMAGE_WORKERS=0 uses one worker per CPU core)
+    IMAGE_WORKERS: int = 0
+    IMAGE_MAX_QUEUE: int = 8
+    IMAGE_MAX_UPLOAD_BYTES: int = 25 * 1024 * 1024
+    UPLOAD_CHUNK_BYTES: int = 1024 * 1024
+    IMAGE_MAX_BATCH: int = 20
+    IMAGE_VISION_CONCURRENCY: int = 4
+    # Local forensic triage; a generator signature at or above the confidence threshold skips the vision model
+    IMAGE_TRIAGE_ENABLED: bool = True
+    IMAGE_TRIAGE_SKIP_CONFIDENCE: float = 0.9
+    IMAGE_HASH_INDEX_SIZE: int = 5000
+    IMAGE_HASH_MAX_DISTANCE: int = 6
+    IMAGE_HASH_TTL_SECONDS: int = 86400
+    # Encoding of the images sent to the vision model: JPEG, WEBP or PNG, with a per-image byte budget
+    IMAGE_ENCODE_FORMAT: str = "JPEG"
+    IMAGE_TARGET_BYTES: int = 250000
+    IMAGE_ENCODE_MAX_QUALITY: int = 85
+    IMAGE_ENCODE_MIN_QUALITY: int = 40
+
+    # Voice streaming (one ffmpeg process per voice session)
+    FFMPEG_PATH: str = "ffmpeg"
+    VOICE_PCM_READ_BYTES: int = 3200  # 100 ms of 16 kHz 16-bit mono
+    VOICE_SIGNED_URL_POOL_SIZE: int = 2
+    VOICE_SIGNED_URL_MAX_AGE_SECONDS: float = 600.0
+    # Relay queue high-water marks; beyond them the oldest queued audio is dropped
+    VOICE_UPSTREAM_MAX_ITEMS: int = 50
+    VOICE_UPSTREAM_MAX_BYTES: int = 320000  # 10 s of 16 kHz 16-bit PCM
+    VOICE_DOWNSTREAM_MAX_ITEMS: int = 200
+    VOICE_DOWNSTREAM_MAX_BYTES: int = 4 * 1024 * 1024
+    VOICE_COALESCE_MAX_BYTES: int = 32000  # merged upstream PCM frames up to 1 s
+    # Voice admission control (per worker process)
+    VOICE_MAX_SESSIONS: int = 20
+    VOICE_MAX_QUEUED: int = 10
+    VOICE_QUEUE_TIMEOUT_SECONDS: float = 30.0
+    VOICE_IDLE_TIMEOUT_SECONDS: float = 60.0
+    # GET /api/voice/sessions needs "Authorization: Bearer <token>" (empty token disables the route)
+    VOICE_STATS_TOKEN: str = ""
+
+    # LLM gateway (per worker process): every OpenAI and ElevenLabs TTS call goes through it
+    LLM_MAX_CONCURRENCY: int = 16
+    ELEVENLABS_TTS_MAX_CONCURRENCY: int = 4
+    LLM_QUEUE_TIMEOUT_SECONDS: float = 30.0
+    LLM_TIMEOUT_SECONDS: float = 60.0
+    # Token buckets: requests and estimated tokens per minute for each model, requests per endpoint
+    LLM_MODEL_RPM: int = 500
+    LLM_MODEL_TPM: int = 200000
+    LLM_ENDPOINT_RPM: Dict[str, int] = {
+        "chat": 300,
+        "chat_summary": 300,
+        "translate": 240,
+        "analyze": 120,
+        "image": 60,
+        "tts": 60
+    }
+    # Retries with full-jitter backoff; at most LLM_RETRY_BUDGET_RATIO retries per call on average
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BASE_SECONDS: float = 0.5
+    LLM_RETRY_MAX_SECONDS: float = 8.0
+    LLM_RETRY_BUDGET_RATIO: float = 0.2
+    LLM_RETRY_BUDGET_MAX: float = 10.0
+    # Circuit breaker per model
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5
+    LLM_BREAKER_RESET_SECONDS: float = 30.0
+    # GET /api/llm/stats needs "Authorization: Bearer <token>" (empty token disables the route)
+    LLM_STATS_TOKEN: str = ""
+
+    # Prometheus metrics at /metrics (per worker process); scrapes need "Authorization: Bearer
+    # <METRICS_TOKEN>" and the route stays off while the token is empty
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: str = ""
+    # Server-Timing response header with the stage durations of each request
+    SERVER_TIMING_ENABLED: bool = True
+
+    # Request profiling (empty token disables it): requests sending the token in X-Profile-Token,
+    # plus PROFILING_SAMPLE_RATE of the requests to PROFILING_PATHS, get a flame graph under
+    # /api/v1/admin/profiles (same token required)
+    PROFILING_ADMIN_TOKEN: str = ""
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_PATHS: List[str] = ["/api/v1/analyze", "/api/v1/chat", "/api/analyze_image"]
+    PROFILING_INTERVAL_MS: float = 5.0
+    PROFILING_MAX_PROFILES: int = 20
+
     # Rate Limiting
     RATE_LIMIT_PER_MINUTE: int = 60
 
@@ -97,11 +97,13 @@ class TranslationRequest(BaseModel):
         source_language: Two-letter code for the source language
         target_language: Two-letter code for the target language
         translation_mode: The style or approach to use for translation
+        long_document: Force chunked translation (used automatically for long texts)
     """
     text: str = Field(..., min_length=1)
     source_language: str = Field(..., min_length=2, max_length=2)
     target_language: str = Field(..., min_length=2, max_length=2)
     translation_mode: str = Field(..., description="Mode of translation (literal, idiomatic, academic, etc.)")
+    long_document: Optional[bool] = Field(default=False, description="Translate in parallel chunks (enabled automatically for long texts)")
 
 class TranslationResponse(BaseModel):
     """
@@ -110,8 +110,12 @@ At the end of your answer, list all the URLs you checked as 'Sources checked:'.
 If none of the sources are relevant, reply: 'I couldn't find any reliable sources to verify that information. If you want, you can try rephrasing your question, provide more details, or ask about a related topic!' 
 Do NOT use your own knowledge or make up information. Respond in the same language as the user."""
 
-def get_image_forensics_prompt(metadata: dict) -> str:
+def get_image_forensics_prompt(metadata: dict, triage: Optional[dict] = None) -> str:
     """
     Prompt para análisis forense de imágenes IA con contexto, instrucciones y formato de salida JSON.
+    Si se incluye el triaje local (ELA, tablas de cuantización, ruido, picos espectrales), se añade como evidencia.
     """
-    return f"""You are an expert in forensic image analysis and AI-generated content detection.\n\nYou will receive three elements:\n\n1. The original image that needs to be evaluated.\n2. The corresponding frequency spectrum (FFT) of the image, showing the distribution of spatial frequencies.\n3. Metadata extracted from the original image (EXIF), such as camera model, software used, creation time, and GPS data.\n\nYour task is to assess whether the original image was generated by an AI model, using all three sources of information.\n\n🧠 CONTEXT — Known characteristics of AI-generated images in 2025 (e.g., from models like Sora, Midjourney v6, Imagen 3):\n\n— VISUAL CLUES:\n• Impossibly clean or symmetrical faces  \n• Uniform blur or depth of field  \n• Inconsistent lighting between subject and background  \n• Hands, fingers or ears with unusual shapes  \n• Overly smooth or plastic-looking materials  \n• Lack of realistic imperfections  \n\n— SPECTRAL CLUES:\n• Radial or axial symmetry in the frequency map  \n• Grid patterns or diagonal frequency bands  \n• Localized energy clusters or unnatural periodicity  \n• Lack of natural high-frequency noise or chaotic texture  \n\n— METADATA CLUES:\n• Absence of camera model, GPS info, or timestamp  \n• Presence of known AI tools in the \"Software\" field  \n• Recently generated timestamp without user device info  \n• Conflict between metadata and visual content (e.g., "Nikon" but image looks synthetic)\n\n🧪 Analyze all sources and respond in this exact JSON format:\n\n{{\n  \"ai_probability\": [0-100],\n  \"visual_clues\": [\"list of key visual observations\"],\n  \"spectral_clues\": [\"list of frequency-based anomalies\"],\n  \"metadata_clues\": [\"list of anomalies or suspicious fields in metadata\"],\n  \"verdict\": \"Likely AI-generated\" or \"Likely real\",\n  \"justification\": \"Short explanation referencing all three elements\",\n  \"recommendation\": \"Advice for the user on how to interpret or verify this image\"\n}}\n\n⚠️ Be careful. If the evidence is weak or mixed, reflect that uncertainty in your probability and reasoning.\n\nIMPORTANT: Your response MUST be ONLY the JSON object, with no explanation, no text before or after, and no questions.\n\nHere is the metadata (JSON):\n{json.dumps(metadata, ensure_ascii=False)}\n""" 
\ No newline at end of file
+    triage_block = ""
+    if triage:
+        triage_block = f"""\nLocal forensic measurements computed on the image (supporting evidence, not proof; "signals" lists how each one was read):\n{json.dumps(triage, ensure_ascii=False, default=str)}\n"""
+    return f"""You are an expert in forensic image analysis and AI-generated content detection.\n\nYou will receive three elements:\n\n1. The original image that needs to be evaluated.\n2. The corresponding frequency spectrum (FFT) of the image, showing the distribution of spatial frequencies.\n3. Metadata extracted from the original image (EXIF), such as camera model, software used, creation time, and GPS data.\n\nYour task is to assess whether the original image was generated by an AI model, using all three sources of information.\n\n🧠 CONTEXT — Known characteristics of AI-generated images in 2025 (e.g., from models like Sora, Midjourney v6, Imagen 3):\n\n— VISUAL CLUES:\n• Impossibly clean or symmetrical faces  \n• Uniform blur or depth of field  \n• Inconsistent lighting between subject and background  \n• Hands, fingers or ears with unusual shapes  \n• Overly smooth or plastic-looking materials  \n• Lack of realistic imperfections  \n\n— SPECTRAL CLUES:\n• Radial or axial symmetry in the frequency map  \n• Grid patterns or diagonal frequency bands  \n• Localized energy clusters or unnatural periodicity  \n• Lack of natural high-frequency noise or chaotic texture  \n\n— METADATA CLUES:\n• Absence of camera model, GPS info, or timestamp  \n• Presence of known AI tools in the \"Software\" field  \n• Recently generated timestamp without user device info  \n• Conflict between metadata and visual content (e.g., "Nikon" but image looks synthetic)\n\n🧪 Analyze all sources and respond in this exact JSON format:\n\n{{\n  \"ai_probability\": [0-100],\n  \"visual_clues\": [\"list of key visual observations\"],\n  \"spectral_clues\": [\"list of frequency-based anomalies\"],\n  \"metadata_clues\": [\"list of anomalies or suspicious fields in metadata\"],\n  \"verdict\": \"Likely AI-generated\" or \"Likely real\",\n  \"justification\": \"Short explanation referencing all three elements\",\n  \"recommendation\": \"Advice for the user on how to interpret or verify this image\"\n}}\n\n⚠️ Be careful. If the evidence is weak or mixed, reflect that uncertainty in your probability and reasoning.\n\nIMPORTANT: Your response MUST be ONLY the JSON object, with no explanation, no text before or after, and no questions.\n{triage_block}\nHere is the metadata (JSON):\n{json.dumps(metadata, ensure_ascii=False)}\n""" 
\ No newline at end of file
@@ -60,4 +60,29 @@ def get_chat_analysis_prompt(article_text: str, analysis_result: dict) -> str:
 Current analysis:
 {analysis_result}
 
-Please provide a clear and educational explanation of the analysis results.""" 
\ No newline at end of file
+Please provide a clear and educational explanation of the analysis results.""" 
+
+def get_chat_summary_prompt(previous_summary: str, transcript: str) -> str:
+    """
+    Generate a prompt that folds older chat turns into a rolling summary.
+    
+    Args:
+        previous_summary: The summary of even earlier turns (may be empty)
+        transcript: The turns to add to the summary, one "role: content" per line
+        
+    Returns:
+        str: A formatted prompt for the summarization model
+    """
+    previous = previous_summary or "(none)"
+    return f"""Update the running summary of a conversation between a user and the TruthLens assistant.
+
+Keep every fact, claim, source URL, question and conclusion that a later answer may need. Drop greetings and filler.
+Write at most 150 words, in the same language as the conversation, as plain text.
+
+Current summary:
+{previous}
+
+New turns:
+{transcript}
+
+Updated summary:"""
@@ -44,6 +44,53 @@ def get_translation_prompt(style: str, target_lang: str, text: str) -> str:
         f"Text:\n{text}"
     )
 
+def get_translation_chunk_prompt(
+    style: str,
+    target_lang: str,
+    text: str,
+    previous_context: str = "",
+    part: int = 1,
+    total_parts: int = 1
+) -> str:
+    """
+    Generate a translation prompt for one chunk of a long document.
+    
+    Args:
+        style: The translation style to use (must be one of the keys in STYLE_DEFINITIONS)
+        target_lang: The target language code (e.g., 'en', 'es', 'fr')
+        text: The chunk to be translated
+        previous_context: Tail of the preceding chunk, given only for terminology consistency
+        part: Position of this chunk in the document (1-based)
+        total_parts: Total number of chunks in the document
+        
+    Returns:
+        str: A formatted prompt for the translation model
+        
+    Raises:
+        ValueError: If the provided style is not valid
+    """
+    if style not in STYLE_DEFINITIONS:
+        raise ValueError(f"Invalid translation style: {style}")
+
+    context_block = ""
+    if previous_context:
+        context_block = (
+            "For terminology and tone consistency, this is the end of the preceding section. "
+            "It is context only — do NOT translate or repeat it:\n"
+            f"<context>\n{previous_context}\n</context>\n\n"
+        )
+
+    return (
+        "You are a professional translator.\n\n"
+        f"You are translating part {part} of {total_parts} of a longer document into {target_lang}.\n\n"
+        f"Use the following style: {STYLE_DEFINITIONS[style]}.\n\n"
+        "Your goal is to preserve the intended meaning while adapting the tone, terminology, and structure to match the selected style. "
+        "Keep names and key terms consistent with the preceding section.\n\n"
+        f"{context_block}"
+        "Do not return explanations, comments, or the original text — only return the final translated version of this part, keeping its paragraph breaks.\n\n"
+        f"Text:\n{text}"
+    )
+
 def get_translation_system_prompt() -> str:
     """
     Get the system prompt for translation.
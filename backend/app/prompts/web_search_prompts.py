@@ -49,4 +49,30 @@ Please analyze the search results and provide:
    - Any important context or caveats
 3. A summary of the overall factual accuracy of the text
 
-Focus on factual claims and avoid opinion-based analysis.""" 
\ No newline at end of file
+Focus on factual claims and avoid opinion-based analysis.""" 
+
+def get_evidence_block(claims: list, sources: list, analyses: list = None) -> str:
+    """
+    Format the ranked evidence gathered for a fact-check.
+    
+    Args:
+        claims: The claims that were searched, in order
+        sources: Ranked web sources, each with 'title', 'snippet', 'url' and 'claims' (1-based claim numbers)
+        analyses: Related earlier TruthLens analyses (same shape), listed apart from the web sources
+        
+    Returns:
+        str: A block listing the claims and the numbered sources supporting each one
+    """
+    block = "\n\nClaims being verified:\n"
+    for idx, claim in enumerate(claims, 1):
+        block += f"{idx}. {claim}\n"
+    block += "\nWeb search results (use ONLY these sources):\n"
+    for idx, source in enumerate(sources, 1):
+        related = ", ".join(str(c) for c in source["claims"])
+        block += f"\n[{idx}] Title: {source['title']}\nSnippet: {source['snippet']}\nURL: {source['url']}\nRelated claims: {related}\n"
+    if analyses:
+        block += "\nEarlier TruthLens analyses of other articles (context only, NOT independent sources; never cite them as verification):\n"
+        for idx, analysis in enumerate(analyses, len(sources) + 1):
+            related = ", ".join(str(c) for c in analysis["claims"])
+            block += f"\n[{idx}] Title: {analysis['title']}\nSnippet: {analysis['snippet']}\nRelated claims: {related}\n"
+    return block
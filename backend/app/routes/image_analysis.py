@@ -1,76 +1,175 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException
-from PIL import Image
-import numpy as np
-import io
-import base64
-from typing import List
-import piexif
+from fastapi.responses import StreamingResponse
+import json
+import asyncio
+import contextlib
+from typing import List, Dict, Any, Optional, AsyncIterator
 import logging
-from ..services.image_analysis import analyze_image_spectrum, extract_metadata
+import time
+from ..services.image_analysis import triage_result
+from ..services.image_pipeline import image_pipeline, ImagePipelineBusy
+from ..services.image_hash_index import image_hash_index
 from ..services.openai_service import OpenAIService
+from ..services.llm_gateway import LLMGatewayBusy
 from ..services.storage_service import StorageService
+from ..core.config import settings
+from ..utils.uploads import spool_upload, discard_upload
+from ..utils.metrics import observe_stage
 
 router = APIRouter()
 openai_service = OpenAIService()
 storage_service = StorageService()
 logger = logging.getLogger("image_analysis")
+# Bounds the vision-model calls made at once, across single and batch requests
+vision_semaphore = asyncio.Semaphore(settings.IMAGE_VISION_CONCURRENCY)
 
-def resize_image(img: Image.Image, max_size: int = 1024) -> Image.Image:
+async def _analyze_one(upload_path: str, filename: Optional[str], cpu_slots: Optional[asyncio.Semaphore] = None) -> Dict[str, Any]:
     """
-    Resize image maintaining aspect ratio, with max dimension of max_size.
+    Analyze one spooled upload: hash lookup, local CPU stages, vision model and storage.
+    cpu_slots optionally limits how many images of a batch use the process pool at once.
+
+    Raises:
+        HTTPException: 503 if the image pipeline is full or the LLM gateway is saturated
     """
-    ratio = min(max_size / img.size[0], max_size / img.size[1])
-    if ratio < 1:
-        new_size = (int(img.size[0] * ratio), int(img.size[1] * ratio))
-        return img.resize(new_size, Image.Resampling.LANCZOS)
-    return img
+    timings = {}
 
-@router.post("/analyze_image")
-async def analyze_image(image: UploadFile = File(...)):
+    # Decode, hashing, resize, spectrum and encoding run in the process pool (off the event loop)
     try:
-        logger.info(f"[ImageAnalysis] Imagen recibida: filename={image.filename}, content_type={image.content_type}")
-        # Read and validate image
-        contents = await image.read()
-        img = Image.open(io.BytesIO(contents))
-        logger.info(f"[ImageAnalysis] Imagen cargada y abierta correctamente. Tamaño: {img.size}, Modo: {img.mode}")
-        
-        # Resize image for OpenAI
-        resized_img = resize_image(img)
-        logger.info(f"[ImageAnalysis] Imagen redimensionada para OpenAI. Nuevo tamaño: {resized_img.size}")
-        
-        # Convert image to base64 for GPT-4
-        buffered = io.BytesIO()
-        resized_img.save(buffered, format="PNG", optimize=True)
-        img_base64 = base64.b64encode(buffered.getvalue()).decode()
-        logger.info(f"[ImageAnalysis] Imagen convertida a base64 para OpenAI. Bytes: {len(img_base64)}")
-        
-        # Generate spectrum
-        spectrum = analyze_image_spectrum(resized_img)
-        spectrum_buffered = io.BytesIO()
-        spectrum.save(spectrum_buffered, format="PNG", optimize=True)
-        spectrum_base64 = base64.b64encode(spectrum_buffered.getvalue()).decode()
-        logger.info(f"[ImageAnalysis] Espectro FFT generado y convertido a base64. Bytes: {len(spectrum_base64)}")
-        
-        # Extract metadata
-        metadata = extract_metadata(img)  # Use original image for metadata
-        logger.info(f"[ImageAnalysis] Metadata extraída: {metadata}")
-        
+        async with cpu_slots or contextlib.nullcontext():
+            start = time.perf_counter()
+            hashes = await image_pipeline.hash(upload_path)
+            timings["hash"] = round((time.perf_counter() - start) * 1000, 2)
+            observe_stage("image_hash", timings["hash"] / 1000)
+
+            # Same or near-identical image already analyzed: reuse its forensic result
+            cached = image_hash_index.lookup(hashes)
+            if cached is not None:
+                logger.info(f"[ImageAnalysis] Resultado reutilizado de una imagen ya analizada: {cached['cache']}")
+                storage_service.save_analysis(
+                    tipo_analisis="imagen",
+                    input_original=filename,
+                    resultado=cached
+                )
+                return {**cached, "timings_ms": timings}
+
+            processed = await image_pipeline.process(upload_path)
+            timings.update(processed["timings_ms"])
+            # CPU stages are timed in the worker process, so they are recorded here
+            for name, ms in processed["timings_ms"].items():
+                observe_stage(f"image_{name}", ms / 1000)
+    except ImagePipelineBusy as busy:
+        logger.warning(f"[ImageAnalysis] {busy}")
+        raise HTTPException(status_code=503, detail="Image analysis is busy, please try again shortly")
+    metadata = processed["metadata"]
+    logger.info(f"[ImageAnalysis] Imagen procesada. Nuevo tamaño: {processed['resized_size']}, bytes codificados: {processed['encoded_bytes']}, tiempos (ms): {processed['timings_ms']}")
+    logger.info(f"[ImageAnalysis] Metadata extraída: {metadata}")
+
+    triage = processed["triage"]
+    if triage and triage.get("decisive") and triage["confidence"] >= settings.IMAGE_TRIAGE_SKIP_CONFIDENCE:
+        # Generator signature in the file: the local checks answer without the vision model
+        analysis = triage_result(triage)
+        logger.info(f"[ImageAnalysis] Resuelto por el triaje local (confianza {triage['confidence']}): {analysis['verdict']}")
+    else:
         # Analyze with GPT-4
         logger.info(f"[ImageAnalysis] Enviando imagen, espectro y metadata a OpenAI...")
-        analysis = await openai_service.analyze_with_gpt4(
-            original_image=img_base64,
-            spectrum_image=spectrum_base64,
-            metadata=metadata
-        )
+        start = time.perf_counter()
+        try:
+            async with vision_semaphore:
+                analysis = await openai_service.analyze_with_gpt4(
+                    original_image=processed["image_base64"],
+                    spectrum_image=processed["spectrum_base64"],
+                    metadata=metadata,
+                    original_mime=processed["image_mime"],
+                    spectrum_mime=processed["spectrum_mime"],
+                    triage=triage
+                )
+        except LLMGatewayBusy as busy:
+            logger.warning(f"[ImageAnalysis] {busy}")
+            raise HTTPException(status_code=503, detail="Image analysis is busy, please try again shortly")
+        timings["vision"] = round((time.perf_counter() - start) * 1000, 2)
         logger.info(f"[ImageAnalysis] Respuesta recibida de OpenAI: {analysis}")
-        # Guardar input y resultado en la base de datos
-        storage_service.save_analysis(
-            tipo_analisis="imagen",
-            input_original=image.filename,
-            resultado=analysis
-        )
-        return analysis
-        
+        if triage:
+            analysis["triage"] = triage
+    image_hash_index.add(hashes, analysis)
+    # Guardar input y resultado en la base de datos
+    storage_service.save_analysis(
+        tipo_analisis="imagen",
+        input_original=filename,
+        resultado=analysis
+    )
+    # Timings describe this request only, so they are not stored with the result
+    return {**analysis, "timings_ms": timings, "encoded_bytes": processed["encoded_bytes"]}
+
+@router.post("/analyze_image")
+async def analyze_image(image: UploadFile = File(...)):
+    upload_path = None
+    try:
+        logger.info(f"[ImageAnalysis] Imagen recibida: filename={image.filename}, content_type={image.content_type}")
+        # Streamed to a temporary file with a size cap; workers read it from disk
+        upload_path = await spool_upload(image)
+        return await _analyze_one(upload_path, image.filename)
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"[ImageAnalysis] Error en el análisis de imagen: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if upload_path:
+            discard_upload(upload_path)
+
+@router.post("/analyze_images")
+async def analyze_images(images: List[UploadFile] = File(...)):
+    """
+    Analyze a gallery of images.
+
+    All images go through the local stages in parallel and the vision-model calls run
+    with bounded concurrency. The response is NDJSON: one line per image, in completion
+    order, with its 'index' and 'filename' plus either 'result' or 'error' and
+    'status_code'; a final line {"done": true, "count": n} closes the stream.
+    """
+    if len(images) > settings.IMAGE_MAX_BATCH:
+        raise HTTPException(status_code=400, detail=f"Too many images (max {settings.IMAGE_MAX_BATCH})")
+    logger.info(f"[ImageAnalysis] Lote recibido: {len(images)} imágenes")
+
+    # Uploads are closed once this function returns, so spool them all before streaming
+    upload_paths: List[Optional[str]] = []
+    spool_errors: Dict[int, HTTPException] = {}
+    for index, image in enumerate(images):
+        try:
+            upload_paths.append(await spool_upload(image))
+        except HTTPException as e:
+            upload_paths.append(None)
+            spool_errors[index] = e
+    filenames = [image.filename for image in images]
+    # Enough images in the process pool to keep it busy without overflowing its queue
+    cpu_slots = asyncio.Semaphore(image_pipeline.max_workers)
+
+    async def analyze_indexed(index: int) -> Dict[str, Any]:
+        line = {"index": index, "filename": filenames[index]}
+        try:
+            if index in spool_errors:
+                raise spool_errors[index]
+            line["result"] = await _analyze_one(upload_paths[index], filenames[index], cpu_slots)
+        except HTTPException as e:
+            line.update(error=e.detail, status_code=e.status_code)
+        except Exception as e:
+            logger.error(f"[ImageAnalysis] Error en la imagen {index} del lote: {e}", exc_info=True)
+            line.update(error=str(e), status_code=500)
+        finally:
+            if upload_paths[index]:
+                discard_upload(upload_paths[index])
+        return line
+
+    async def generate() -> AsyncIterator[str]:
+        tasks = [asyncio.create_task(analyze_indexed(index)) for index in range(len(images))]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield json.dumps(await finished, ensure_ascii=False, default=str) + "\n"
+            yield json.dumps({"done": True, "count": len(tasks)}) + "\n"
+        finally:
+            # Client disconnected: stop the remaining analyses (their files are removed on cancel)
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
@@ -0,0 +1,48 @@
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from ..core.config import settings
+from ..utils.ttl_cache import TTLCache
+from .chat_context import hash_article, hash_analysis
+
+logger = logging.getLogger(__name__)
+
+class ChatAnswerCache:
+    """
+    Caches assistant answers to first-turn questions about an article.
+
+    Keys combine the article hash, the analysis hash, the normalized question and the
+    web-search flag. Only conversations with a single user message and no prior history
+    are cacheable, since later turns depend on the rest of the conversation.
+    """
+
+    def __init__(self):
+        self.cache = TTLCache(
+            maxsize=settings.CHAT_ANSWER_CACHE_SIZE,
+            ttl_seconds=settings.CHAT_ANSWER_CACHE_TTL_SECONDS
+        )
+
+    @staticmethod
+    def make_key(
+        messages: List[Any],
+        normalized_question: str,
+        article_text: Optional[str],
+        analysis_result: Optional[Dict[str, Any]],
+        use_web_search: bool
+    ) -> Optional[Tuple[str, str, str, bool]]:
+        """Return the cache key for a chat request, or None if the request is not cacheable."""
+        conversation = [msg for msg in messages if msg.role != "system"]
+        if len(conversation) != 1 or conversation[0].role != "user" or not normalized_question:
+            return None
+        return (hash_article(article_text), hash_analysis(analysis_result), normalized_question, bool(use_web_search))
+
+    def get(self, key: Optional[Tuple]) -> Optional[str]:
+        if key is None:
+            return None
+        answer = self.cache.get(key)
+        if answer is not None:
+            logger.info("Chat answer served from cache")
+        return answer
+
+    def set(self, key: Optional[Tuple], answer: Optional[str]) -> None:
+        if key is not None and answer:
+            self.cache.set(key, answer)
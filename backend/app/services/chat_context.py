@@ -0,0 +1,65 @@
+import hashlib
+import json
+import logging
+from typing import Any, Dict, Optional
+from ..core.config import settings
+from ..prompts.chat_prompts import get_chat_system_prompt
+from ..utils.ttl_cache import TTLCache
+from .chat_history import truncate_to_tokens
+
+logger = logging.getLogger(__name__)
+
+def canonical_json(data: Any) -> str:
+    """Serialize data deterministically (sorted keys, compact separators)."""
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+def hash_article(article_text: Optional[str]) -> str:
+    """Stable hash of an article text."""
+    return hashlib.sha256((article_text or "").encode("utf-8")).hexdigest()
+
+def hash_analysis(analysis_result: Optional[Dict[str, Any]]) -> str:
+    """Stable hash of an analysis result, independent of key order."""
+    return hashlib.sha256(canonical_json(analysis_result).encode("utf-8")).hexdigest()
+
+class ChatContextCache:
+    """
+    Compiles the static part of the chat system prompt (instructions, article and
+    analysis) once per article/analysis pair.
+
+    The compiled prefix is byte-identical across turns, so upstream prompt-prefix
+    caching applies to it; per-turn content must be sent after it.
+    """
+
+    def __init__(self):
+        self.cache = TTLCache(
+            maxsize=settings.CHAT_CONTEXT_CACHE_SIZE,
+            ttl_seconds=settings.CHAT_CONTEXT_CACHE_TTL_SECONDS
+        )
+
+    def get_prefix(self, article_text: Optional[str], analysis_result: Optional[Dict[str, Any]]) -> str:
+        """
+        Return the compiled system prompt for an article and its analysis.
+
+        Args:
+            article_text: The article under discussion (may be None)
+            analysis_result: Its analysis (may be None)
+
+        Returns:
+            str: The static system prompt prefix
+        """
+        key = (hash_article(article_text), hash_analysis(analysis_result))
+        prefix = self.cache.get(key)
+        if prefix is None:
+            prefix = self._compile(article_text, analysis_result)
+            self.cache.set(key, prefix)
+            logger.info(f"Chat context compiled for article {key[0][:12]} ({len(prefix)} chars)")
+        return prefix
+
+    @staticmethod
+    def _compile(article_text: Optional[str], analysis_result: Optional[Dict[str, Any]]) -> str:
+        prefix = get_chat_system_prompt()
+        if article_text:
+            prefix += f"\n\nArticle to analyze:\n{truncate_to_tokens(article_text, settings.CHAT_MAX_ARTICLE_TOKENS)}"
+        if analysis_result:
+            prefix += f"\n\nCurrent analysis:\n{canonical_json(analysis_result)}"
+        return prefix
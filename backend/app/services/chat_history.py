@@ -0,0 +1,129 @@
+import hashlib
+import logging
+from typing import Dict, List, Optional
+from ..core.config import settings
+from ..prompts.chat_prompts import get_chat_summary_prompt
+from ..utils.ttl_cache import TTLCache
+from .llm_gateway import LLMGateway, Priority
+
+logger = logging.getLogger(__name__)
+
+# Rough token estimate used for budgeting (no tokenizer dependency)
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in text."""
+    return len(text) // CHARS_PER_TOKEN + 1 if text else 0
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Trim text to roughly max_tokens tokens, cutting at a word boundary."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text.rfind(" ", 0, max_chars)
+    return text[:cut if cut > 0 else max_chars] + " [...]"
+
+def _message_tokens(message: Dict[str, str]) -> int:
+    return estimate_tokens(message.get("content") or "") + MESSAGE_OVERHEAD_TOKENS
+
+class ChatHistoryManager:
+    """
+    Keeps chat prompts within a token budget.
+
+    The last CHAT_HISTORY_KEEP_TURNS user/assistant turns are sent verbatim; older turns
+    are folded into a rolling summary produced by a cheap model. Summaries are cached by
+    conversation prefix, so each turn only summarizes the messages that aged out since
+    the previous one.
+    """
+
+    def __init__(self, gateway: LLMGateway, model: Optional[str] = None):
+        self.gateway = gateway
+        self.model = model or settings.OPENAI_SUMMARY_MODEL
+        self.keep_messages = settings.CHAT_HISTORY_KEEP_TURNS * 2
+        self.max_prompt_tokens = settings.CHAT_MAX_PROMPT_TOKENS
+        self.summary_max_tokens = settings.CHAT_SUMMARY_MAX_TOKENS
+        self.summaries = TTLCache(
+            maxsize=settings.CHAT_SUMMARY_CACHE_SIZE,
+            ttl_seconds=settings.CHAT_SUMMARY_CACHE_TTL_SECONDS
+        )
+
+    async def build_messages(
+        self,
+        system_message: Dict[str, str],
+        messages: List[Dict[str, str]],
+        reserved_tokens: int = 0
+    ) -> List[Dict[str, str]]:
+        """
+        Build the message list for a chat completion.
+
+        Args:
+            system_message: The system message with the chat context
+            messages: The conversation (non-system messages, oldest first)
+            reserved_tokens: Tokens set aside for per-turn context added by the caller
+
+        Returns:
+            List[Dict[str, str]]: System message, optional summary of older turns, and the recent turns
+        """
+        split = max(0, len(messages) - self.keep_messages)
+        # Recent history starts on a user turn so the model never sees a dangling answer
+        while split < len(messages) - 1 and messages[split]["role"] != "user":
+            split += 1
+
+        # Enforce the token budget: age out the oldest verbatim turns first, whole turns
+        # at a time, so the kept history still starts on a user turn
+        budget = self.max_prompt_tokens - _message_tokens(system_message) - self.summary_max_tokens - reserved_tokens
+        recent_tokens = sum(_message_tokens(m) for m in messages[split:])
+        while recent_tokens > budget and split < len(messages) - 1:
+            recent_tokens -= _message_tokens(messages[split])
+            split += 1
+            while split < len(messages) - 1 and messages[split]["role"] != "user":
+                recent_tokens -= _message_tokens(messages[split])
+                split += 1
+
+        full_messages = [system_message]
+        if split > 0:
+            summary = await self._summarize_prefix(messages, split)
+            if summary:
+                full_messages.append({
+                    "role": "system",
+                    "content": f"Summary of the earlier conversation:\n{summary}"
+                })
+            logger.info(f"Chat history: {split} older messages summarized, {len(messages) - split} kept verbatim")
+        return full_messages + messages[split:]
+
+    async def _summarize_prefix(self, messages: List[Dict[str, str]], length: int) -> str:
+        """Return a summary of messages[:length], extending the longest cached prefix summary."""
+        prefix_keys = []
+        digest = hashlib.sha256()
+        for message in messages[:length]:
+            digest.update(f"{message['role']}\x00{message['content']}\x01".encode("utf-8"))
+            prefix_keys.append(digest.copy().hexdigest())
+
+        start, previous_summary = 0, ""
+        for idx in range(length, 0, -1):
+            cached = self.summaries.get(prefix_keys[idx - 1])
+            if cached is not None:
+                start, previous_summary = idx, cached
+                break
+        if start == length:
+            return previous_summary
+
+        transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages[start:length])
+        try:
+            response = await self.gateway.chat_completion(
+                "chat_summary",
+                Priority.INTERACTIVE,
+                model=self.model,
+                messages=[{"role": "user", "content": get_chat_summary_prompt(previous_summary, transcript)}],
+                temperature=0,
+                max_tokens=self.summary_max_tokens
+            )
+            summary = response.choices[0].message.content.strip()
+        except Exception as e:
+            # Never fail the chat because of the summary: fall back to a truncated transcript (not cached)
+            logger.error(f"Error summarizing chat history: {str(e)}")
+            return truncate_to_tokens(f"{previous_summary}\n{transcript}".strip(), self.summary_max_tokens)
+
+        self.summaries.set(prefix_keys[length - 1], summary)
+        return summary
@@ -0,0 +1,200 @@
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+from ..core.config import settings
+from ..prompts.web_search_prompts import get_evidence_block
+from ..utils.retriever import async_search_web_batch
+from ..utils.text_normalize import normalize_query
+from .local_index import local_index, hit_to_result, index_search_results, content_hash
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_RE = re.compile(r"(?<=[.!?…;])\s+|\n+|\s+(?:and that|y que)\s+", re.IGNORECASE)
+QUOTE_RE = re.compile(r"[\"“«‘']([^\"”»’']{15,})[\"”»’']")
+WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+# Earlier analyses of other articles given as context per claim (never counted as evidence)
+MAX_ANALYSES_PER_CLAIM = 2
+
+# Words that usually introduce a checkable statement (Spanish and English, accent-free)
+CLAIM_SIGNALS = {
+    "said", "says", "announced", "reported", "according", "claims", "claimed", "confirmed", "percent",
+    "million", "billion", "increased", "decreased", "rose", "fell",
+    "dijo", "anuncio", "afirmo", "segun", "informo", "confirmo", "declaro", "porcentaje", "millones",
+    "aumento", "bajo", "subio", "cayo", "record"
+}
+
+# Request phrasing that is not part of the claim itself
+REQUEST_WORDS = {
+    "veracidad", "verificar", "fuente", "cierto", "analicemos", "comprobar", "chequear", "buscar", "internet",
+    "noticia", "truth", "verify", "source", "fact", "check", "true", "analyze", "search", "online", "news"
+}
+FILLER_WORDS = {
+    "es", "esta", "esto", "la", "el", "de", "que", "si", "en", "is", "it", "this", "the", "if", "a", "an", "of"
+}
+
+def _words(text: str) -> List[str]:
+    return WORD_RE.findall(normalize_query(text))
+
+def _score_sentence(sentence: str) -> float:
+    words = sentence.split()
+    if len(words) < 5:
+        return 0.0
+    normalized = _words(sentence)
+    score = 1.0
+    score += 2.0 * bool(re.search(r"\d", sentence))
+    score += min(3, sum(1 for w in words[1:] if w[:1].isupper()))
+    score += sum(1 for w in normalized if w in CLAIM_SIGNALS)
+    return score
+
+def _claim_key(claim: str) -> str:
+    """Casefolded words of a claim, ignoring punctuation and spacing, for deduplication."""
+    return " ".join(_words(claim.casefold()))
+
+def _strip_request_prefix(message: str) -> str:
+    """Drop a leading request such as 'Analicemos la veracidad de esta noticia:'."""
+    head, sep, tail = message.partition(":")
+    if sep and len(head) < 80 and any(w in REQUEST_WORDS for w in _words(head)):
+        return tail.strip()
+    return message.strip()
+
+def extract_claims(message: str, article_text: Optional[str] = None, max_claims: int = 4) -> List[str]:
+    """
+    Extract the checkable claims from a user message (or the article, when the message
+    only asks to verify it) without calling the model.
+
+    Args:
+        message: The user's message
+        article_text: The article under discussion, if any
+        max_claims: Maximum number of claims to return
+
+    Returns:
+        List[str]: Claims in their original order (at least one element)
+    """
+    quoted = QUOTE_RE.findall(message)
+    text = " ".join(quoted) if quoted else _strip_request_prefix(message)
+
+    content_words = [w for w in _words(text) if w not in REQUEST_WORDS and w not in FILLER_WORDS]
+    if len(content_words) < 4 and article_text:
+        # "Is this true?" style questions: the claims live in the article
+        text = article_text[:6000]
+
+    sentences = [s.strip() for s in SENTENCE_RE.split(text) if s and s.strip()]
+    # Repeated sentences (quoted twice, or restated in the article) would use up claim slots
+    seen = set()
+    scored = []
+    for idx, sentence in enumerate(sentences):
+        key = _claim_key(" ".join(sentence.split()[:25]))
+        if key in seen:
+            continue
+        seen.add(key)
+        score = _score_sentence(sentence)
+        if score > 0:
+            scored.append((score, idx, sentence))
+    best = sorted(scored, key=lambda item: (-item[0], item[1]))[:max_claims]
+    claims = [" ".join(s.split()[:25]) for _, _, s in sorted(best, key=lambda item: item[1])]
+    return claims or [" ".join(message.split()[:25])]
+
+def _url_key(url: str) -> str:
+    url = re.sub(r"^https?://(www\.)?", "", url.strip().lower())
+    return url.split("#", 1)[0].rstrip("/")
+
+def rank_sources(results_per_claim: List[List[Dict[str, str]]]) -> List[Dict]:
+    """
+    Merge per-claim results, deduplicating URLs. Sources found for more claims and
+    ranked higher by the search engine come first.
+    """
+    merged: Dict[str, Dict] = {}
+    for claim_idx, results in enumerate(results_per_claim, 1):
+        for rank, result in enumerate(results):
+            key = _url_key(result.get("url", ""))
+            if not key:
+                continue
+            source = merged.setdefault(key, {**result, "claims": [], "score": 0.0})
+            if claim_idx not in source["claims"]:
+                source["claims"].append(claim_idx)
+                source["score"] += 1.0 / (rank + 1)
+    return sorted(merged.values(), key=lambda s: (-len(s["claims"]), -s["score"]))
+
+class FactCheckPipeline:
+    """
+    Claim-level web search for fact-checking chat turns: extracts the claims, searches
+    them concurrently (batched where Serper allows) and builds one ranked,
+    size-capped evidence block for the prompt.
+    """
+
+    def __init__(self):
+        self.max_claims = settings.FACT_CHECK_MAX_CLAIMS
+        self.max_sources = settings.FACT_CHECK_MAX_SOURCES
+        self.max_chars = settings.FACT_CHECK_EVIDENCE_MAX_CHARS
+        self.local_enabled = settings.LOCAL_INDEX_ENABLED
+        self.local_min_results = settings.LOCAL_INDEX_MIN_RESULTS
+        self.local_min_coverage = settings.LOCAL_INDEX_MIN_COVERAGE
+
+    def _search_local(
+        self,
+        claim: str,
+        num_results: int,
+        article_hash: Optional[str] = None
+    ) -> Tuple[Optional[List[Dict[str, str]]], List[Dict[str, str]]]:
+        """
+        Search claim in the local index.
+
+        Only web snippets count as evidence: stored analyses are returned apart, and the
+        analysis of the article being verified (matched by content hash) is left out, so
+        an article never verifies itself.
+
+        Returns:
+            Tuple: (web results, or None when local recall is too low; related earlier analyses)
+        """
+        if not self.local_enabled:
+            return None, []
+        hits = [
+            hit for hit in local_index.search(claim, k=num_results * 2 + MAX_ANALYSES_PER_CLAIM)
+            if not article_hash or hit["metadata"].get("content_hash") != article_hash
+        ]
+        web_hits = [hit for hit in hits if hit["metadata"].get("source") == "web"][:num_results]
+        analyses = [hit_to_result(hit) for hit in hits if hit["metadata"].get("source") == "analysis"][:MAX_ANALYSES_PER_CLAIM]
+        if len(web_hits) < self.local_min_results or local_index.coverage(claim, web_hits) < self.local_min_coverage:
+            return None, analyses
+        return [hit_to_result(hit) for hit in web_hits], analyses
+
+    async def gather_evidence(self, message: str, article_text: Optional[str] = None, num_results: int = 5) -> Optional[str]:
+        """
+        Search the claims in message and return the evidence block, or None if nothing was found.
+        """
+        claims = extract_claims(message, article_text, self.max_claims)
+        article_hash = content_hash(article_text) if article_text else None
+        local = [self._search_local(claim, num_results, article_hash) for claim in claims]
+        results_per_claim = [results for results, _ in local]
+        analyses_per_claim = [analyses for _, analyses in local]
+
+        # Only claims the local index cannot answer go to Serper
+        remote = [idx for idx, results in enumerate(results_per_claim) if results is None]
+        logger.info(f"Fact-check: {len(claims)} claims, {len(claims) - len(remote)} answered locally")
+        if remote:
+            remote_results = await async_search_web_batch([claims[idx] for idx in remote], num_results=num_results)
+            for idx, results in zip(remote, remote_results):
+                results_per_claim[idx] = results
+                index_search_results(results)
+
+        sources = []
+        for source in rank_sources(results_per_claim)[:self.max_sources]:
+            candidate = sources + [source]
+            if sources and len(get_evidence_block(claims, candidate)) > self.max_chars:
+                break
+            sources = candidate
+        if not sources:
+            return None
+        # Earlier analyses only fill the space left by the web sources
+        analyses = []
+        for analysis in rank_sources(analyses_per_claim):
+            candidate = analyses + [analysis]
+            if len(get_evidence_block(claims, sources, candidate)) > self.max_chars:
+                break
+            analyses = candidate
+        logger.info(
+            f"Fact-check: {len(sources)} sources selected from {sum(len(r) for r in results_per_claim)} results, "
+            f"{len(analyses)} earlier analyses added as context"
+        )
+        return get_evidence_block(claims, sources, analyses)
@@ -1,29 +1,124 @@
 from PIL import Image
 import numpy as np
 import piexif
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 import io
+import re
 
-def analyze_image_spectrum(img: Image.Image) -> Image.Image:
+def target_size(size: Tuple[int, int], max_size: int = 1024) -> Tuple[int, int]:
+    """
+    Size of an image of the given size after resize_image.
+    """
+    ratio = min(max_size / size[0], max_size / size[1])
+    if ratio < 1:
+        return (int(size[0] * ratio), int(size[1] * ratio))
+    return size
+
+def open_reduced(img: Image.Image, max_size: int = 1024) -> Image.Image:
+    """
+    Configure a lazily opened image to decode close to its resized size.
+
+    JPEGs are decoded directly at 1/2, 1/4 or 1/8 scale (never below the target size),
+    so a large photo is never fully decoded. Other formats are left unchanged.
+    Extract the metadata first: it reports the size of the image as opened.
+    """
+    new_size = target_size(img.size, max_size)
+    if new_size != img.size:
+        img.draft(img.mode, new_size)
+    return img
+
+def resize_image(img: Image.Image, max_size: int = 1024) -> Image.Image:
+    """
+    Resize image maintaining aspect ratio, with max dimension of max_size.
+    """
+    new_size = target_size(img.size, max_size)
+    if new_size != img.size:
+        # reducing_gap shrinks by an integer factor first, then resamples with LANCZOS
+        return img.resize(new_size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+    return img
+
+def log_magnitude_spectrum(img: Image.Image) -> np.ndarray:
+    """
+    Centered log-magnitude spectrum (20 * log(1 + |FFT|)) of the grayscale image, float32.
+
+    The spectrum of a real image is conjugate-symmetric, so only the half computed by
+    rfft2 is transformed and the other half is mirrored from it.
+    """
+    gray = np.asarray(img.convert('L'), dtype=np.float32)
+    height, width = gray.shape
+
+    # Apply FFT on the non-redundant half: |F(u, v)| == |F(-u, -v)| for real input
+    half = np.abs(np.fft.rfft2(gray)).astype(np.float32, copy=False)
+    np.log1p(half, out=half)
+    half *= 20
+
+    magnitude_spectrum = np.empty((height, width), dtype=np.float32)
+    half_width = half.shape[1]
+    magnitude_spectrum[:, :half_width] = half
+    mirrored_cols = width - half_width
+    if mirrored_cols:
+        mirrored_rows = (-np.arange(height)) % height
+        magnitude_spectrum[:, half_width:] = half[mirrored_rows, 1:mirrored_cols + 1][:, ::-1]
+    return np.fft.fftshift(magnitude_spectrum)
+
+def analyze_image_spectrum(img: Image.Image, magnitude_spectrum: Optional[np.ndarray] = None) -> Image.Image:
     """
     Generate a frequency spectrum analysis of the image using FFT.
+    A spectrum already computed by log_magnitude_spectrum can be passed (it is modified in place).
     """
-    # Convert image to grayscale
-    gray_img = img.convert('L')
-    img_array = np.array(gray_img)
-    
-    # Apply FFT
-    fft = np.fft.fft2(img_array)
-    fft_shift = np.fft.fftshift(fft)
-    magnitude_spectrum = 20 * np.log(np.abs(fft_shift) + 1)
-    
-    # Normalize to 0-255
-    magnitude_spectrum = ((magnitude_spectrum - magnitude_spectrum.min()) * 
-                         (255 / (magnitude_spectrum.max() - magnitude_spectrum.min())))
-    
+    if magnitude_spectrum is None:
+        magnitude_spectrum = log_magnitude_spectrum(img)
+
+    # Normalize to 0-255 in place
+    low, high = magnitude_spectrum.min(), magnitude_spectrum.max()
+    magnitude_spectrum -= low
+    if high > low:
+        magnitude_spectrum *= 255 / (high - low)
+
     # Convert back to image
-    spectrum_img = Image.fromarray(magnitude_spectrum.astype(np.uint8))
-    return spectrum_img
+    return Image.fromarray(magnitude_spectrum.astype(np.uint8))
+
+def encode_image(img: Image.Image, image_format: str = "JPEG", target_bytes: int = 0,
+                 max_quality: int = 85, min_quality: int = 40) -> Tuple[bytes, str]:
+    """
+    Encode an image for the vision model, aiming at a byte budget.
+
+    For lossy formats the highest quality within [min_quality, max_quality] whose output
+    fits in target_bytes is chosen by binary search (min_quality if none fits);
+    target_bytes <= 0 encodes once at max_quality. PNG is encoded losslessly without
+    the slow optimize pass.
+
+    Returns:
+        Tuple[bytes, str]: The encoded image and its mime type
+    """
+    image_format = image_format.upper()
+    if image_format == "PNG":
+        buffered = io.BytesIO()
+        img.save(buffered, format="PNG", compress_level=1)
+        return buffered.getvalue(), "image/png"
+
+    if image_format == "JPEG" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    mime = "image/webp" if image_format == "WEBP" else "image/jpeg"
+
+    def _encode(quality: int) -> bytes:
+        buffered = io.BytesIO()
+        img.save(buffered, format=image_format, quality=quality)
+        return buffered.getvalue()
+
+    best = _encode(max_quality)
+    if target_bytes <= 0 or len(best) <= target_bytes:
+        return best, mime
+    low, high = min_quality, max_quality - 1
+    best = None
+    while low <= high:
+        quality = (low + high) // 2
+        data = _encode(quality)
+        if len(data) <= target_bytes:
+            best, low = data, quality + 1
+        else:
+            high = quality - 1
+    return (best if best is not None else _encode(min_quality)), mime
 
 def extract_metadata(img: Image.Image) -> Dict[str, Any]:
     """
@@ -67,4 +162,296 @@ def extract_metadata(img: Image.Image) -> Dict[str, Any]:
     except:
         metadata['exif_error'] = 'No EXIF data available'
     
-    return metadata 
\ No newline at end of file
+    return metadata 
+def _dct_matrix(n: int) -> np.ndarray:
+    """Orthonormal DCT-II basis matrix of size n x n."""
+    k = np.arange(n)[:, None]
+    i = np.arange(n)[None, :]
+    matrix = np.cos(np.pi * (2 * i + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    matrix[0] /= np.sqrt(2)
+    return matrix
+
+def compute_dhash(img: Image.Image, hash_size: int = 8) -> int:
+    """
+    Difference hash: compares adjacent pixels of a (hash_size+1) x hash_size grayscale thumbnail.
+    """
+    small = np.asarray(img.convert('L').resize((hash_size + 1, hash_size), Image.Resampling.BILINEAR), dtype=np.int16)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int("".join('1' if b else '0' for b in bits), 2)
+
+def compute_phash(img: Image.Image, hash_size: int = 8, highfreq_factor: int = 4) -> int:
+    """
+    Perceptual hash: sign of the low-frequency DCT coefficients relative to their median.
+    Robust to recompression, resizing and small color changes.
+    """
+    size = hash_size * highfreq_factor
+    small = np.asarray(img.convert('L').resize((size, size), Image.Resampling.BILINEAR), dtype=np.float64)
+    dct_matrix = _dct_matrix(size)
+    dct = dct_matrix @ small @ dct_matrix.T
+    low = dct[:hash_size, :hash_size].flatten()
+    bits = low > np.median(low[1:])
+    return int("".join('1' if b else '0' for b in bits), 2)
+
+# --- Local forensic triage ---
+
+# Standard (libjpeg / IJG) luminance quantization table at quality 50, natural order
+STANDARD_LUMINANCE_TABLE = np.array([
+    16, 11, 10, 16, 24, 40, 51, 61,
+    12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56,
+    14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77,
+    24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101,
+    72, 92, 95, 98, 112, 100, 103, 99
+], dtype=np.int32)
+
+# Values of the Software tag written by image generators
+AI_SOFTWARE = ("Midjourney", "DALL-E", "DALL\u00b7E", "Stable Diffusion", "Adobe Firefly", "NovelAI", "ComfyUI")
+# PNG text chunks written by Stable Diffusion front-ends
+AI_TEXT_CHUNKS = ("parameters", "workflow", "sd-metadata", "invokeai_metadata")
+# IPTC DigitalSourceType property of an XMP packet (attribute, element or rdf:resource form)
+DIGITAL_SOURCE_TYPE = re.compile(
+    rb'DigitalSourceType\b[^<>]*?["\'>]\s*https?://cv\.iptc\.org/newscodes/digitalsourcetype/(\w+)'
+)
+
+def detect_ai_signature(img: Image.Image, metadata: Dict[str, Any]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Look for AI-generator provenance in the structured metadata of the image.
+
+    Only fields whose meaning is defined are read: Stable Diffusion PNG text chunks,
+    the IPTC DigitalSourceType of the XMP packet and the Software tag. Captions and
+    comments are free text (a photo may well be captioned "Midjourney founder ...")
+    and are ignored.
+
+    Returns:
+        Tuple[Optional[str], Optional[str]]: The decisive signature found, or None, and
+        a non-decisive hint (a real photo composited with generated content), or None
+    """
+    if img.format == 'PNG':
+        for key in AI_TEXT_CHUNKS:
+            if key in img.info:
+                return f"generator text chunk '{key}'", None
+
+    hint = None
+    for key in ('xmp', 'XML:com.adobe.xmp'):
+        value = img.info.get(key)
+        if not value:
+            continue
+        xmp = value if isinstance(value, bytes) else str(value).encode('utf-8', 'ignore')
+        for source_type in DIGITAL_SOURCE_TYPE.findall(xmp):
+            if source_type == b"trainedAlgorithmicMedia":
+                return "IPTC digital source type: trained algorithmic media", None
+            if source_type == b"compositeWithTrainedAlgorithmicMedia":
+                hint = "IPTC digital source type: composite with trained algorithmic media"
+
+    for software in (img.info.get('Software'), metadata.get('exif_Software')):
+        if isinstance(software, str):
+            name = software.strip().casefold()
+            for generator in AI_SOFTWARE:
+                if name.startswith(generator.casefold()):
+                    return f"Software tag: {software.strip()}", None
+    return None, hint
+
+def estimate_jpeg_quality(img: Image.Image) -> Dict[str, Any]:
+    """
+    Fingerprint the JPEG quantization tables (read from the header, no decoding).
+
+    Encoders built on libjpeg scale the standard table by the quality setting; cameras
+    and some editors use their own tables. An exact match means a software encoder.
+    """
+    tables = getattr(img, 'quantization', None)
+    if not tables or 0 not in tables:
+        return {"present": False}
+    luminance = np.asarray(list(tables[0]), dtype=np.int32)
+    best_quality, best_error = 0, None
+    for quality in range(1, 101):
+        scale = 5000 / quality if quality < 50 else 200 - 2 * quality
+        expected = np.clip((STANDARD_LUMINANCE_TABLE * scale + 50) // 100, 1, 255)
+        error = int(np.abs(expected - luminance).sum())
+        if best_error is None or error < best_error:
+            best_quality, best_error = quality, error
+    return {
+        "present": True,
+        "tables": len(tables),
+        "estimated_quality": best_quality,
+        "standard_tables": best_error == 0
+    }
+
+def _block_view(array: np.ndarray, block: int) -> np.ndarray:
+    height, width = array.shape[0] // block * block, array.shape[1] // block * block
+    return array[:height, :width].reshape(height // block, block, width // block, block)
+
+def error_level_analysis(img: Image.Image, quality: int = 90, block: int = 16) -> Dict[str, float]:
+    """
+    Error level analysis: difference between the image and a JPEG recompression of it.
+    Regions edited after the last save recompress differently from the rest, which
+    shows up as a high spread of per-block error levels (block_cv).
+    """
+    rgb = img.convert('RGB')
+    buffered = io.BytesIO()
+    rgb.save(buffered, format='JPEG', quality=quality)
+    recompressed = np.asarray(Image.open(buffered), dtype=np.int16)
+    diff = np.abs(np.asarray(rgb, dtype=np.int16) - recompressed).max(axis=2).astype(np.float32)
+    block_means = _block_view(diff, block).mean(axis=(1, 3))
+    return {
+        "mean": round(float(diff.mean()), 3),
+        "p99": round(float(np.percentile(diff, 99)), 3),
+        "block_cv": round(float(block_means.std() / (block_means.mean() + 1e-6)), 3)
+    }
+
+def noise_residual_stats(img: Image.Image, block: int = 32) -> Dict[str, float]:
+    """
+    Statistics of the high-frequency noise residual (pixel minus the mean of its 4 neighbours).
+    Camera sensors leave a noise floor with heavy tails; generated and heavily denoised
+    images tend to be unusually clean.
+    """
+    gray = np.asarray(img.convert('L'), dtype=np.float32)
+    if min(gray.shape) < 3:
+        return {"std": 0.0, "kurtosis": 0.0, "block_cv": 0.0}
+    residual = gray[1:-1, 1:-1] - 0.25 * (gray[:-2, 1:-1] + gray[2:, 1:-1] + gray[1:-1, :-2] + gray[1:-1, 2:])
+    residual -= residual.mean()
+    variance = float(np.mean(residual ** 2))
+    kurtosis = float(np.mean(residual ** 4) / (variance ** 2) - 3) if variance > 0 else 0.0
+    block_stds = _block_view(residual, block).std(axis=(1, 3)) if min(residual.shape) >= block else np.array([np.sqrt(variance)])
+    return {
+        "std": round(float(np.sqrt(variance)), 3),
+        "kurtosis": round(kurtosis, 3),
+        "block_cv": round(float(block_stds.std() / (block_stds.mean() + 1e-6)), 3)
+    }
+
+def spectral_peak_stats(magnitude_spectrum: np.ndarray, z_threshold: float = 6.0) -> Dict[str, Any]:
+    """
+    Detect periodic peaks in a centered log-magnitude spectrum.
+
+    The radially averaged profile is removed, so what remains are points that stand out
+    from all frequencies at the same radius. Upsampling layers of image generators leave
+    such isolated off-axis peaks; natural photos rarely do. The axes (image-border
+    artifacts) and the lowest frequencies are ignored.
+    """
+    height, width = magnitude_spectrum.shape
+    yy, xx = np.indices((height, width), dtype=np.float32)
+    dy, dx = yy - height // 2, xx - width // 2
+    radius = np.hypot(dy / max(height / 2, 1), dx / max(width / 2, 1))
+    bins = np.minimum((radius * 64).astype(np.int32), 96)
+    counts = np.bincount(bins.ravel())
+    profile = np.bincount(bins.ravel(), weights=magnitude_spectrum.ravel()) / np.maximum(counts, 1)
+    residual = magnitude_spectrum - profile[bins].astype(np.float32)
+
+    mask = (radius > 0.1) & (radius < 1.0) & (np.abs(dy) > 2) & (np.abs(dx) > 2)
+    values = residual[mask]
+    if values.size < 16 or values.std() == 0:
+        return {"peak_count": 0, "max_z": 0.0, "periodic": False}
+    z = (residual - values.mean()) / values.std()
+
+    # Local maxima above the threshold
+    padded = np.pad(z, 1, mode='constant', constant_values=-np.inf)
+    neighbourhood = np.max(np.stack([
+        padded[1 + oy:1 + oy + height, 1 + ox:1 + ox + width]
+        for oy in (-1, 0, 1) for ox in (-1, 0, 1) if oy or ox
+    ]), axis=0)
+    peaks = mask & (z > z_threshold) & (z >= neighbourhood)
+    peak_count = int(peaks.sum())
+    return {
+        "peak_count": peak_count,
+        "max_z": round(float(z[mask].max()), 2),
+        "periodic": peak_count >= 4
+    }
+
+def triage_image(
+    img: Image.Image,
+    metadata: Dict[str, Any],
+    magnitude_spectrum: np.ndarray,
+    quantization: Dict[str, Any],
+    signature: Optional[str] = None,
+    hint: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Combine the local forensic checks into an AI likelihood with a confidence.
+
+    Args:
+        img: The (resized) image
+        metadata: Output of extract_metadata for the original image
+        magnitude_spectrum: log_magnitude_spectrum of img
+        quantization: estimate_jpeg_quality of the original image
+        signature, hint: detect_ai_signature of the original image
+
+    Returns:
+        Dict[str, Any]: The measurements plus 'ai_probability' (0-100), 'confidence' (0-1),
+        'signals' (list of {'category', 'text', 'points'} explaining the score) and 'decisive'
+        (True only when the file carries a generator signature)
+    """
+    ela = error_level_analysis(img)
+    noise = noise_residual_stats(img)
+    peaks = spectral_peak_stats(magnitude_spectrum)
+    triage = {"ela": ela, "noise": noise, "spectral_peaks": peaks, "quantization": quantization, "signature": signature, "hint": hint}
+
+    signals: List[Dict[str, Any]] = []
+    def signal(category: str, text: str, points: float) -> None:
+        signals.append({"category": category, "text": text, "points": points})
+
+    if signature:
+        signal("metadata", f"AI generator signature in the file: {signature}", 1.0)
+    elif hint:
+        signal("metadata", f"Edited with generative tools: {hint}", 0.3)
+    has_camera = bool(metadata.get('exif_Make') and metadata.get('exif_Model'))
+    if has_camera:
+        signal("metadata", f"Camera EXIF present: {metadata.get('exif_Make')} {metadata.get('exif_Model')}", -0.2)
+        if metadata.get('exif_DateTimeOriginal'):
+            signal("metadata", "Original capture timestamp present", -0.1)
+    elif not any(key.startswith('exif_') and key != 'exif_error' for key in metadata):
+        signal("metadata", "No EXIF metadata", 0.1)
+    if quantization.get("present"):
+        if not quantization["standard_tables"]:
+            signal("metadata", "Custom JPEG quantization tables (typical of camera firmware)", -0.15)
+        elif not has_camera:
+            signal("metadata", f"Standard software JPEG tables (quality ~{quantization['estimated_quality']}) without camera data", 0.05)
+    if noise["std"] < 1.0:
+        signal("noise", f"Unusually clean noise residual (std {noise['std']})", 0.1)
+    elif noise["kurtosis"] > 1.0:
+        signal("noise", f"Natural heavy-tailed sensor-like noise (kurtosis {noise['kurtosis']})", -0.05)
+    if peaks["periodic"]:
+        signal("spectral", f"{peaks['peak_count']} periodic peaks in the spectrum (max z {peaks['max_z']})", 0.2)
+    else:
+        signal("spectral", "No periodic peaks in the spectrum", -0.05)
+    if ela["block_cv"] > 1.5:
+        signal("compression", f"Uneven error levels across blocks (cv {ela['block_cv']}): possible local edits", 0.0)
+
+    ai_points = sum(s["points"] for s in signals if s["points"] > 0)
+    real_points = -sum(s["points"] for s in signals if s["points"] < 0)
+    if signature:
+        probability, confidence = 97, 0.97
+    else:
+        probability = int(round(min(97, max(3, 50 + 90 * (ai_points - real_points)))))
+        confidence = round(min(0.95, 0.4 + abs(ai_points - real_points)), 2)
+    # Camera EXIF and quantization tables are easy to forge, so only positive generator
+    # evidence may decide without the vision model
+    triage.update(ai_probability=probability, confidence=confidence, signals=signals, decisive=bool(signature))
+    return triage
+
+def triage_result(triage: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build an analysis in the vision model's JSON format from a decisive triage.
+    """
+    def clues(*categories: str) -> List[str]:
+        return [s["text"] for s in triage["signals"] if s["category"] in categories]
+    ai = triage["ai_probability"] >= 50
+    return {
+        "ai_probability": triage["ai_probability"],
+        "visual_clues": clues("noise", "compression"),
+        "spectral_clues": clues("spectral"),
+        "metadata_clues": clues("metadata"),
+        "verdict": "Likely AI-generated" if ai else "Likely real",
+        "justification": f"Decided by local forensic checks with confidence {triage['confidence']}: " + "; ".join(
+            s["text"] for s in triage["signals"] if s["points"]
+        ),
+        "recommendation": (
+            "The file itself identifies an image generator; treat it as synthetic unless the publisher proves otherwise."
+            if triage["signature"] else
+            "Camera data and sensor traces are consistent; still confirm the source and context of the photo."
+            if not ai else
+            "Several local indicators point to synthetic content; look for the original source before sharing."
+        ),
+        "triage": triage,
+        "source": "local_triage"
+    }
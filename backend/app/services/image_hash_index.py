@@ -0,0 +1,150 @@
+import copy
+import logging
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, List, Optional, Set, Tuple
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+def hash_bands(value: int, bands: int, bits: int = HASH_BITS) -> List[Tuple[int, int]]:
+    """Split a hash into `bands` contiguous bit ranges, as (band number, band value) pairs."""
+    result = []
+    start = 0
+    for band in range(bands):
+        width = bits // bands + (1 if band < bits % bands else 0)
+        result.append((band, (value >> start) & ((1 << width) - 1)))
+        start += width
+    return result
+
+def _json_safe(value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    return str(value)
+
+def metadata_differences(stored: Dict[str, Any], uploaded: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Fields whose value differs between the stored and the uploaded image metadata."""
+    differences = {}
+    for key in sorted(set(stored) | set(uploaded)):
+        old, new = _json_safe(stored.get(key)), _json_safe(uploaded.get(key))
+        if old != new:
+            differences[key] = {"stored": old, "uploaded": new}
+    return differences
+
+class ImageHashIndex:
+    """
+    Index of analyzed images by content digest and perceptual hashes (pHash + dHash).
+
+    An upload matches a stored image when its bytes are identical, or when both
+    perceptual hashes are within IMAGE_HASH_MAX_DISTANCE bits, which covers
+    recompressed and resized copies. Entries expire after IMAGE_HASH_TTL_SECONDS and
+    the least recently used ones are evicted beyond IMAGE_HASH_INDEX_SIZE.
+
+    Near-duplicate lookups use multi-index hashing: the pHash is split into
+    IMAGE_HASH_MAX_DISTANCE + 1 bands, and two hashes within that distance share at
+    least one band exactly, so only entries sharing a band are compared.
+    """
+
+    def __init__(self):
+        self.max_entries = settings.IMAGE_HASH_INDEX_SIZE
+        self.max_distance = settings.IMAGE_HASH_MAX_DISTANCE
+        self.ttl_seconds = settings.IMAGE_HASH_TTL_SECONDS
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.bands = self.max_distance + 1
+        # (band number, band value) -> digests of the entries whose pHash has that band
+        self.band_index: Dict[Tuple[int, int], Set[str]] = {}
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, hashes: Dict[str, Any], result: Dict[str, Any]) -> None:
+        """Store the analysis result of an image described by run_image_hashing output."""
+        key = hashes["sha256"]
+        with self._lock:
+            self._remove(key)
+            self.entries[key] = {
+                "phash": hashes["phash"],
+                "dhash": hashes["dhash"],
+                "metadata": hashes["metadata"],
+                "result": copy.deepcopy(result),
+                "stored_at": time.time()
+            }
+            for band in hash_bands(hashes["phash"], self.bands):
+                self.band_index.setdefault(band, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+
+    def _remove(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for band in hash_bands(entry["phash"], self.bands):
+            keys = self.band_index.get(band)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.band_index[band]
+
+    def lookup(self, hashes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Find a stored result for an image.
+
+        Returns:
+            Optional[Dict[str, Any]]: The stored result plus a 'cache' field describing the
+            match ('exact' or 'near', Hamming distance, metadata differences), or None
+        """
+        now = time.time()
+        with self._lock:
+            match_key, match, distance = None, None, None
+            entry = self.entries.get(hashes["sha256"])
+            if entry is not None and now - entry["stored_at"] <= self.ttl_seconds:
+                match_key, match, distance = hashes["sha256"], entry, 0
+            else:
+                best = self.max_distance + 1
+                candidates: Set[str] = set()
+                for band in hash_bands(hashes["phash"], self.bands):
+                    candidates |= self.band_index.get(band, set())
+                for key in candidates:
+                    candidate = self.entries[key]
+                    if now - candidate["stored_at"] > self.ttl_seconds:
+                        continue
+                    d = max(
+                        hamming_distance(candidate["phash"], hashes["phash"]),
+                        hamming_distance(candidate["dhash"], hashes["dhash"])
+                    )
+                    if d < best:
+                        match_key, match, distance, best = key, candidate, d, d
+            if match is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(match_key)
+            self.hits += 1
+
+        result = copy.deepcopy(match["result"])
+        result["cache"] = {
+            "match": "exact" if match_key == hashes["sha256"] else "near",
+            "hamming_distance": distance,
+            "metadata_differences": metadata_differences(match["metadata"], hashes["metadata"])
+        }
+        logger.info(f"Image matched a stored analysis ({result['cache']['match']}, distance {distance})")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "max_distance": self.max_distance,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+# Global instance
+image_hash_index = ImageHashIndex()
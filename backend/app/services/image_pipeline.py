@@ -0,0 +1,200 @@
+import asyncio
+import base64
+import hashlib
+import io
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Union
+from PIL import Image
+from ..core.config import settings
+from ..utils.profiler import active_profile, sample_current_thread
+from .image_analysis import (
+    analyze_image_spectrum, log_magnitude_spectrum, extract_metadata, open_reduced, resize_image, encode_image,
+    compute_dhash, compute_phash, detect_ai_signature, estimate_jpeg_quality, triage_image
+)
+
+logger = logging.getLogger(__name__)
+
+class ImagePipelineBusy(Exception):
+    """Raised when the image pipeline queue is full."""
+
+# An image source is either the raw upload bytes or the path of the spooled upload
+ImageSource = Union[bytes, str]
+
+def _open_image(source: ImageSource) -> Image.Image:
+    # Opening only parses the header; pixels are decoded on first access.
+    # BytesIO over an immutable bytes object shares its buffer instead of copying it
+    return Image.open(source if isinstance(source, str) else io.BytesIO(source))
+
+def _sha256(source: ImageSource) -> str:
+    if isinstance(source, bytes):
+        return hashlib.sha256(source).hexdigest()
+    digest = hashlib.sha256()
+    with open(source, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+def run_image_pipeline(source: ImageSource) -> Dict[str, Any]:
+    """
+    CPU stage of the image analysis, executed in a worker process.
+
+    Decodes the upload (JPEGs at reduced scale), resizes it for the vision model,
+    computes the FFT spectrum, runs the local forensic triage, encodes both images
+    within the configured byte budget and extracts the metadata.
+
+    Args:
+        source: The raw uploaded image bytes or the path of the spooled upload
+
+    Returns:
+        Dict[str, Any]: 'image_base64', 'image_mime', 'spectrum_base64', 'spectrum_mime',
+        'metadata', 'triage' (None if disabled), 'resized_size', 'encoded_bytes' and
+        per-stage 'timings_ms'
+    """
+    timings = {}
+    encode_options = {
+        "image_format": settings.IMAGE_ENCODE_FORMAT,
+        "target_bytes": settings.IMAGE_TARGET_BYTES,
+        "max_quality": settings.IMAGE_ENCODE_MAX_QUALITY,
+        "min_quality": settings.IMAGE_ENCODE_MIN_QUALITY
+    }
+
+    start = time.perf_counter()
+    img = _open_image(source)
+    metadata = extract_metadata(img)  # Use original image for metadata (header only)
+    # Header-level forensics, before the reduced decode changes the image
+    quantization = estimate_jpeg_quality(img)
+    signature, hint = detect_ai_signature(img, metadata)
+    open_reduced(img)
+    img.load()
+    timings["decode"] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    resized_img = resize_image(img)
+    timings["resize"] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    magnitude_spectrum = log_magnitude_spectrum(resized_img)
+    timings["spectrum"] = _elapsed_ms(start)
+
+    triage = None
+    if settings.IMAGE_TRIAGE_ENABLED:
+        start = time.perf_counter()
+        triage = triage_image(resized_img, metadata, magnitude_spectrum, quantization, signature, hint)
+        timings["triage"] = _elapsed_ms(start)
+
+    start = time.perf_counter()
+    spectrum = analyze_image_spectrum(resized_img, magnitude_spectrum)
+    timings["spectrum"] = round(timings["spectrum"] + _elapsed_ms(start), 2)
+
+    start = time.perf_counter()
+    image_bytes, image_mime = encode_image(resized_img, **encode_options)
+    spectrum_bytes, spectrum_mime = encode_image(spectrum, **encode_options)
+    timings["encode"] = _elapsed_ms(start)
+
+    return {
+        "image_base64": base64.b64encode(image_bytes).decode(),
+        "image_mime": image_mime,
+        "spectrum_base64": base64.b64encode(spectrum_bytes).decode(),
+        "spectrum_mime": spectrum_mime,
+        "metadata": metadata,
+        "triage": triage,
+        "resized_size": resized_img.size,
+        "encoded_bytes": {"image": len(image_bytes), "spectrum": len(spectrum_bytes)},
+        "timings_ms": timings
+    }
+
+def run_image_hashing(source: ImageSource) -> Dict[str, Any]:
+    """
+    Cheap first stage, executed in a worker process: content digest, perceptual hashes
+    and metadata, used to look up earlier results before the full pipeline runs.
+
+    Args:
+        source: The raw uploaded image bytes or the path of the spooled upload
+
+    Returns:
+        Dict[str, Any]: 'sha256', 'phash', 'dhash' and 'metadata'
+    """
+    img = _open_image(source)
+    metadata = extract_metadata(img)
+    # JPEGs can be decoded directly at a reduced scale; hashes only need a thumbnail
+    img.draft('RGB', (256, 256))
+    return {
+        "sha256": _sha256(source),
+        "phash": compute_phash(img),
+        "dhash": compute_dhash(img),
+        "metadata": metadata
+    }
+
+class ImagePipeline:
+    """
+    Runs the image CPU stages in a bounded process pool so they never block the event loop.
+
+    At most IMAGE_WORKERS images are processed at once and IMAGE_MAX_QUEUE more may wait;
+    beyond that, process() raises ImagePipelineBusy so the API can reject early.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, max_queue: Optional[int] = None):
+        self.max_workers = max_workers or settings.IMAGE_WORKERS or os.cpu_count() or 1
+        self.max_queue = settings.IMAGE_MAX_QUEUE if max_queue is None else max_queue
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.in_flight = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created lazily so importing this module never forks worker processes
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            logger.info(f"Image process pool started with {self.max_workers} workers")
+        return self.executor
+
+    async def run(self, func, *args) -> Any:
+        """Run a picklable CPU-bound function in the pool, enforcing the queue-depth limit."""
+        if self.in_flight >= self.max_workers + self.max_queue:
+            raise ImagePipelineBusy(f"Image pipeline is full ({self.in_flight} images in progress)")
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory): start a fresh pool for the next request
+            logger.error("Image process pool is broken, restarting it")
+            self.executor = None
+            raise
+        finally:
+            self.in_flight -= 1
+
+    async def process(self, source: ImageSource) -> Dict[str, Any]:
+        """Run the full CPU stage for one uploaded image (bytes or spooled file path)."""
+        profile = active_profile()
+        if profile is None:
+            return await self.run(run_image_pipeline, source)
+        # Profiled request: the worker samples itself and its stacks join the request's profile
+        sampled = await self.run(sample_current_thread, run_image_pipeline, profile.interval, source)
+        profile.add_stacks(sampled["stacks"], root="image_worker")
+        return sampled["result"]
+
+    async def hash(self, source: ImageSource) -> Dict[str, Any]:
+        """Compute the content digest, perceptual hashes and metadata of an uploaded image."""
+        return await self.run(run_image_hashing, source)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight
+        }
+
+    def shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+            logger.info("Image process pool stopped")
+
+# Global instance
+image_pipeline = ImagePipeline()
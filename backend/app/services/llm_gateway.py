@@ -0,0 +1,411 @@
+"""
+Gateway for upstream model calls (OpenAI completions, ElevenLabs TTS).
+Every call waits for a concurrency slot and rate-limit tokens in priority order,
+is retried with jittered backoff within a retry budget, and fails fast while the
+upstream's circuit breaker is open.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from enum import IntEnum
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple, TypeVar
+import aiohttp
+import httpx
+import openai
+from openai import AsyncOpenAI
+from ..core.config import settings
+from ..utils.metrics import upstream
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Rough prompt size estimate for the per-model token buckets (no tokenizer dependency)
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = 1000
+
+class LLMGatewayBusy(Exception):
+    """Raised when a call waited too long for a slot or rate-limit tokens."""
+
+class LLMCircuitOpen(LLMGatewayBusy):
+    """Raised while an upstream's circuit breaker is open."""
+
+class Priority(IntEnum):
+    """Lower values are served first."""
+    INTERACTIVE = 0  # Chat: a user is waiting on every token
+    STANDARD = 1     # Translation, TTS
+    BATCH = 2        # Text and image analysis
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    # openai/elevenlabs errors carry status_code, aiohttp errors carry status
+    status = getattr(exc, "status_code", None) or getattr(exc, "status", None)
+    return status if isinstance(status, int) else None
+
+def is_retryable(exc: BaseException) -> bool:
+    """Timeouts, connection errors, 408/409/429 and 5xx responses are worth retrying."""
+    status = _status_code(exc)
+    if status is not None:
+        return status in (408, 409, 429) or status >= 500
+    return isinstance(exc, (openai.APIConnectionError, httpx.TransportError, aiohttp.ClientConnectionError, asyncio.TimeoutError, ConnectionError))
+
+def is_upstream_failure(exc: BaseException) -> bool:
+    """Errors that count against the circuit breaker (rate limiting and client errors do not)."""
+    status = _status_code(exc)
+    if status is not None:
+        return status >= 500
+    return is_retryable(exc)
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    try:
+        return float(headers.get("retry-after")) if headers else None
+    except (TypeError, ValueError):
+        return None
+
+def estimate_request_tokens(messages: List[Dict[str, Any]], max_tokens: int = 0) -> int:
+    """Prompt tokens (text parts plus a flat cost per image) and the completion allowance."""
+    tokens = max_tokens
+    for message in messages:
+        content = message.get("content")
+        parts = content if isinstance(content, list) else [{"type": "text", "text": content or ""}]
+        for part in parts:
+            if part.get("type") == "text":
+                tokens += len(part.get("text") or "") // CHARS_PER_TOKEN + 1
+            else:
+                tokens += IMAGE_TOKENS
+    return tokens
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at `rate` tokens per second up to `capacity`.
+
+    Requests larger than the capacity are charged the full capacity, so they wait
+    for a full bucket instead of forever.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    @classmethod
+    def per_minute(cls, limit: float) -> "TokenBucket":
+        return cls(limit / 60, limit)
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, cost: float, now: float) -> float:
+        """Seconds until `cost` tokens are available (0 if they are now)."""
+        self._refill(now)
+        missing = min(cost, self.capacity) - self.tokens
+        return 0.0 if missing <= 0 else missing / self.rate
+
+    def take(self, cost: float) -> None:
+        self.tokens -= min(cost, self.capacity)
+
+    def available(self, now: float) -> float:
+        self._refill(now)
+        return self.tokens
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive upstream failures and rejects calls for
+    `reset_seconds`; then lets a single trial call through (half-open), which closes
+    the circuit on success or reopens it on failure.
+    """
+
+    def __init__(self, name: str, threshold: int, reset_seconds: float):
+        self.name = name
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.opened_total = 0
+
+    def check(self) -> None:
+        """Raise LLMCircuitOpen unless a call may go through now."""
+        if self.state == "closed":
+            return
+        remaining = self.opened_at + self.reset_seconds - time.monotonic()
+        if self.state == "open" and remaining <= 0:
+            self.state = "half_open"
+        if self.state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return
+        raise LLMCircuitOpen(f"{self.name} is unavailable (circuit open, retry in {max(remaining, 1):.0f}s)")
+
+    def record_success(self) -> None:
+        if self.state != "closed":
+            logger.info(f"Circuit for {self.name} closed")
+        self.state = "closed"
+        self.failures = 0
+        self.trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.state == "half_open" or self.failures >= self.threshold:
+            if self.state != "open":
+                self.opened_total += 1
+                logger.warning(f"Circuit for {self.name} opened after {self.failures} consecutive failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self.failures, "opened_total": self.opened_total}
+
+class _Waiter:
+    def __init__(self, priority: Priority, seq: int, provider: str, costs: List[Tuple[TokenBucket, float]]):
+        self.priority = priority
+        self.seq = seq
+        self.provider = provider
+        self.costs = costs
+        self.future: asyncio.Future = asyncio.get_running_loop().create_future()
+
+class LLMGateway:
+    """
+    Admission, rate limiting, retries and circuit breaking for upstream model calls.
+
+    A call needs a concurrency slot of its provider (LLM_MAX_CONCURRENCY for OpenAI,
+    ELEVENLABS_TTS_MAX_CONCURRENCY for ElevenLabs) and tokens from the request-per-minute
+    buckets of its model and endpoint, plus the model's token-per-minute bucket for
+    completions. Waiting calls are served by priority, then arrival; a waiter blocked on
+    a bucket holds it, so lower priorities cannot drain it first. Calls that wait
+    longer than LLM_QUEUE_TIMEOUT_SECONDS fail with LLMGatewayBusy.
+
+    Each attempt goes through admission again, so retries are rate limited too, and
+    retries are capped at LLM_RETRY_BUDGET_RATIO of calls to avoid amplifying an
+    upstream overload. Each model has a circuit breaker.
+    """
+
+    def __init__(self):
+        self.client = AsyncOpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL or None,
+            max_retries=0,  # Retries are done here, through admission control
+            timeout=settings.LLM_TIMEOUT_SECONDS,
+        )
+        self.concurrency = {
+            "openai": settings.LLM_MAX_CONCURRENCY,
+            "elevenlabs": settings.ELEVENLABS_TTS_MAX_CONCURRENCY
+        }
+        self.queue_timeout = settings.LLM_QUEUE_TIMEOUT_SECONDS
+        self.max_retries = settings.LLM_MAX_RETRIES
+        self.in_flight: Dict[str, int] = {provider: 0 for provider in self.concurrency}
+        self.buckets: Dict[str, TokenBucket] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._waiters: List[_Waiter] = []
+        self._seq = 0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+        self.retry_budget = settings.LLM_RETRY_BUDGET_MAX
+        self.calls_total = 0
+        self.retries_total = 0
+        self.errors_total = 0
+        self.rejected_total = 0
+
+    # Admission
+
+    def _bucket(self, key: str, limit_per_minute: float) -> TokenBucket:
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket.per_minute(limit_per_minute)
+        return bucket
+
+    def _costs(self, model: str, endpoint: str, tokens: int) -> List[Tuple[TokenBucket, float]]:
+        costs = [
+            (self._bucket(f"model:{model}:requests", settings.LLM_MODEL_RPM), 1),
+            (self._bucket(f"endpoint:{endpoint}", settings.LLM_ENDPOINT_RPM.get(endpoint, settings.LLM_MODEL_RPM)), 1)
+        ]
+        if tokens:
+            costs.append((self._bucket(f"model:{model}:tokens", settings.LLM_MODEL_TPM), tokens))
+        return costs
+
+    async def _acquire(self, provider: str, model: str, endpoint: str, priority: Priority, tokens: int) -> None:
+        self._seq += 1
+        waiter = _Waiter(priority, self._seq, provider, self._costs(model, endpoint, tokens))
+        self._waiters.append(waiter)
+        self._dispatch()
+        try:
+            await asyncio.wait_for(waiter.future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            self.rejected_total += 1
+            raise LLMGatewayBusy(f"Timed out after {self.queue_timeout:g}s waiting for {provider} capacity ({endpoint})")
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+
+    def _abandon(self, waiter: _Waiter) -> None:
+        if waiter in self._waiters:
+            self._waiters.remove(waiter)
+        elif waiter.future.done() and not waiter.future.cancelled():
+            # Granted just as the wait ended: give the slot back
+            self._release(waiter.provider)
+
+    def _release(self, provider: str) -> None:
+        self.in_flight[provider] -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Grant slots and tokens to waiters in priority order."""
+        now = time.monotonic()
+        held: set = set()
+        next_check: Optional[float] = None
+        for waiter in sorted(self._waiters, key=lambda w: (w.priority, w.seq)):
+            if waiter.future.done():
+                self._waiters.remove(waiter)
+                continue
+            if self.in_flight[waiter.provider] >= self.concurrency[waiter.provider]:
+                continue  # Woken again by _release
+            if any(id(bucket) in held for bucket, _ in waiter.costs):
+                continue
+            wait = max(bucket.wait_time(cost, now) for bucket, cost in waiter.costs)
+            if wait > 0:
+                held.update(id(bucket) for bucket, _ in waiter.costs)
+                next_check = wait if next_check is None else min(next_check, wait)
+                continue
+            for bucket, cost in waiter.costs:
+                bucket.take(cost)
+            self.in_flight[waiter.provider] += 1
+            self._waiters.remove(waiter)
+            waiter.future.set_result(True)
+
+        if self._wakeup is not None:
+            self._wakeup.cancel()
+            self._wakeup = None
+        if next_check is not None:
+            self._wakeup = asyncio.get_running_loop().call_later(next_check, self._dispatch)
+
+    # Calls
+
+    def _breaker(self, model: str) -> CircuitBreaker:
+        breaker = self.breakers.get(model)
+        if breaker is None:
+            breaker = self.breakers[model] = CircuitBreaker(
+                model, settings.LLM_BREAKER_FAILURE_THRESHOLD, settings.LLM_BREAKER_RESET_SECONDS
+            )
+        return breaker
+
+    def _backoff(self, attempt: int, exc: BaseException) -> float:
+        # Full jitter, raised to the upstream's Retry-After when it sends one
+        delay = random.uniform(0, min(settings.LLM_RETRY_MAX_SECONDS, settings.LLM_RETRY_BASE_SECONDS * 2 ** attempt))
+        retry_after = _retry_after(exc)
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, settings.LLM_RETRY_MAX_SECONDS))
+        return delay
+
+    async def _run(self, provider: str, model: str, endpoint: str, priority: Priority,
+                   func: Callable[[], Awaitable[T]], tokens: int, hold: bool = False) -> T:
+        """Run func through admission, retries and the circuit breaker. With hold=True the
+        concurrency slot stays taken after success and the caller must release it."""
+        breaker = self._breaker(model)
+        self.calls_total += 1
+        self.retry_budget = min(settings.LLM_RETRY_BUDGET_MAX, self.retry_budget + settings.LLM_RETRY_BUDGET_RATIO)
+        attempt = 0
+        while True:
+            breaker.check()
+            try:
+                await self._acquire(provider, model, endpoint, priority, tokens)
+            except BaseException:
+                # Never reached the upstream: frees a half-open trial without a verdict
+                breaker.trial_in_flight = False
+                raise
+            try:
+                # Metrics time each attempt (opening only, for streams) and count its failures
+                with upstream(provider):
+                    result = await func()
+            except asyncio.CancelledError:
+                breaker.trial_in_flight = False
+                self._release(provider)
+                raise
+            except Exception as e:
+                self._release(provider)
+                if is_upstream_failure(e):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+                if not is_retryable(e) or attempt >= self.max_retries or self.retry_budget < 1 or breaker.state == "open":
+                    self.errors_total += 1
+                    raise
+                self.retry_budget -= 1
+                delay = self._backoff(attempt, e)
+                attempt += 1
+                self.retries_total += 1
+                logger.warning(f"{model} call for {endpoint} failed ({type(e).__name__}: {e}), retry {attempt}/{self.max_retries} in {delay:.2f}s")
+                await asyncio.sleep(delay)
+                continue
+            breaker.record_success()
+            if not hold:
+                self._release(provider)
+            return result
+
+    async def call(self, provider: str, model: str, endpoint: str, priority: Priority,
+                   func: Callable[[], Awaitable[T]], tokens: int = 0) -> T:
+        """
+        Run an upstream call through the gateway.
+
+        Args:
+            provider: Concurrency pool ('openai' or 'elevenlabs')
+            model: Model id, used for the model buckets and the circuit breaker
+            endpoint: Caller name, used for the endpoint bucket
+            priority: Scheduling priority
+            func: Coroutine function performing one attempt
+            tokens: Estimated tokens, charged to the model's token bucket (0 skips it)
+
+        Raises:
+            LLMGatewayBusy: The call could not be admitted in time or the circuit is open
+        """
+        return await self._run(provider, model, endpoint, priority, func, tokens)
+
+    async def chat_completion(self, endpoint: str, priority: Priority = Priority.STANDARD, **kwargs) -> Any:
+        """client.chat.completions.create(**kwargs) through the gateway."""
+        tokens = estimate_request_tokens(kwargs["messages"], kwargs.get("max_tokens") or 0)
+        return await self._run(
+            "openai", kwargs["model"], endpoint, priority,
+            lambda: self.client.chat.completions.create(**kwargs), tokens
+        )
+
+    async def chat_completion_stream(self, endpoint: str, priority: Priority = Priority.INTERACTIVE, **kwargs) -> AsyncIterator[Any]:
+        """
+        Streaming completion through the gateway. Only opening the stream is retried; the
+        concurrency slot is held until the stream is consumed or closed.
+        """
+        tokens = estimate_request_tokens(kwargs["messages"], kwargs.get("max_tokens") or 0)
+        stream = await self._run(
+            "openai", kwargs["model"], endpoint, priority,
+            lambda: self.client.chat.completions.create(stream=True, **kwargs), tokens, hold=True
+        )
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            self._release("openai")
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        queued: Dict[str, int] = {}
+        for waiter in self._waiters:
+            queued[waiter.priority.name.lower()] = queued.get(waiter.priority.name.lower(), 0) + 1
+        return {
+            "in_flight": dict(self.in_flight),
+            "max_concurrency": dict(self.concurrency),
+            "queued": queued,
+            "buckets": {key: round(bucket.available(now), 1) for key, bucket in self.buckets.items()},
+            "breakers": {model: breaker.stats() for model, breaker in self.breakers.items()},
+            "retry_budget": round(self.retry_budget, 1),
+            "calls_total": self.calls_total,
+            "retries_total": self.retries_total,
+            "errors_total": self.errors_total,
+            "rejected_total": self.rejected_total
+        }
+
+# Global instance (limits are per worker process)
+llm_gateway = LLMGateway()
@@ -0,0 +1,211 @@
+import glob
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter, OrderedDict
+from threading import Lock
+from typing import Any, Dict, List, Optional
+from ..core.config import settings
+from ..utils.text_normalize import normalize_query
+from ..utils.text_chunker import split_text_into_chunks
+
+logger = logging.getLogger(__name__)
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+PASSAGE_CHARS = 600
+SNIPPET_CHARS = 300
+
+STOPWORDS = {
+    # Español
+    "el", "la", "los", "las", "un", "una", "unos", "unas", "de", "del", "al", "y", "o", "que", "en", "es",
+    "por", "para", "con", "se", "su", "sus", "lo", "como", "mas", "pero", "este", "esta", "esto", "fue",
+    # Inglés
+    "the", "a", "an", "of", "and", "or", "to", "in", "is", "are", "was", "were", "for", "on", "with",
+    "that", "this", "it", "as", "by", "be", "at", "from"
+}
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, accent-free word tokens without stopwords."""
+    return [t for t in TOKEN_RE.findall(normalize_query(text)) if (len(t) > 1 or t.isdigit()) and t not in STOPWORDS]
+
+class BM25Index:
+    """
+    Incrementally updated in-memory inverted index with BM25 ranking.
+
+    Documents can be added or replaced at any time; when max_documents is exceeded
+    the oldest documents are evicted.
+
+    Args:
+        k1: BM25 term-frequency saturation
+        b: BM25 length normalization
+        max_documents: Maximum number of indexed documents
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, max_documents: int = 20000):
+        self.k1 = k1
+        self.b = b
+        self.max_documents = max_documents
+        self.postings: Dict[str, Dict[str, int]] = {}
+        self.documents: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.total_length = 0
+        self._lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def add(self, doc_id: str, text: str, metadata: Optional[Dict[str, Any]] = None) -> None:
+        """Index (or re-index) a document."""
+        terms = Counter(tokenize(text))
+        if not terms:
+            return
+        with self._lock:
+            self._remove(doc_id)
+            for term, tf in terms.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+            length = sum(terms.values())
+            self.documents[doc_id] = {"text": text, "terms": terms, "length": length, "metadata": metadata or {}}
+            self.total_length += length
+            while len(self.documents) > self.max_documents:
+                self._remove(next(iter(self.documents)))
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id: str) -> None:
+        doc = self.documents.pop(doc_id, None)
+        if doc is None:
+            return
+        self.total_length -= doc["length"]
+        for term in doc["terms"]:
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self.postings[term]
+
+    def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
+        """
+        Return the k best documents for query.
+
+        Returns:
+            List[Dict[str, Any]]: Hits with 'doc_id', 'score', 'text', 'metadata' and 'matched_terms'
+        """
+        query_terms = set(tokenize(query))
+        with self._lock:
+            n_docs = len(self.documents)
+            if not n_docs or not query_terms:
+                return []
+            avg_length = self.total_length / n_docs
+            scores: Dict[str, float] = {}
+            matched: Dict[str, set] = {}
+            for term in query_terms:
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id, tf in docs.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.documents[doc_id]["length"] / avg_length)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+                    matched.setdefault(doc_id, set()).add(term)
+            best = sorted(scores.items(), key=lambda item: -item[1])[:k]
+            return [
+                {
+                    "doc_id": doc_id,
+                    "score": score,
+                    "text": self.documents[doc_id]["text"],
+                    "metadata": self.documents[doc_id]["metadata"],
+                    "matched_terms": matched[doc_id]
+                }
+                for doc_id, score in best
+            ]
+
+    @staticmethod
+    def coverage(query: str, hits: List[Dict[str, Any]]) -> float:
+        """Fraction of the query terms found in at least one hit (a cheap recall estimate)."""
+        query_terms = set(tokenize(query))
+        if not query_terms:
+            return 0.0
+        found = set().union(*(hit["matched_terms"] for hit in hits)) if hits else set()
+        return len(found & query_terms) / len(query_terms)
+
+    def add_passages(self, parent_id: str, text: str, metadata: Dict[str, Any]) -> None:
+        """Index a long text as passages so hits point at the relevant part."""
+        for idx, (passage, _) in enumerate(split_text_into_chunks(text, PASSAGE_CHARS)):
+            self.add(f"{parent_id}:{idx}", passage, metadata)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "documents": len(self.documents),
+            "terms": len(self.postings),
+            "max_documents": self.max_documents
+        }
+
+def content_hash(text: str) -> str:
+    """Hash of a text's tokens, so the same article matches whatever its spacing or case."""
+    return hashlib.sha256(" ".join(tokenize(text)).encode("utf-8")).hexdigest()
+
+def hit_to_result(hit: Dict[str, Any]) -> Dict[str, str]:
+    """Convert an index hit into the search-result shape used by the chat ('title', 'snippet', 'url', 'source')."""
+    metadata = hit["metadata"]
+    snippet = metadata.get("snippet") or hit["text"][:SNIPPET_CHARS]
+    return {
+        "title": metadata.get("title", ""),
+        "snippet": snippet,
+        "url": metadata.get("url", ""),
+        "source": metadata.get("source", "web")
+    }
+
+def index_search_results(results: List[Dict[str, str]]) -> None:
+    """Add web search results (title + snippet) to the local index, keyed by URL."""
+    if not settings.LOCAL_INDEX_ENABLED:
+        return
+    for result in results:
+        if result.get("url"):
+            local_index.add(
+                f"web:{result['url']}",
+                f"{result.get('title', '')}\n{result.get('snippet', '')}",
+                {"source": "web", "title": result.get("title", ""), "snippet": result.get("snippet", ""), "url": result["url"]}
+            )
+
+def index_analysis(analysis_id: str, tipo_analisis: str, input_original: str, resultado: Dict[str, Any], fecha: str) -> None:
+    """Add a stored text analysis (article text and its explanation) to the local index."""
+    if not settings.LOCAL_INDEX_ENABLED or tipo_analisis != "texto" or not input_original:
+        return
+    explanation = resultado.get("analysis_explanation") if isinstance(resultado, dict) else None
+    text = input_original
+    if explanation:
+        text += "\n\n" + json.dumps(explanation, ensure_ascii=False)
+    local_index.add_passages(
+        f"analysis:{analysis_id}",
+        text,
+        {
+            "source": "analysis",
+            "title": f"Earlier TruthLens analysis ({fecha[:10]})",
+            "url": f"truthlens://analysis/{analysis_id}",
+            "analysis_id": analysis_id,
+            # Lets the chat leave out the analysis of the article it is verifying
+            "content_hash": content_hash(input_original)
+        }
+    )
+
+def index_saved_analyses(storage_dir: str) -> int:
+    """Seed the index from the local analysis backups written by StorageService."""
+    count = 0
+    for path in glob.glob(os.path.join(storage_dir, "*_analysis.json")):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            analysis_id = os.path.basename(path)[:-len("_analysis.json")]
+            index_analysis(analysis_id, data.get("tipo_analisis", ""), data.get("input_original", ""), data.get("resultado") or {}, data.get("fecha", ""))
+            count += 1
+        except (OSError, ValueError) as e:
+            logger.error(f"Error indexing saved analysis {path}: {e}")
+    logger.info(f"Local index seeded with {count} saved analyses ({len(local_index)} passages)")
+    return count
+
+# Global instance shared by the storage service and the chat
+local_index = BM25Index(max_documents=settings.LOCAL_INDEX_MAX_DOCUMENTS)
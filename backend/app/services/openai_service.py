@@ -1,20 +1,24 @@
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
 import logging
 import json
-from openai import AsyncOpenAI
+from contextlib import aclosing
 from ..models.schemas import AnalysisResponse
 from ..core.config import settings
 from .storage_service import StorageService
+from .chat_history import ChatHistoryManager, estimate_tokens
+from .chat_context import ChatContextCache
+from .answer_cache import ChatAnswerCache
+from .fact_check import FactCheckPipeline
+from .llm_gateway import llm_gateway, LLMGatewayBusy, Priority
+from ..utils.metrics import stage
+from ..utils.text_normalize import normalize, normalize_query
 from ..models.schemas import PoliticalBias
-from ..utils.retriever import search_web
-import unicodedata
 from ..prompts.analysis_prompts import (
     get_analysis_prompt,
     get_system_prompt,
     get_web_search_instructions,
     get_image_forensics_prompt
 )
-from ..prompts.chat_prompts import get_chat_system_prompt
 import os
 
 # Configure logging
@@ -28,25 +32,20 @@ TRIGGER_KEYWORDS = [
     "truth", "verify", "source", "fact check", "fact-check", "check this", "is it true", "analyze", "search online"
 ]
 
-def normalize(text):
-    return ''.join(
-        c for c in unicodedata.normalize('NFD', text.lower())
-        if unicodedata.category(c) != 'Mn'
-    )
-
 def should_use_web_search(message: str, use_web_search_flag: bool = False) -> bool:
     norm_msg = normalize(message)
     return use_web_search_flag or any(kw in norm_msg for kw in TRIGGER_KEYWORDS)
 
 class OpenAIService:
     def __init__(self):
-        self.client = AsyncOpenAI(
-            api_key=settings.OPENAI_API_KEY,
-            max_retries=2,
-            timeout=60.0,
-        )
+        # Shared by every service instance: concurrency, rate limits, retries and circuit breaking
+        self.gateway = llm_gateway
         self.model = settings.OPENAI_MODEL
         self.storage = StorageService()
+        self.history = ChatHistoryManager(self.gateway)
+        self.fact_check = FactCheckPipeline()
+        self.context_cache = ChatContextCache()
+        self.answer_cache = ChatAnswerCache()
 
     async def analyze_text(
         self,
@@ -55,10 +54,13 @@ class OpenAIService:
         title: Optional[str] = None
     ) -> AnalysisResponse:
         # Prepare the prompt
-        prompt = get_analysis_prompt(text, url, title)
+        with stage("prompt_build"):
+            prompt = get_analysis_prompt(text, url, title)
 
         # Call OpenAI API
-        response = await self.client.chat.completions.create(
+        response = await self.gateway.chat_completion(
+            "analyze",
+            Priority.BATCH,
             model=self.model,
             messages=[
                 {"role": "system", "content": get_system_prompt()},
@@ -73,52 +75,53 @@ class OpenAIService:
         analysis_text = response.choices[0].message.content
         
         try:
-            # Parse the JSON response
-            analysis_data = json.loads(analysis_text)
-
-            # Valores por defecto para campos opcionales
-            default_article_type = {
-                "objective": 0,
-                "subjective": 0,
-                "speculative": 0,
-                "emotive": 0,
-                "clickbait": 0
-            }
-            default_sentiments = {
-                "joy": 0,
-                "trust": 0,
-                "fear": 0,
-                "surprise": 0,
-                "sadness": 0,
-                "disgust": 0,
-                "anger": 0,
-                "anticipation": 0
-            }
-            article_type = analysis_data.get("article_type") or default_article_type
-            sentiments = analysis_data.get("sentiments") or default_sentiments
+            with stage("json_parse"):
+                # Parse and validate the JSON response
+                analysis_data = json.loads(analysis_text)
 
-            # Validación extra para sentiments
-            if not isinstance(sentiments, dict):
-                sentiments = default_sentiments
+                # Valores por defecto para campos opcionales
+                default_article_type = {
+                    "objective": 0,
+                    "subjective": 0,
+                    "speculative": 0,
+                    "emotive": 0,
+                    "clickbait": 0
+                }
+                default_sentiments = {
+                    "joy": 0,
+                    "trust": 0,
+                    "fear": 0,
+                    "surprise": 0,
+                    "sadness": 0,
+                    "disgust": 0,
+                    "anger": 0,
+                    "anticipation": 0
+                }
+                article_type = analysis_data.get("article_type") or default_article_type
+                sentiments = analysis_data.get("sentiments") or default_sentiments
 
-            # Convert the bias string to the corresponding PoliticalBias enum value
-            try:
-                bias_enum = PoliticalBias(analysis_data["bias"].lower())
-            except ValueError:
-                bias_enum = PoliticalBias.OTHER
-
-            # Create the analysis response
-            analysis_response = AnalysisResponse(
-                factual_accuracy=analysis_data["factual_accuracy"],
-                bias=bias_enum,
-                emotional_tone=analysis_data["emotional_tone"],
-                recommendation=analysis_data["recommendation"],
-                article_type=article_type,
-                sentiments=sentiments,
-                analysis_explanation=analysis_data["analysis_explanation"],
-                topic=analysis_data.get("topic"),
-                frames_detected=analysis_data.get("frames_detected")
-            )
+                # Validación extra para sentiments
+                if not isinstance(sentiments, dict):
+                    sentiments = default_sentiments
+
+                # Convert the bias string to the corresponding PoliticalBias enum value
+                try:
+                    bias_enum = PoliticalBias(analysis_data["bias"].lower())
+                except ValueError:
+                    bias_enum = PoliticalBias.OTHER
+
+                # Create the analysis response
+                analysis_response = AnalysisResponse(
+                    factual_accuracy=analysis_data["factual_accuracy"],
+                    bias=bias_enum,
+                    emotional_tone=analysis_data["emotional_tone"],
+                    recommendation=analysis_data["recommendation"],
+                    article_type=article_type,
+                    sentiments=sentiments,
+                    analysis_explanation=analysis_data["analysis_explanation"],
+                    topic=analysis_data.get("topic"),
+                    frames_detected=analysis_data.get("frames_detected")
+                )
             
             # Save article and analysis
             self.storage.save_article(text, analysis_response.dict())
@@ -128,6 +131,93 @@ class OpenAIService:
             logger.error(f"Error parsing OpenAI response: {str(e)}")
             raise Exception(f"Error parsing OpenAI response: {str(e)}")
 
+    def _resolve_article_context(
+        self,
+        article_text: Optional[str],
+        analysis_result: Optional[Dict]
+    ) -> Tuple[Optional[str], Optional[Dict]]:
+        """Return the article context sent by the frontend, or the last one saved."""
+        if article_text and analysis_result:
+            return article_text, analysis_result
+        current_article = self.storage.get_current_article()
+        if current_article:
+            return current_article.get("text"), current_article.get("analysis")
+        return None, None
+
+    def _answer_cache_key(
+        self,
+        messages: List[Dict[str, str]],
+        article_text: Optional[str],
+        analysis_result: Optional[Dict],
+        use_web_search: bool
+    ) -> Optional[Tuple]:
+        """Cache key for first-turn questions (None for conversations with history)."""
+        last_user_message = next((msg.content for msg in reversed(messages) if msg.role == "user"), "")
+        return self.answer_cache.make_key(
+            messages, normalize_query(last_user_message), article_text, analysis_result, use_web_search
+        )
+
+    async def _build_chat_messages(
+        self,
+        messages: List[Dict[str, str]],
+        article_text: Optional[str] = None,
+        analysis_result: Optional[Dict] = None,
+        use_web_search: bool = False
+    ) -> List[Dict[str, str]]:
+        """Build the full message list (system context + conversation) for a chat completion."""
+        article_text, analysis_result = self._resolve_article_context(article_text, analysis_result)
+
+        # Static system prompt, compiled once per article/analysis and byte-identical across turns
+        with stage("prompt_build"):
+            system_message = {
+                "role": "system",
+                "content": self.context_cache.get_prefix(article_text, analysis_result)
+            }
+        # Per-turn context (web search evidence) goes after the static prefix and history
+        turn_context = ""
+
+        # Get the last user message (multilingual trigger)
+        last_user_message = next((msg.content for msg in reversed(messages) if msg.role == "user"), None)
+        trigger_web_search = False
+        if last_user_message:
+            trigger_web_search = should_use_web_search(last_user_message, use_web_search)
+
+        # If web search is requested (by flag or trigger), perform the search and add results to context
+        if trigger_web_search:
+            try:
+                # Use 10 results if the message is about verifying news (using multilingual trigger)
+                num_results = 10 if any(kw in normalize(last_user_message) for kw in [
+                    "veracidad", "verificar", "fact check", "fact-check", "analicemos", "truth", "verify", "fact check", "fact-check", "analyze"
+                ]) else 5
+                logger.info(f"Performing claim-level web search with {num_results} results per claim for: {last_user_message}")
+                with stage("fact_check"):
+                    evidence = await self.fact_check.gather_evidence(
+                        last_user_message,
+                        article_text=article_text,
+                        num_results=num_results
+                    )
+                if evidence:
+                    turn_context = evidence.lstrip() + "\n\n" + get_web_search_instructions()
+                else:
+                    logger.warning("No search results found")
+            except Exception as e:
+                logger.error(f"Error during web search: {str(e)}", exc_info=True)
+                raise Exception(f"Error during web search: {str(e)}")
+
+        # Prepare messages with system context (older turns summarized, prompt kept within budget)
+        filtered_messages = [msg.dict() for msg in messages if msg.role != "system"]
+        with stage("chat_history"):
+            full_messages = await self.history.build_messages(
+                system_message,
+                filtered_messages,
+                reserved_tokens=estimate_tokens(turn_context)
+            )
+        if turn_context:
+            # Insert right before the latest user message so the cached prefix stays intact
+            insert_at = len(full_messages) - 1 if full_messages[-1]["role"] == "user" else len(full_messages)
+            full_messages.insert(insert_at, {"role": "system", "content": turn_context})
+        return full_messages
+
     async def chat(
         self,
         messages: List[Dict[str, str]],
@@ -137,83 +227,127 @@ class OpenAIService:
     ) -> Dict[str, Any]:
         """Chat with the model about an article and its analysis."""
         try:
-            # Get current article from storage
-            current_article = self.storage.get_current_article()
-            
-            # Prepare system message with context
-            system_message = {
-                "role": "system",
-                "content": get_chat_system_prompt()
-            }
+            article_text, analysis_result = self._resolve_article_context(article_text, analysis_result)
 
-            # Add article context if available
-            if article_text and analysis_result:
-                # Usar el contexto enviado por el frontend
-                system_message["content"] += f"\n\nArticle to analyze:\n{article_text}"
-                system_message["content"] += f"\n\nCurrent analysis:\n{json.dumps(analysis_result, indent=2)}"
-            elif current_article:
-                # Usar el último guardado en cache
-                system_message["content"] += f"\n\nArticle to analyze:\n{current_article['text']}"
-                if current_article.get('analysis'):
-                    system_message["content"] += f"\n\nCurrent analysis:\n{json.dumps(current_article['analysis'], indent=2)}"
-
-            # Get the last user message (multilingual trigger)
-            last_user_message = next((msg.content for msg in reversed(messages) if msg.role == "user"), None)
-            trigger_web_search = False
-            if last_user_message:
-                trigger_web_search = should_use_web_search(last_user_message, use_web_search)
-
-            # If web search is requested (by flag or trigger), perform the search and add results to context
-            if trigger_web_search:
-                try:
-                    # Use 10 results if the message is about verifying news (using multilingual trigger)
-                    num_results = 10 if any(kw in normalize(last_user_message) for kw in [
-                        "veracidad", "verificar", "fact check", "fact-check", "analicemos", "truth", "verify", "fact check", "fact-check", "analyze"
-                    ]) else 5
-                    logger.info(f"Performing web search with {num_results} results for query: {last_user_message}")
-                    search_results = search_web(last_user_message, num_results=num_results)
-                    if search_results:
-                        system_message["content"] += "\n\nWeb search results (use ONLY these sources):\n"
-                        for idx, result in enumerate(search_results, 1):
-                            system_message["content"] += f"\n[{idx}] Title: {result['title']}\nSnippet: {result['snippet']}\nURL: {result['url']}\n"
-                        system_message["content"] += get_web_search_instructions()
-                    else:
-                        logger.warning("No search results found")
-                except Exception as e:
-                    logger.error(f"Error during web search: {str(e)}", exc_info=True)
-                    raise Exception(f"Error during web search: {str(e)}")
-
-            # Prepare messages with system context
-            filtered_messages = [msg.dict() for msg in messages if msg.role != "system"]
-            full_messages = [system_message] + filtered_messages
+            # Repeated first-turn questions about the same article are answered from cache
+            cache_key = self._answer_cache_key(messages, article_text, analysis_result, use_web_search)
+            cached_answer = self.answer_cache.get(cache_key)
+            if cached_answer is not None:
+                return {"message": {"role": "assistant", "content": cached_answer}}
+
+            full_messages = await self._build_chat_messages(messages, article_text, analysis_result, use_web_search)
             logger.info(f"Sending request to OpenAI with {len(full_messages)} messages")
 
             # Get response from OpenAI
-            response = await self.client.chat.completions.create(
+            response = await self.gateway.chat_completion(
+                "chat",
+                Priority.INTERACTIVE,
                 model=self.model,
                 messages=full_messages,
                 temperature=0.2,
                 max_tokens=2000
             )
 
+            answer = response.choices[0].message.content
+            self.answer_cache.set(cache_key, answer)
+
             return {
                 "message": {
                     "role": "assistant",
-                    "content": response.choices[0].message.content
+                    "content": answer
                 }
             }
 
+        except LLMGatewayBusy:
+            raise
         except Exception as e:
             logger.error(f"Error in OpenAI communication: {str(e)}", exc_info=True)
             raise Exception(f"Error in OpenAI communication: {str(e)}")
 
-    async def analyze_with_gpt4(self, original_image: str, spectrum_image: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    async def chat_stream(
+        self,
+        messages: List[Dict[str, str]],
+        article_text: Optional[str] = None,
+        analysis_result: Optional[Dict] = None,
+        use_web_search: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of chat().
+
+        Yields {"type": "token", "content": ...} events as tokens arrive from OpenAI and a
+        final {"type": "done", "message": {...}} event carrying the complete assistant message.
+        """
+        try:
+            article_text, analysis_result = self._resolve_article_context(article_text, analysis_result)
+
+            # Repeated first-turn questions are answered from cache in a single event
+            cache_key = self._answer_cache_key(messages, article_text, analysis_result, use_web_search)
+            cached_answer = self.answer_cache.get(cache_key)
+            if cached_answer is not None:
+                yield {"type": "token", "content": cached_answer}
+                yield {"type": "done", "message": {"role": "assistant", "content": cached_answer}}
+                return
+
+            full_messages = await self._build_chat_messages(messages, article_text, analysis_result, use_web_search)
+            logger.info(f"Sending streaming request to OpenAI with {len(full_messages)} messages")
+
+            stream = self.gateway.chat_completion_stream(
+                "chat",
+                Priority.INTERACTIVE,
+                model=self.model,
+                messages=full_messages,
+                temperature=0.2,
+                max_tokens=2000
+            )
+
+            parts: List[str] = []
+            # Closing the stream early (client gone) frees its gateway slot right away
+            async with aclosing(stream):
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if delta:
+                        parts.append(delta)
+                        yield {"type": "token", "content": delta}
+
+            answer = "".join(parts)
+            self.answer_cache.set(cache_key, answer)
+
+            yield {
+                "type": "done",
+                "message": {
+                    "role": "assistant",
+                    "content": answer
+                }
+            }
+
+        except LLMGatewayBusy:
+            raise
+        except Exception as e:
+            logger.error(f"Error in OpenAI streaming communication: {str(e)}", exc_info=True)
+            raise Exception(f"Error in OpenAI communication: {str(e)}")
+
+    async def analyze_with_gpt4(
+        self,
+        original_image: str,
+        spectrum_image: str,
+        metadata: Dict[str, Any],
+        original_mime: str = "image/png",
+        spectrum_mime: str = "image/png",
+        triage: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
         """
         Analyze an image using GPT-4 Vision with the original image, spectrum, and metadata.
+        Images are base64 strings encoded as original_mime / spectrum_mime; the local
+        forensic triage, if given, is added to the prompt.
         """
         try:
-            prompt = get_image_forensics_prompt(metadata)
-            response = await self.client.chat.completions.create(
+            with stage("prompt_build"):
+                prompt = get_image_forensics_prompt(metadata, triage)
+            response = await self.gateway.chat_completion(
+                "image",
+                Priority.BATCH,
                 model="gpt-4o",
                 messages=[
                     {
@@ -224,8 +358,8 @@ class OpenAIService:
                         "role": "user",
                         "content": [
                             {"type": "text", "text": prompt},
-                            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{original_image}"}},
-                            {"type": "image_url", "image_url": {"url": f"data:image/png;base64,{spectrum_image}"}}
+                            {"type": "image_url", "image_url": {"url": f"data:{original_mime};base64,{original_image}"}},
+                            {"type": "image_url", "image_url": {"url": f"data:{spectrum_mime};base64,{spectrum_image}"}}
                         ]
                     }
                 ],
@@ -233,7 +367,10 @@ class OpenAIService:
                 response_format={"type": "json_object"}
             )
             logger.error(f"[ImageAnalysis] Respuesta cruda de OpenAI: {response.choices[0].message.content!r}")
-            analysis = json.loads(response.choices[0].message.content)
+            with stage("json_parse"):
+                analysis = json.loads(response.choices[0].message.content)
             return analysis
+        except LLMGatewayBusy:
+            raise
         except Exception as e:
             raise Exception(f"Error analyzing image with GPT-4: {str(e)}") 
\ No newline at end of file
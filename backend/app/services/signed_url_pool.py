@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class SignedUrlPool:
+    """
+    Keeps a few prefetched ElevenLabs conversation signed URLs ready, so a voice session
+    can dial the ElevenLabs WebSocket immediately instead of waiting for an API call.
+
+    Each signed URL starts one conversation, so URLs are handed out once. URLs older
+    than VOICE_SIGNED_URL_MAX_AGE_SECONDS are discarded (ElevenLabs signed URLs expire
+    after 15 minutes); a background task replaces them and refills after every use.
+
+    Args:
+        fetch: Coroutine function returning a new signed URL, or None on failure
+        size: Number of URLs kept ready (0 disables prefetching)
+        max_age: Maximum age in seconds of a URL handed out from the pool
+    """
+
+    def __init__(self, fetch: Callable[[], Awaitable[Optional[str]]], size: Optional[int] = None, max_age: Optional[float] = None):
+        self.fetch = fetch
+        self.size = settings.VOICE_SIGNED_URL_POOL_SIZE if size is None else size
+        self.max_age = max_age or settings.VOICE_SIGNED_URL_MAX_AGE_SECONDS
+        self.urls: Deque[Tuple[float, str]] = deque()
+        self.hits = 0
+        self.misses = 0
+        self._refill_task: Optional[asyncio.Task] = None
+        self._refresher: Optional[asyncio.Task] = None
+
+    def _discard_expired(self) -> None:
+        now = time.monotonic()
+        while self.urls and now - self.urls[0][0] > self.max_age:
+            self.urls.popleft()
+
+    async def acquire(self) -> Optional[str]:
+        """Return a signed URL from the pool, fetching one directly if the pool is empty."""
+        self._discard_expired()
+        if self.urls:
+            self.hits += 1
+            url = self.urls.popleft()[1]
+        else:
+            self.misses += 1
+            url = await self.fetch()
+        self.refill_soon()
+        return url
+
+    def refill_soon(self) -> None:
+        """Start a background refill unless one is already running."""
+        if self.size > 0 and (self._refill_task is None or self._refill_task.done()):
+            self._refill_task = asyncio.create_task(self._refill())
+
+    async def _refill(self) -> None:
+        while len(self.urls) < self.size:
+            fetched_at = time.monotonic()
+            url = await self.fetch()
+            if not url:
+                break
+            self.urls.append((fetched_at, url))
+
+    async def _refresh_loop(self) -> None:
+        # Half the maximum age, so a stale URL is replaced before anyone would get it
+        while True:
+            try:
+                self._discard_expired()
+                await self._refill()
+            except Exception as e:
+                logger.error(f"Error refreshing signed URLs: {e}")
+            await asyncio.sleep(self.max_age / 2)
+
+    def start(self) -> None:
+        """Start the background refresh (called on application startup)."""
+        if self.size > 0 and self._refresher is None:
+            self._refresher = asyncio.create_task(self._refresh_loop())
+            logger.info(f"Signed URL prefetch started (pool size {self.size})")
+
+    async def stop(self) -> None:
+        for task in (self._refresher, self._refill_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._refresher = self._refill_task = None
+        self.urls.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"ready": len(self.urls), "size": self.size, "hits": self.hits, "misses": self.misses}
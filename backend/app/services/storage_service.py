@@ -7,6 +7,8 @@ from datetime import datetime
 import logging
 from supabase import create_client, Client
 from ..core.config import settings
+from .local_index import index_analysis
+from ..utils.metrics import stage, upstream
 
 logger = logging.getLogger(__name__)
 
@@ -14,7 +16,7 @@ class StorageService:
     def __init__(self):
         # Use absolute paths and create a proper temp directory
         self.base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        self.storage_dir = os.path.join(self.base_dir, "app", "data", "temp")
+        self.storage_dir = settings.STORAGE_DIR or os.path.join(self.base_dir, "app", "data", "temp")
         
         # Create temp directory if it doesn't exist
         os.makedirs(self.storage_dir, exist_ok=True)
@@ -44,7 +46,7 @@ class StorageService:
         """Save audio file to temp directory and return the full path."""
         file_path = self.get_temp_path(filename)
         try:
-            with open(file_path, "wb") as f:
+            with stage("storage_write"), open(file_path, "wb") as f:
                 f.write(audio_data)
             logger.info(f"Audio file saved: {file_path}")
             return file_path
@@ -56,7 +58,7 @@ class StorageService:
         """Save metadata JSON file to temp directory."""
         file_path = self.get_temp_path(filename)
         try:
-            with open(file_path, "w", encoding="utf-8") as f:
+            with stage("storage_write"), open(file_path, "w", encoding="utf-8") as f:
                 json.dump(metadata, f, ensure_ascii=False, indent=2)
             logger.info(f"Metadata saved: {file_path}")
             return file_path
@@ -107,7 +109,7 @@ class StorageService:
         }
         
         file_path = os.path.join(self.storage_dir, f"{article_id}.json")
-        with open(file_path, 'w', encoding='utf-8') as f:
+        with stage("storage_write"), open(file_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
         
         logger.info(f"Article saved with ID: {article_id}")
@@ -173,12 +175,18 @@ class StorageService:
         # Save locally as backup
         backup_id = datetime.now().strftime("%Y%m%d_%H%M%S")
         file_path = os.path.join(self.storage_dir, f"{backup_id}_analysis.json")
-        with open(file_path, 'w', encoding='utf-8') as f:
+        with stage("storage_write"), open(file_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
+        # Make the analysis searchable for chat grounding
+        try:
+            index_analysis(backup_id, tipo_analisis, input_original, resultado, data["fecha"])
+        except Exception as e:
+            logger.error(f"Error indexing analysis locally: {str(e)}")
         # Save to Supabase if available
         if self.supabase:
             try:
-                self.supabase.table("analisis").insert(data).execute()
+                with upstream("supabase"):
+                    self.supabase.table("analisis").insert(data).execute()
                 logger.info(f"Analysis saved in Supabase: {tipo_analisis}")
             except Exception as e:
                 logger.error(f"Error saving analysis in Supabase: {str(e)}") 
\ No newline at end of file
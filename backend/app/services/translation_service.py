@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+from .openai_service import OpenAIService
+from .llm_gateway import Priority
+from ..core.config import settings
+from ..prompts.translation_prompts import get_translation_prompt, get_translation_chunk_prompt
+from ..utils.text_chunker import split_text_into_chunks, get_overlap_context
+
+logger = logging.getLogger(__name__)
+
+# Chunks below this size are not re-split when the model runs out of tokens
+MIN_RESPLIT_CHARS = 200
+
+class TranslationService:
+    """
+    Translates short texts in a single request and long documents as
+    concurrent, order-preserving chunk translations.
+    """
+
+    def __init__(self, openai_service: Optional[OpenAIService] = None):
+        self.openai_service = openai_service or OpenAIService()
+        self.chunk_chars = settings.TRANSLATION_CHUNK_CHARS
+        self.overlap_chars = settings.TRANSLATION_CHUNK_OVERLAP_CHARS
+        self.chunk_max_tokens = settings.TRANSLATION_CHUNK_MAX_TOKENS
+        self.max_concurrency = settings.TRANSLATION_MAX_CONCURRENCY
+
+    async def translate(self, text: str, style: str, target_lang: str, long_document: bool = False) -> str:
+        """
+        Translate text into target_lang using the given style.
+
+        Texts longer than TRANSLATION_CHUNK_CHARS (or any text when long_document is set)
+        are translated chunk by chunk. A single-shot translation that is cut off by the
+        token limit is transparently retried in chunked mode.
+        """
+        if long_document or len(text) > self.chunk_chars:
+            return await self.translate_long_document(text, style, target_lang)
+
+        translated, truncated = await self._complete(
+            get_translation_prompt(style=style, target_lang=target_lang, text=text),
+            max_tokens=1000
+        )
+        if truncated:
+            logger.warning("Single-shot translation was truncated, retrying in long-document mode")
+            return await self.translate_long_document(text, style, target_lang)
+        return translated
+
+    async def translate_long_document(self, text: str, style: str, target_lang: str) -> str:
+        """Split text on paragraph/sentence boundaries, translate chunks concurrently and reassemble them in order."""
+        chunks = split_text_into_chunks(text, self.chunk_chars)
+        logger.info(f"Translating long document in {len(chunks)} chunks (max concurrency: {self.max_concurrency})")
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(idx: int) -> str:
+            async with semaphore:
+                previous = chunks[idx - 1][0] if idx > 0 else ""
+                return await self._translate_chunk(
+                    chunks[idx][0], style, target_lang,
+                    previous_context=get_overlap_context(previous, self.overlap_chars),
+                    part=idx + 1,
+                    total_parts=len(chunks)
+                )
+
+        translations = await asyncio.gather(*(run(idx) for idx in range(len(chunks))))
+        return "".join(
+            translated + separator
+            for translated, (_, separator) in zip(translations, chunks)
+        ).strip()
+
+    async def _translate_chunk(
+        self,
+        chunk: str,
+        style: str,
+        target_lang: str,
+        previous_context: str,
+        part: int,
+        total_parts: int
+    ) -> str:
+        prompt = get_translation_chunk_prompt(
+            style=style,
+            target_lang=target_lang,
+            text=chunk,
+            previous_context=previous_context,
+            part=part,
+            total_parts=total_parts
+        )
+        translated, truncated = await self._complete(prompt, max_tokens=self.chunk_max_tokens)
+        if not truncated or len(chunk) < MIN_RESPLIT_CHARS:
+            return translated
+
+        # The model ran out of tokens: split this chunk further so no text is lost
+        logger.warning(f"Chunk {part}/{total_parts} was truncated, re-splitting it")
+        sub_chunks: List[Tuple[str, str]] = split_text_into_chunks(chunk, max(len(chunk) // 2, 1))
+        parts = []
+        context = previous_context
+        for sub_chunk, separator in sub_chunks:
+            parts.append(await self._translate_chunk(sub_chunk, style, target_lang, context, part, total_parts) + separator)
+            context = get_overlap_context(sub_chunk, self.overlap_chars)
+        return "".join(parts).strip()
+
+    async def _complete(self, prompt: str, max_tokens: int) -> Tuple[str, bool]:
+        """Run one translation completion. Returns the text and whether it was cut off by max_tokens."""
+        response = await self.openai_service.gateway.chat_completion(
+            "translate",
+            Priority.STANDARD,
+            model=self.openai_service.model,
+            messages=[
+                {"role": "system", "content": "You are a professional translator."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.3,
+            max_tokens=max_tokens
+        )
+        choice = response.choices[0]
+        return choice.message.content.strip(), choice.finish_reason == "length"
@@ -0,0 +1,135 @@
+"""
+Fixtures for the hermetic benchmarks.
+
+Fake OpenAI, Serper, ElevenLabs and Supabase servers run in a background event
+loop; the API runs in a uvicorn subprocess pointed at them, with a temporary
+storage directory and the request rate limits lifted. Everything is configured
+through environment variables:
+
+    BENCH_REQUESTS / BENCH_CONCURRENCY   requests per benchmark / concurrent clients (40 / 8)
+    BENCH_OPENAI_LATENCY_MS              fake completion latency (200)
+    BENCH_OPENAI_RESPONSE_CHARS          fake completion size (800)
+    BENCH_SERPER_LATENCY_MS              fake search latency (100)
+    BENCH_SERPER_RESULTS                 results per query (10)
+    BENCH_ELEVENLABS_LATENCY_MS          fake text-to-speech latency (150)
+    BENCH_TTS_BYTES                      fake audio size (48000)
+    BENCH_SUPABASE_LATENCY_MS            fake insert latency (30)
+    BENCH_OUTPUT                         write all results to this JSON file
+    BENCH_BASELINE                       JSON file from a previous BENCH_OUTPUT to compare against
+    BENCH_TOLERANCE                      allowed p95/throughput regression (0.25)
+    BENCH_SERVER_LOG                     file receiving the API output
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+from types import SimpleNamespace
+from typing import Any, Dict, Optional
+import pytest
+from app.tests.benchmarks.harness import BackgroundLoop, ServerProcess, free_port, run_load, summarize, regressions
+from app.tests.fakes.elevenlabs import FakeElevenLabs
+from app.tests.fakes.openai import FakeOpenAI
+from app.tests.fakes.serper import FakeSerper
+from app.tests.fakes.supabase import FakeSupabase
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+def _env_seconds(name: str, default_ms: float) -> float:
+    return float(os.getenv(name, default_ms)) / 1000
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: hermetic end-to-end performance benchmark")
+
+@pytest.fixture(scope="session")
+def providers():
+    loop = BackgroundLoop()
+    fakes = SimpleNamespace(
+        openai=FakeOpenAI(
+            latency=_env_seconds("BENCH_OPENAI_LATENCY_MS", 200),
+            response_chars=_env_int("BENCH_OPENAI_RESPONSE_CHARS", 800)
+        ),
+        serper=FakeSerper(
+            latency=_env_seconds("BENCH_SERPER_LATENCY_MS", 100),
+            results=_env_int("BENCH_SERPER_RESULTS", 10)
+        ),
+        elevenlabs=FakeElevenLabs(
+            latency=_env_seconds("BENCH_ELEVENLABS_LATENCY_MS", 150),
+            tts_bytes=_env_int("BENCH_TTS_BYTES", 48000)
+        ),
+        supabase=FakeSupabase(latency=_env_seconds("BENCH_SUPABASE_LATENCY_MS", 30))
+    )
+    for fake in vars(fakes).values():
+        loop.run(fake.start())
+    yield fakes
+    for fake in vars(fakes).values():
+        loop.run(fake.stop())
+    loop.close()
+
+@pytest.fixture(scope="session")
+def server(providers):
+    storage_dir = tempfile.TemporaryDirectory(prefix="truthlens-bench-")
+    server = ServerProcess(free_port(), {
+        "ENV": "benchmark",
+        "OPENAI_API_KEY": "bench",
+        "OPENAI_BASE_URL": providers.openai.base_url,
+        "SERPER_API_KEY": "bench",
+        "SERPER_API_URL": providers.serper.search_url,
+        "ELEVENLABS_API_KEY": "bench",
+        "ELEVENLABS_BASE_URL": providers.elevenlabs.base_url,
+        "ELEVENLABS_AGENT_ID": "",
+        "SUPABASE_URL": providers.supabase.url,
+        "SUPABASE_KEY": "bench",
+        "STORAGE_DIR": storage_dir.name,
+        # Measure the service, not the limiters
+        "RATE_LIMIT_PER_MINUTE": "1000000",
+        "LLM_MODEL_RPM": "1000000",
+        "LLM_MODEL_TPM": "1000000000",
+        "LLM_ENDPOINT_RPM": "{}"
+    }, os.getenv("BENCH_SERVER_LOG"))
+    asyncio.run(server.start())
+    yield server
+    server.stop()
+    storage_dir.cleanup()
+
+@pytest.fixture(scope="session")
+def bench_results():
+    results: Dict[str, Any] = {}
+    yield results
+    output = os.getenv("BENCH_OUTPUT")
+    if output and results:
+        with open(output, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+
+@pytest.fixture(scope="session")
+def baseline() -> Dict[str, Any]:
+    path = os.getenv("BENCH_BASELINE")
+    if not path:
+        return {}
+    with open(path) as f:
+        return json.load(f).get("results", {})
+
+@pytest.fixture
+def bench(server, bench_results, baseline):
+    """
+    bench.run(name, request, requests=None, concurrency=None) drives the API with
+    request(session, i) -> bool, records the result and fails on errors or on a
+    regression against BENCH_BASELINE.
+    """
+    tolerance = float(os.getenv("BENCH_TOLERANCE", 0.25))
+
+    def run(name: str, request, requests: Optional[int] = None, concurrency: Optional[int] = None) -> Dict[str, Any]:
+        requests = requests or _env_int("BENCH_REQUESTS", 40)
+        concurrency = concurrency or _env_int("BENCH_CONCURRENCY", 8)
+        result = summarize(name, asyncio.run(run_load(request, requests, concurrency)), concurrency)
+        bench_results[name] = result
+        latency = result["latency_ms"]
+        print(f"\n[bench] {name}: {result['throughput_rps']} req/s, p50/p95/p99 "
+              f"{latency['p50']}/{latency['p95']}/{latency['p99']} ms, errors {result['errors']}")
+        assert result["errors"] == 0, f"{name}: {result['errors']} failed requests, e.g. {result['error_samples']}"
+        problems = regressions(result, baseline.get(name), tolerance)
+        assert not problems, f"{name} regressed: {'; '.join(problems)}"
+        return result
+
+    return SimpleNamespace(url=server.url, run=run)
@@ -0,0 +1,155 @@
+"""
+Helpers shared by the benchmarks: the API in a uvicorn subprocess, a background
+event loop for the fake providers, a closed-loop load generator and latency stats.
+"""
+
+import asyncio
+import math
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import aiohttp
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+class ServerProcess:
+    """The API under test, run with uvicorn in a subprocess."""
+
+    def __init__(self, port: int, env: Dict[str, str], log_path: Optional[str] = None):
+        self.port = port
+        self.env = env
+        self.log_path = log_path
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def start(self, timeout: float = 30.0) -> None:
+        log = open(self.log_path, "ab") if self.log_path else subprocess.DEVNULL
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(self.port)],
+            cwd=BACKEND_DIR, env={**os.environ, **self.env}, stdout=log, stderr=subprocess.STDOUT
+        )
+        deadline = time.monotonic() + timeout
+        async with aiohttp.ClientSession() as session:
+            while time.monotonic() < deadline:
+                if self.process.poll() is not None:
+                    raise RuntimeError(f"Server exited with code {self.process.returncode}")
+                try:
+                    async with session.get(f"{self.url}/") as resp:
+                        if resp.status == 200:
+                            return
+                except aiohttp.ClientError:
+                    pass
+                await asyncio.sleep(0.2)
+        raise RuntimeError("Server did not start in time")
+
+    def stop(self) -> None:
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+class BackgroundLoop:
+    """An event loop in a daemon thread, for servers that outlive a single test."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = 30.0) -> Any:
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def close(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+
+RequestFn = Callable[[aiohttp.ClientSession, int], Awaitable[bool]]
+
+async def run_load(request: RequestFn, total: int, concurrency: int, timeout: float = 120.0) -> Dict[str, Any]:
+    """
+    Closed-loop load: `concurrency` workers issue `total` requests back to back.
+
+    request(session, i) performs request i and returns whether its response was valid;
+    exceptions count as errors.
+
+    Returns:
+        Dict[str, Any]: Latencies of the valid responses (ms), error samples and wall time
+    """
+    latencies: List[float] = []
+    errors: List[str] = []
+    next_index = iter(range(total))
+
+    async def worker(session: aiohttp.ClientSession):
+        for i in next_index:
+            start = time.perf_counter()
+            try:
+                error = None if await request(session, i) else "invalid response"
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            if error is None:
+                latencies.append((time.perf_counter() - start) * 1000)
+            else:
+                errors.append(error)
+
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    return {"latencies": latencies, "errors": errors, "elapsed": elapsed}
+
+def summarize(name: str, load: Dict[str, Any], concurrency: int) -> Dict[str, Any]:
+    """Throughput and latency percentiles of a run_load result."""
+    latencies = load["latencies"]
+    return {
+        "name": name,
+        "requests": len(latencies) + len(load["errors"]),
+        "concurrency": concurrency,
+        "errors": len(load["errors"]),
+        "error_samples": sorted(set(load["errors"]))[:3],
+        "duration_s": round(load["elapsed"], 3),
+        "throughput_rps": round(len(latencies) / load["elapsed"], 2) if load["elapsed"] else 0.0,
+        "latency_ms": {
+            "p50": _round(percentile(latencies, 50)),
+            "p95": _round(percentile(latencies, 95)),
+            "p99": _round(percentile(latencies, 99)),
+            "max": _round(max(latencies) if latencies else None)
+        }
+    }
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 2)
+
+def regressions(result: Dict[str, Any], baseline: Optional[Dict[str, Any]], tolerance: float) -> List[str]:
+    """How result is worse than baseline beyond tolerance (p95 latency up, throughput down)."""
+    if not baseline:
+        return []
+    problems = []
+    p95, base_p95 = result["latency_ms"]["p95"], baseline["latency_ms"]["p95"]
+    if p95 is not None and base_p95 and p95 > base_p95 * (1 + tolerance):
+        problems.append(f"p95 {p95:.1f} ms > baseline {base_p95:.1f} ms (+{tolerance:.0%})")
+    rps, base_rps = result["throughput_rps"], baseline["throughput_rps"]
+    if base_rps and rps < base_rps * (1 - tolerance):
+        problems.append(f"throughput {rps:.1f} req/s < baseline {base_rps:.1f} req/s (-{tolerance:.0%})")
+    return problems
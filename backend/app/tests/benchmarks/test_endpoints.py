@@ -0,0 +1,115 @@
+"""
+End-to-end benchmarks of the HTTP endpoints against local provider stand-ins.
+
+Run from the backend directory:
+    python -m pytest app/tests/benchmarks -s
+"""
+
+import io
+import json
+import os
+import random
+import pytest
+from PIL import Image, ImageDraw
+from app.tests.fakes.openai import filler
+
+pytestmark = pytest.mark.benchmark
+
+def article(i: int) -> str:
+    # Unique per request, so no answer, search or analysis cache short-circuits the run
+    return f"Report {i}: " + filler(2500)
+
+def jpeg(i: int, size: int = 1024) -> bytes:
+    rng = random.Random(i)
+    img = Image.new("RGB", (size, size), tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(40):
+        x, y = rng.randrange(size), rng.randrange(size)
+        r = rng.randrange(20, size // 4)
+        draw.ellipse((x - r, y - r, x + r, y + r), fill=tuple(rng.randrange(256) for _ in range(3)))
+    buffer = io.BytesIO()
+    img.save(buffer, "JPEG", quality=90)
+    return buffer.getvalue()
+
+def test_analyze(bench):
+    async def request(session, i):
+        payload = {"text": article(i), "url": f"https://example.com/news/{i}", "title": f"Article {i}"}
+        async with session.post(f"{bench.url}/api/v1/analyze", json=payload) as resp:
+            return resp.status == 200 and "factual_accuracy" in await resp.json()
+
+    bench.run("analyze", request)
+
+def test_chat(bench):
+    async def request(session, i):
+        payload = {
+            "messages": [{"role": "user", "content": f"What does report {i} say about the figures?"}],
+            "article_text": article(i),
+            "analysis_result": {"factual_accuracy": 78, "bias": "neutral"}
+        }
+        async with session.post(f"{bench.url}/api/v1/chat", json=payload) as resp:
+            return resp.status == 200 and bool((await resp.json())["message"]["content"])
+
+    bench.run("chat", request)
+
+def test_chat_web_search(bench):
+    async def request(session, i):
+        payload = {
+            "messages": [{"role": "user", "content": f"Verify report {i}: officials confirmed the figures rose {i}% this year."}],
+            "article_text": article(i),
+            "analysis_result": {"factual_accuracy": 78, "bias": "neutral"},
+            "use_web_search": True
+        }
+        async with session.post(f"{bench.url}/api/v1/chat", json=payload) as resp:
+            return resp.status == 200 and bool((await resp.json())["message"]["content"])
+
+    bench.run("chat_web_search", request)
+
+def test_chat_stream(bench):
+    async def request(session, i):
+        payload = {
+            "messages": [{"role": "user", "content": f"Summarize report {i}."}],
+            "article_text": article(i),
+            "analysis_result": {"factual_accuracy": 78, "bias": "neutral"}
+        }
+        async with session.post(f"{bench.url}/api/v1/chat/stream", json=payload) as resp:
+            body = await resp.text()
+            return resp.status == 200 and "event: done" in body
+
+    bench.run("chat_stream", request)
+
+def test_translate(bench):
+    async def request(session, i):
+        payload = {"text": article(i)[:1500], "source_language": "en", "target_language": "es", "translation_mode": "creative"}
+        async with session.post(f"{bench.url}/api/v1/translator/translate", json=payload) as resp:
+            return resp.status == 200 and bool((await resp.json())["translated_text"])
+
+    bench.run("translate", request)
+
+def test_translate_long_document(bench):
+    async def request(session, i):
+        payload = {
+            "text": "\n\n".join(article(i * 10 + p) for p in range(4)),
+            "source_language": "en", "target_language": "es", "translation_mode": "creative", "long_document": True
+        }
+        async with session.post(f"{bench.url}/api/v1/translator/translate", json=payload) as resp:
+            return resp.status == 200 and bool((await resp.json())["translated_text"])
+
+    bench.run("translate_long_document", request)
+
+def test_translate_voice(bench):
+    async def request(session, i):
+        payload = {"text": article(i)[:600], "source_language": "en", "target_language": "es", "translation_mode": "creative"}
+        async with session.post(f"{bench.url}/api/v1/translator/translate-voice", json=payload) as resp:
+            return resp.status == 200 and json.loads(await resp.text())["audio_url"].endswith(".mp3")
+
+    bench.run("translate_voice", request)
+
+def test_analyze_image(bench):
+    images = [jpeg(i) for i in range(int(os.getenv("BENCH_REQUESTS", 40)))]
+
+    async def request(session, i):
+        form = {"image": io.BytesIO(images[i % len(images)])}
+        async with session.post(f"{bench.url}/api/analyze_image", data=form) as resp:
+            return resp.status == 200 and "verdict" in await resp.json()
+
+    bench.run("analyze_image", request, requests=len(images))
@@ -0,0 +1,57 @@
+"""
+Common plumbing for the local provider stand-ins used by the benchmarks.
+"""
+
+import asyncio
+import random
+from typing import Optional
+from aiohttp import web
+
+class FakeServer:
+    """
+    aiohttp server on a local port with a configurable response latency.
+
+    Subclasses register their routes in `routes` and call `await self.delay()` before
+    answering; latency is `latency` seconds plus a uniform jitter of up to `jitter`.
+
+    Args:
+        host: Interface to listen on
+        port: Port (0 picks a free one)
+        latency: Base response latency in seconds
+        jitter: Maximum extra random latency in seconds
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0, jitter: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def routes(self, app: web.Application) -> None:
+        raise NotImplementedError
+
+    async def delay(self) -> None:
+        self.requests += 1
+        seconds = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if seconds:
+            await asyncio.sleep(seconds)
+
+    async def start(self) -> None:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        self.routes(app)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
@@ -0,0 +1,149 @@
+"""
+Local stand-in for the ElevenLabs API used by the benchmarks.
+Serves signed URLs, voices and text-to-speech over HTTP and speaks the
+Conversational AI protocol over WebSocket, with configurable latency and sizes.
+"""
+
+import asyncio
+import base64
+import json
+import struct
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from aiohttp import web, WSMsgType
+from .base import FakeServer
+
+# Replies carry the fake's send time (time.monotonic, shared by every process on
+# the machine) in their first bytes, so clients can measure downstream latency
+STAMP = struct.Struct("<d")
+
+def stamp_audio(size: int) -> bytes:
+    """Audio payload of `size` bytes starting with the current monotonic time."""
+    return STAMP.pack(time.monotonic()).ljust(max(size, STAMP.size), b"\x00")
+
+def read_stamp(audio: bytes) -> Optional[float]:
+    """Monotonic send time embedded by stamp_audio, if any."""
+    if len(audio) < STAMP.size:
+        return None
+    return STAMP.unpack_from(audio)[0]
+
+class FakeConversation:
+    """What the fake saw on one conversation socket."""
+
+    def __init__(self):
+        self.label: Optional[str] = None
+        self.opened_at = time.monotonic()
+        # (cumulative PCM bytes received, monotonic arrival time) per user_audio_chunk
+        self.arrivals: List[Tuple[int, float]] = []
+        self.pcm_bytes = 0
+        self.replies = 0
+
+class FakeElevenLabs(FakeServer):
+    """
+    Fake ElevenLabs server.
+
+    GET {base}/convai/conversation/get-signed-url returns a ws:// URL on this server.
+    Conversations start with conversation_initiation_metadata; every user_audio_chunk
+    is answered with an "audio" message of response_bytes after response_delay seconds.
+    A "contextual_update" message labels the conversation, so a benchmark client can
+    find its own arrivals in `conversations`. POST {base}/text-to-speech/{voice_id}
+    returns tts_bytes of audio after the base latency (FakeServer.latency).
+
+    Args:
+        signed_url_delay: Seconds before the signed URL is returned
+        response_delay: Seconds before each audio reply
+        response_bytes: Size of each audio reply before base64
+        reply_every: Answer one user_audio_chunk out of this many (0 never answers)
+        tts_bytes: Size of each text-to-speech response
+    """
+
+    def __init__(self, signed_url_delay: float = 0.0, response_delay: float = 0.0, response_bytes: int = 4000,
+                 reply_every: int = 1, tts_bytes: int = 48000, **kwargs):
+        super().__init__(**kwargs)
+        self.signed_url_delay = signed_url_delay
+        self.response_delay = response_delay
+        self.response_bytes = response_bytes
+        self.reply_every = reply_every
+        self.tts_bytes = tts_bytes
+        self.conversations: List[FakeConversation] = []
+        self.signed_urls_issued = 0
+        self.tts_requests = 0
+
+    @property
+    def base_url(self) -> str:
+        """Value for ELEVENLABS_BASE_URL."""
+        return f"{self.url}/v1"
+
+    def by_label(self) -> Dict[str, FakeConversation]:
+        return {c.label: c for c in self.conversations if c.label}
+
+    def routes(self, app: web.Application) -> None:
+        app.router.add_get("/v1/convai/conversation/get-signed-url", self._signed_url)
+        app.router.add_get("/v1/convai/conversation", self._conversation)
+        app.router.add_get("/v1/voices", self._voices)
+        app.router.add_post("/v1/text-to-speech/{voice_id}", self._text_to_speech)
+
+    async def _voices(self, request: web.Request) -> web.Response:
+        return web.json_response({"voices": [
+            {"voice_id": f"fake-voice-{lang}", "name": f"Fake {lang}", "labels": {"language": lang}}
+            for lang in ("en", "es", "fr", "de", "it", "pt")
+        ]})
+
+    async def _text_to_speech(self, request: web.Request) -> web.Response:
+        await request.read()
+        await self.delay()
+        self.tts_requests += 1
+        return web.Response(body=b"\xff\xfb" * (self.tts_bytes // 2), content_type="audio/mpeg")
+
+    async def _signed_url(self, request: web.Request) -> web.Response:
+        if self.signed_url_delay:
+            await asyncio.sleep(self.signed_url_delay)
+        self.signed_urls_issued += 1
+        agent_id = request.query.get("agent_id", "")
+        return web.json_response({
+            "signed_url": f"ws://{self.host}:{self.port}/v1/convai/conversation?agent_id={agent_id}&token={self.signed_urls_issued}"
+        })
+
+    async def _conversation(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        conversation = FakeConversation()
+        self.conversations.append(conversation)
+        await ws.send_str(json.dumps({
+            "type": "conversation_initiation_metadata",
+            "conversation_initiation_metadata_event": {
+                "conversation_id": f"fake-{len(self.conversations)}",
+                "agent_output_audio_format": "pcm_16000",
+                "user_input_audio_format": "pcm_16000"
+            }
+        }))
+        chunks = 0
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                continue
+            message: Dict[str, Any] = json.loads(msg.data)
+            if message.get("type") == "contextual_update":
+                conversation.label = message.get("text")
+            elif message.get("type") == "user_audio_chunk":
+                conversation.pcm_bytes += len(base64.b64decode(message.get("audio", "")))
+                conversation.arrivals.append((conversation.pcm_bytes, time.monotonic()))
+                chunks += 1
+                if self.reply_every and chunks % self.reply_every == 0:
+                    asyncio.create_task(self._reply(ws, conversation))
+        return ws
+
+    async def _reply(self, ws: web.WebSocketResponse, conversation: FakeConversation) -> None:
+        if self.response_delay:
+            await asyncio.sleep(self.response_delay)
+        if ws.closed:
+            return
+        conversation.replies += 1
+        try:
+            await ws.send_str(json.dumps({
+                "type": "audio",
+                "audio": base64.b64encode(stamp_audio(self.response_bytes)).decode("utf-8"),
+                "audio_format": "pcm_16000",
+                "audio_event": {"event_id": conversation.replies}
+            }))
+        except ConnectionResetError:
+            pass
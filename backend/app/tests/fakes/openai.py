@@ -0,0 +1,115 @@
+"""
+Local stand-in for the OpenAI Chat Completions API (point OPENAI_BASE_URL at `base_url`).
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, Dict, List
+from aiohttp import web
+from .base import FakeServer
+
+WORDS = "the report says officials confirmed figures while analysts noted context sources and data".split()
+
+def filler(chars: int) -> str:
+    """Deterministic text of about `chars` characters."""
+    words, size, i = [], 0, 0
+    while size < chars:
+        word = WORDS[i % len(WORDS)]
+        words.append(word)
+        size += len(word) + 1
+        i += 1
+    return " ".join(words)
+
+def _has_image(messages: List[Dict[str, Any]]) -> bool:
+    return any(
+        isinstance(m.get("content"), list) and any(part.get("type") == "image_url" for part in m["content"])
+        for m in messages
+    )
+
+class FakeOpenAI(FakeServer):
+    """
+    Fake POST /v1/chat/completions, with and without stream=True.
+
+    JSON-mode requests get a valid article analysis (or an image verdict when the
+    request carries images) padded to about `response_chars`; other requests get
+    `response_chars` of text. Streams are split into chunks of `stream_chunk_chars`,
+    sent `stream_chunk_delay` seconds apart after the base latency.
+
+    Args:
+        response_chars: Approximate size of each completion
+        stream_chunk_chars: Characters per streamed chunk
+        stream_chunk_delay: Seconds between streamed chunks
+        fail_every: Answer one request out of this many with a 500 (0 never fails)
+    """
+
+    def __init__(self, response_chars: int = 800, stream_chunk_chars: int = 20, stream_chunk_delay: float = 0.0,
+                 fail_every: int = 0, **kwargs):
+        super().__init__(**kwargs)
+        self.response_chars = response_chars
+        self.stream_chunk_chars = stream_chunk_chars
+        self.stream_chunk_delay = stream_chunk_delay
+        self.fail_every = fail_every
+
+    @property
+    def base_url(self) -> str:
+        """Value for OPENAI_BASE_URL."""
+        return f"{self.url}/v1"
+
+    def routes(self, app: web.Application) -> None:
+        app.router.add_post("/v1/chat/completions", self._completions)
+
+    def _content(self, body: Dict[str, Any]) -> str:
+        if (body.get("response_format") or {}).get("type") != "json_object":
+            return filler(self.response_chars)
+        if _has_image(body["messages"]):
+            return json.dumps({
+                "ai_probability": 35,
+                "visual_clues": [filler(80)],
+                "spectral_clues": [filler(80)],
+                "metadata_clues": [filler(80)],
+                "verdict": "Likely real",
+                "justification": filler(self.response_chars // 2),
+                "recommendation": filler(120)
+            })
+        return json.dumps({
+            "factual_accuracy": 78,
+            "bias": "neutral",
+            "emotional_tone": "neutral",
+            "recommendation": filler(160),
+            "topic": "politics",
+            "frames_detected": ["conflict"],
+            "article_type": {"objective": 0.7, "subjective": 0.2, "speculative": 0.1, "emotive": 0.1, "clickbait": 0.0},
+            "sentiments": {"joy": 0.1, "trust": 0.5, "fear": 0.1, "surprise": 0.1, "sadness": 0.0, "disgust": 0.0, "anger": 0.1, "anticipation": 0.3},
+            "analysis_explanation": {"factual_accuracy": {"score": 78, "key_indicators": filler(self.response_chars)}}
+        })
+
+    async def _completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        await self.delay()
+        if self.fail_every and self.requests % self.fail_every == 0:
+            return web.json_response({"error": {"message": "fake upstream failure", "type": "server_error"}}, status=500)
+
+        content = self._content(body)
+        base = {"id": f"chatcmpl-fake{self.requests}", "created": int(time.time()), "model": body.get("model", "fake")}
+        if not body.get("stream"):
+            return web.json_response({
+                **base,
+                "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(content) // 4, "total_tokens": len(content) // 4}
+            })
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for start in range(0, len(content), self.stream_chunk_chars):
+            if self.stream_chunk_delay:
+                await asyncio.sleep(self.stream_chunk_delay)
+            chunk = {**base, "object": "chat.completion.chunk", "choices": [
+                {"index": 0, "delta": {"content": content[start:start + self.stream_chunk_chars]}, "finish_reason": None}
+            ]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        done = {**base, "object": "chat.completion.chunk", "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        await response.write(f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n".encode())
+        await response.write_eof()
+        return response
@@ -0,0 +1,51 @@
+"""
+Local stand-in for Serper.dev search (point SERPER_API_URL at `search_url`).
+"""
+
+from typing import Any, Dict
+from aiohttp import web
+from .base import FakeServer
+from .openai import filler
+
+class FakeSerper(FakeServer):
+    """
+    Fake POST /search answering single queries and multi-query (list) payloads with
+    `results` organic results of `snippet_chars` each.
+    """
+
+    def __init__(self, results: int = 10, snippet_chars: int = 200, **kwargs):
+        super().__init__(**kwargs)
+        self.results = results
+        self.snippet_chars = snippet_chars
+        self.queries = 0
+
+    @property
+    def search_url(self) -> str:
+        """Value for SERPER_API_URL."""
+        return f"{self.url}/search"
+
+    def routes(self, app: web.Application) -> None:
+        app.router.add_post("/search", self._search)
+
+    def _answer(self, query: Dict[str, Any]) -> Dict[str, Any]:
+        self.queries += 1
+        q = query.get("q", "")
+        return {
+            "searchParameters": {"q": q, "gl": query.get("gl")},
+            "organic": [
+                {
+                    "title": f"Result {i + 1} for {q[:40]}",
+                    "link": f"https://news{i}.example.com/{self.queries}/{i}",
+                    "snippet": filler(self.snippet_chars),
+                    "position": i + 1
+                }
+                for i in range(min(self.results, int(query.get("num") or self.results)))
+            ]
+        }
+
+    async def _search(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        await self.delay()
+        if isinstance(body, list):
+            return web.json_response([self._answer(query) for query in body])
+        return web.json_response(self._answer(body))
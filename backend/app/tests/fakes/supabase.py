@@ -0,0 +1,25 @@
+"""
+Local stand-in for the Supabase REST API (point SUPABASE_URL at `url`).
+"""
+
+from typing import Dict
+from aiohttp import web
+from .base import FakeServer
+
+class FakeSupabase(FakeServer):
+    """Fake PostgREST: accepts inserts on POST /rest/v1/{table} and counts them per table."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.inserts: Dict[str, int] = {}
+
+    def routes(self, app: web.Application) -> None:
+        app.router.add_post("/rest/v1/{table}", self._insert)
+
+    async def _insert(self, request: web.Request) -> web.Response:
+        rows = await request.json()
+        await self.delay()
+        table = request.match_info["table"]
+        rows = rows if isinstance(rows, list) else [rows]
+        self.inserts[table] = self.inserts.get(table, 0) + len(rows)
+        return web.json_response(rows, status=201)
@@ -0,0 +1,67 @@
+"""
+Unit tests for the chat history token budget.
+
+Run from the backend directory:
+    python -m pytest app/tests/test_chat_history.py
+"""
+
+import asyncio
+from app.services.chat_history import ChatHistoryManager
+
+class _SummaryGateway:
+    """Gateway stand-in answering every summary request with a fixed text."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def chat_completion(self, *args, **kwargs):
+        self.calls += 1
+        message = type("Message", (), {"content": "summary"})()
+        choice = type("Choice", (), {"message": message})()
+        return type("Response", (), {"choices": [choice]})()
+
+def _conversation(turns, length=40):
+    messages = []
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"question {i} " + "q" * length})
+        messages.append({"role": "assistant", "content": f"answer {i} " + "a" * length})
+    messages.append({"role": "user", "content": "last question"})
+    return messages
+
+def _manager(keep_turns, max_prompt_tokens, summary_max_tokens=10):
+    manager = ChatHistoryManager(_SummaryGateway(), model="summary-model")
+    manager.keep_messages = keep_turns * 2
+    manager.max_prompt_tokens = max_prompt_tokens
+    manager.summary_max_tokens = summary_max_tokens
+    return manager
+
+def _build(manager, messages):
+    system = {"role": "system", "content": "context"}
+    return asyncio.run(manager.build_messages(system, messages))
+
+def test_short_conversation_is_sent_verbatim():
+    messages = _conversation(2)
+    built = _build(_manager(keep_turns=10, max_prompt_tokens=10_000), messages)
+    assert built[1:] == messages
+    assert built[0]["content"] == "context"
+
+def test_older_turns_are_summarized():
+    messages = _conversation(6)
+    built = _build(_manager(keep_turns=2, max_prompt_tokens=10_000), messages)
+    assert built[1] == {"role": "system", "content": "Summary of the earlier conversation:\nsummary"}
+    assert built[2]["role"] == "user"
+    assert built[-1] == messages[-1]
+
+def test_budget_trims_whole_turns():
+    # Budgets from nothing to a few turns; each cut must land on a user turn
+    messages = _conversation(6)
+    for max_prompt_tokens in range(40, 200, 5):
+        built = _build(_manager(keep_turns=10, max_prompt_tokens=max_prompt_tokens), messages)
+        verbatim = [m for m in built if m["role"] != "system"]
+        assert verbatim[0]["role"] == "user"
+        assert verbatim[-1] == messages[-1]
+
+def test_budget_keeps_last_message():
+    messages = _conversation(3, length=400)
+    built = _build(_manager(keep_turns=10, max_prompt_tokens=1), messages)
+    assert [m for m in built if m["role"] != "system"] == [messages[-1]]
@@ -0,0 +1,98 @@
+"""
+Unit tests for claim extraction and source ranking in the fact-check pipeline.
+
+Run from the backend directory:
+    python -m pytest app/tests/test_fact_check.py
+"""
+
+import asyncio
+from app.services.fact_check import extract_claims, rank_sources
+
+def test_claims_are_deduplicated():
+    claim = "The minister said unemployment fell 3 percent in March."
+    message = f'"{claim}" and again "{claim.upper()}" and "{claim.rstrip(".")}  !"'
+    assert extract_claims(message, max_claims=4) == [claim]
+
+def test_duplicates_do_not_use_up_claim_slots():
+    article = (
+        "The central bank said inflation rose 5 percent in 2023. "
+        "The central bank said inflation rose 5 percent in 2023! "
+        "the central bank said  inflation rose 5 percent in 2023 "
+        "\nOfficials reported that exports fell 2 percent last quarter."
+    )
+    claims = extract_claims("Is this true?", article_text=article, max_claims=2)
+    assert len(claims) == 2
+    assert claims[1].startswith("Officials reported")
+
+def test_claims_keep_original_order():
+    message = (
+        "Officials said 10 schools closed. "
+        "The Mayor Announced 2 Million Dollars For Roads According To Reports. "
+        "Police reported 3 arrests on Monday."
+    )
+    claims = extract_claims(message, max_claims=3)
+    assert [c.split()[0] for c in claims] == ["Officials", "The", "Police"]
+
+def test_rank_sources_merges_urls():
+    results = [
+        [{"url": "https://www.example.com/a/", "title": "A"}, {"url": "https://other.org/b", "title": "B"}],
+        [{"url": "http://example.com/a", "title": "A"}]
+    ]
+    ranked = rank_sources(results)
+    assert [s["title"] for s in ranked] == ["A", "B"]
+    assert ranked[0]["claims"] == [1, 2]
+
+ARTICLE = (
+    "The city council said the new bridge cost 40 million dollars in 2024. "
+    "Engineers reported that traffic fell 12 percent after the opening."
+)
+
+def _pipeline(monkeypatch, index):
+    from app.services import fact_check, local_index
+    monkeypatch.setattr(fact_check, "local_index", index)
+    monkeypatch.setattr(local_index, "local_index", index)
+    monkeypatch.setattr(local_index.settings, "LOCAL_INDEX_ENABLED", True)
+    pipeline = fact_check.FactCheckPipeline()
+    pipeline.local_enabled = True
+    pipeline.local_min_results = 2
+    pipeline.local_min_coverage = 0.5
+    return fact_check, pipeline
+
+def test_article_does_not_verify_itself(monkeypatch):
+    from app.services.local_index import BM25Index, index_analysis
+    index = BM25Index()
+    fact_check, pipeline = _pipeline(monkeypatch, index)
+    # One matching passage would be enough to skip Serper
+    pipeline.local_min_results = 1
+    index_analysis("20240101_000000", "texto", ARTICLE, {}, "2024-01-01T00:00:00")
+    searched = []
+
+    async def fake_search(queries, num_results=5):
+        searched.extend(queries)
+        return [[{"title": f"Web {i}", "snippet": q, "url": f"https://news.example/{i}"}] for i, q in enumerate(queries)]
+
+    monkeypatch.setattr(fact_check, "async_search_web_batch", fake_search)
+    evidence = asyncio.run(pipeline.gather_evidence("Is this true?", article_text=ARTICLE.upper()))
+    assert len(searched) == 2
+    assert "truthlens://" not in evidence
+    assert "Earlier TruthLens analyses" not in evidence
+
+def test_earlier_analyses_are_context_not_web_results(monkeypatch):
+    from app.services.local_index import BM25Index, index_analysis, index_search_results
+    index = BM25Index()
+    fact_check, pipeline = _pipeline(monkeypatch, index)
+    index_analysis("20240101_000000", "texto", ARTICLE, {}, "2024-01-01T00:00:00")
+    index_search_results([
+        {"title": "Bridge cost", "snippet": "The council said the bridge cost 40 million dollars in 2024.", "url": "https://a.example/1"},
+        {"title": "Bridge budget", "snippet": "New bridge cost 40 million dollars, the city council said.", "url": "https://b.example/2"}
+    ])
+
+    async def no_search(queries, num_results=5):
+        raise AssertionError("Serper should not be called")
+
+    monkeypatch.setattr(fact_check, "async_search_web_batch", no_search)
+    claim = "The city council said the new bridge cost 40 million dollars in 2024."
+    evidence = asyncio.run(pipeline.gather_evidence(f'"{claim}"', article_text="A different article about schools."))
+    web, _, earlier = evidence.partition("Earlier TruthLens analyses")
+    assert "https://a.example/1" in web and "truthlens://" not in web
+    assert "Earlier TruthLens analysis (2024-01-01)" in earlier
@@ -0,0 +1,79 @@
+"""
+Unit tests for the near-duplicate image index.
+
+Run from the backend directory:
+    python -m pytest app/tests/test_image_hash_index.py
+"""
+
+import random
+import pytest
+from app.services.image_hash_index import ImageHashIndex, hash_bands
+
+def _hashes(digest, phash, dhash=None):
+    return {"sha256": digest, "phash": phash, "dhash": phash if dhash is None else dhash, "metadata": {}}
+
+def _flip(value, bits):
+    for bit in bits:
+        value ^= 1 << bit
+    return value
+
+@pytest.fixture
+def index():
+    index = ImageHashIndex()
+    index.max_entries = 1000
+    index.max_distance = 6
+    index.bands = 7
+    index.ttl_seconds = 3600
+    return index
+
+def test_bands_cover_every_bit():
+    value = random.Random(0).getrandbits(64)
+    bands = hash_bands(value, 7)
+    assert len(bands) == 7
+    rebuilt, start = 0, 0
+    for band, band_value in bands:
+        width = 64 // 7 + (1 if band < 64 % 7 else 0)
+        rebuilt |= band_value << start
+        start += width
+    assert start == 64 and rebuilt == value
+
+def test_exact_and_near_matches(index):
+    rng = random.Random(1)
+    stored = rng.getrandbits(64)
+    index.add(_hashes("a", stored), {"verdict": "Likely real"})
+    assert index.lookup(_hashes("a", stored))["cache"]["match"] == "exact"
+    # Six flipped bits, one in each of six bands: still found through the seventh
+    near = _flip(stored, [0, 10, 20, 30, 40, 50])
+    result = index.lookup(_hashes("b", near))
+    assert result["cache"] == {"match": "near", "hamming_distance": 6, "metadata_differences": {}}
+    assert index.lookup(_hashes("c", _flip(stored, range(7)))) is None
+
+def test_near_lookup_matches_a_full_scan(index):
+    rng = random.Random(2)
+    stored = [rng.getrandbits(64) for _ in range(500)]
+    for i, phash in enumerate(stored):
+        index.add(_hashes(f"img{i}", phash), {"id": i})
+    for i in range(0, 500, 25):
+        query = _flip(stored[i], rng.sample(range(64), rng.randint(0, 8)))
+        expected = min(
+            (bin(query ^ phash).count("1"), j) for j, phash in enumerate(stored)
+        )
+        result = index.lookup(_hashes("query", query))
+        if expected[0] <= 6:
+            assert result["cache"]["hamming_distance"] == expected[0]
+        else:
+            assert result is None
+
+def test_evicted_entries_leave_the_band_index(index):
+    index.max_entries = 2
+    phashes = [0, (1 << 64) - 1, 0x00000000FFFFFFFF]
+    for i, phash in enumerate(phashes):
+        index.add(_hashes(f"img{i}", phash), {"id": i})
+    assert index.lookup(_hashes("query", 0)) is None
+    assert all("img0" not in keys for keys in index.band_index.values())
+
+def test_re_adding_an_image_replaces_its_bands(index):
+    index.add(_hashes("a", 0), {"v": 1})
+    index.add(_hashes("a", (1 << 64) - 1), {"v": 2})
+    assert index.lookup(_hashes("b", 0)) is None
+    assert index.lookup(_hashes("b", (1 << 64) - 1))["v"] == 2
@@ -0,0 +1,72 @@
+"""
+Unit tests for the local image triage.
+
+Run from the backend directory:
+    python -m pytest app/tests/test_image_triage.py
+"""
+
+import io
+import numpy as np
+import piexif
+from PIL import Image, PngImagePlugin
+from app.services.image_analysis import detect_ai_signature, extract_metadata, triage_image, log_magnitude_spectrum
+
+CAMERA_METADATA = {"exif_Make": "Canon", "exif_Model": "EOS R5", "exif_DateTimeOriginal": "2024:05:01 10:00:00"}
+CAMERA_TABLES = {"present": True, "standard_tables": False, "estimated_quality": None}
+
+def _photo():
+    rng = np.random.default_rng(0)
+    pixels = rng.normal(128, 40, (256, 256, 3)).clip(0, 255).astype(np.uint8)
+    return Image.fromarray(pixels)
+
+def _xmp(source_type: str) -> bytes:
+    return (
+        '<x:xmpmeta xmlns:x="adobe:ns:meta/"><rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#">'
+        '<rdf:Description xmlns:Iptc4xmpExt="http://iptc.org/std/Iptc4xmpExt/2008-02-29/" '
+        f'Iptc4xmpExt:DigitalSourceType="http://cv.iptc.org/newscodes/digitalsourcetype/{source_type}"/>'
+        '</rdf:RDF></x:xmpmeta>'
+    ).encode()
+
+def _reopen(img: Image.Image, **save_options) -> Image.Image:
+    buffered = io.BytesIO()
+    img.save(buffered, **save_options)
+    return Image.open(io.BytesIO(buffered.getvalue()))
+
+def _detect(img: Image.Image):
+    return detect_ai_signature(img, extract_metadata(img))
+
+def test_camera_metadata_is_never_decisive():
+    img = _photo()
+    triage = triage_image(img, CAMERA_METADATA, log_magnitude_spectrum(img), CAMERA_TABLES)
+    assert triage["ai_probability"] < 50
+    assert triage["decisive"] is False
+
+def test_generator_signature_is_decisive():
+    img = _photo()
+    triage = triage_image(img, {}, log_magnitude_spectrum(img), {"present": False}, signature="Midjourney")
+    assert triage["ai_probability"] == 97
+    assert triage["decisive"] is True
+
+def test_caption_mentioning_a_generator_is_not_a_signature():
+    exif = piexif.dump({"0th": {
+        piexif.ImageIFD.Make: b"Canon",
+        piexif.ImageIFD.Model: b"EOS R5",
+        piexif.ImageIFD.ImageDescription: b"Midjourney founder David Holz speaks at a conference",
+    }})
+    img = _reopen(_photo(), format="JPEG", exif=exif, comment=b"Made with Stable Diffusion? No.")
+    assert _detect(img) == (None, None)
+
+def test_composite_source_type_is_a_hint_only():
+    img = _reopen(_photo(), format="JPEG", xmp=_xmp("compositeWithTrainedAlgorithmicMedia"))
+    signature, hint = _detect(img)
+    assert signature is None and "composite" in hint
+    triage = triage_image(img, {}, log_magnitude_spectrum(img), {"present": False}, signature, hint)
+    assert triage["decisive"] is False
+
+def test_structured_provenance_is_a_signature():
+    assert _detect(_reopen(_photo(), format="JPEG", xmp=_xmp("trainedAlgorithmicMedia")))[0]
+    info = PngImagePlugin.PngInfo()
+    info.add_text("parameters", "a cat, Steps: 20, Sampler: Euler a")
+    assert _detect(_reopen(_photo(), format="PNG", pnginfo=info))[0]
+    exif = piexif.dump({"0th": {piexif.ImageIFD.Software: b"Adobe Firefly"}})
+    assert _detect(_reopen(_photo(), format="JPEG", exif=exif))[0] == "Software tag: Adobe Firefly"
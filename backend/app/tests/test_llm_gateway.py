@@ -0,0 +1,214 @@
+"""
+Unit tests for the LLM gateway: token buckets, circuit breaker, admission and retries.
+
+Run from the backend directory:
+    python -m pytest app/tests/test_llm_gateway.py
+"""
+
+import asyncio
+import time
+import pytest
+from app.core.config import settings
+from app.services.llm_gateway import (
+    LLMGateway, LLMGatewayBusy, LLMCircuitOpen, TokenBucket, CircuitBreaker, Priority, is_retryable
+)
+
+class UpstreamError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic."""
+    now = {"t": 1000.0}
+    monkeypatch.setattr(time, "monotonic", lambda: now["t"])
+    return now
+
+@pytest.fixture
+def gateway(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_SECONDS", 0.001)
+    monkeypatch.setattr(settings, "LLM_RETRY_MAX_SECONDS", 0.001)
+    monkeypatch.setattr(settings, "LLM_BREAKER_FAILURE_THRESHOLD", 3)
+    monkeypatch.setattr(settings, "LLM_BREAKER_RESET_SECONDS", 30.0)
+    gateway = LLMGateway()
+    gateway.queue_timeout = 0.2
+    return gateway
+
+def _failing(status_code: int, times: int = 1000):
+    calls = {"n": 0}
+
+    async def func():
+        calls["n"] += 1
+        if calls["n"] <= times:
+            raise UpstreamError(status_code)
+        return "ok"
+
+    return func, calls
+
+def test_bucket_refills_over_time(clock):
+    bucket = TokenBucket.per_minute(60)
+    assert bucket.wait_time(60, clock["t"]) == 0
+    bucket.take(60)
+    assert bucket.wait_time(1, clock["t"]) == pytest.approx(1.0)
+    clock["t"] += 0.5
+    assert bucket.wait_time(1, clock["t"]) == pytest.approx(0.5)
+    clock["t"] += 120
+    assert bucket.available(clock["t"]) == 60
+
+def test_bucket_charges_oversized_requests_the_capacity(clock):
+    bucket = TokenBucket(rate=10, capacity=100)
+    assert bucket.wait_time(500, clock["t"]) == 0
+    bucket.take(500)
+    assert bucket.tokens == 0
+    assert bucket.wait_time(500, clock["t"]) == pytest.approx(10.0)
+
+def test_breaker_opens_after_threshold(clock):
+    breaker = CircuitBreaker("model", threshold=3, reset_seconds=30)
+    for _ in range(2):
+        breaker.check()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(LLMCircuitOpen):
+        breaker.check()
+    assert breaker.stats()["opened_total"] == 1
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker("model", threshold=2, reset_seconds=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+def test_half_open_lets_one_trial_through(clock):
+    breaker = CircuitBreaker("model", threshold=1, reset_seconds=30)
+    breaker.record_failure()
+    clock["t"] += 31
+    breaker.check()
+    assert breaker.state == "half_open"
+    with pytest.raises(LLMCircuitOpen):
+        breaker.check()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.check()
+
+def test_failed_trial_reopens(clock):
+    breaker = CircuitBreaker("model", threshold=3, reset_seconds=30)
+    for _ in range(3):
+        breaker.record_failure()
+    clock["t"] += 31
+    breaker.check()
+    breaker.record_failure()
+    assert breaker.state == "open" and breaker.stats()["opened_total"] == 2
+    with pytest.raises(LLMCircuitOpen):
+        breaker.check()
+
+def test_retryable_errors():
+    assert is_retryable(UpstreamError(429)) and is_retryable(UpstreamError(503))
+    assert not is_retryable(UpstreamError(400))
+    assert is_retryable(asyncio.TimeoutError())
+
+def test_retries_until_success(gateway):
+    func, calls = _failing(503, times=2)
+    result = asyncio.run(gateway.call("openai", "model", "chat", Priority.INTERACTIVE, func))
+    assert result == "ok" and calls["n"] == 3
+    assert gateway.retries_total == 2
+    assert gateway.in_flight["openai"] == 0
+
+def test_client_errors_are_not_retried(gateway):
+    func, calls = _failing(400)
+    with pytest.raises(UpstreamError):
+        asyncio.run(gateway.call("openai", "model", "chat", Priority.INTERACTIVE, func))
+    assert calls["n"] == 1
+    assert gateway.breakers["model"].state == "closed"
+
+def test_retry_budget_caps_retries(gateway):
+    gateway.retry_budget = 0
+    func, calls = _failing(503)
+    with pytest.raises(UpstreamError):
+        asyncio.run(gateway.call("openai", "model", "chat", Priority.INTERACTIVE, func))
+    # The call itself earns LLM_RETRY_BUDGET_RATIO (< 1): not enough for a retry
+    assert calls["n"] == 1
+    assert gateway.retries_total == 0
+
+def test_open_breaker_fails_fast(gateway):
+    async def run():
+        func, calls = _failing(500)
+        for _ in range(2):
+            with pytest.raises(UpstreamError):
+                await gateway.call("openai", "model", "chat", Priority.INTERACTIVE, func)
+        with pytest.raises(LLMCircuitOpen):
+            await gateway.call("openai", "model", "chat", Priority.INTERACTIVE, func)
+        return calls
+
+    gateway.max_retries = 1
+    calls = asyncio.run(run())
+    # Two calls of up to two attempts; the third failure opened the circuit
+    assert calls["n"] == 3
+    assert gateway.breakers["model"].state == "open"
+    assert isinstance(LLMCircuitOpen("x"), LLMGatewayBusy)
+
+def test_waiters_are_served_by_priority(gateway):
+    gateway.concurrency["openai"] = 1
+    order = []
+
+    async def run():
+        release = asyncio.Event()
+
+        async def blocker():
+            await release.wait()
+
+        async def record(name):
+            order.append(name)
+
+        first = asyncio.create_task(gateway.call("openai", "model", "analyze", Priority.BATCH, blocker))
+        await asyncio.sleep(0)
+        waiting = [
+            asyncio.create_task(gateway.call("openai", "model", "analyze", Priority.BATCH, lambda: record("batch"))),
+            asyncio.create_task(gateway.call("openai", "model", "translate", Priority.STANDARD, lambda: record("standard"))),
+            asyncio.create_task(gateway.call("openai", "model", "chat", Priority.INTERACTIVE, lambda: record("interactive")))
+        ]
+        await asyncio.sleep(0.01)
+        assert gateway.stats()["queued"] == {"batch": 1, "standard": 1, "interactive": 1}
+        release.set()
+        await asyncio.gather(first, *waiting)
+
+    asyncio.run(run())
+    assert order == ["interactive", "standard", "batch"]
+
+def test_queue_timeout_raises_busy(gateway):
+    gateway.concurrency["openai"] = 1
+
+    async def run():
+        release = asyncio.Event()
+
+        async def blocker():
+            await release.wait()
+
+        first = asyncio.create_task(gateway.call("openai", "model", "chat", Priority.INTERACTIVE, blocker))
+        await asyncio.sleep(0)
+        with pytest.raises(LLMGatewayBusy):
+            await gateway.call("openai", "model", "chat", Priority.INTERACTIVE, blocker)
+        release.set()
+        await first
+
+    asyncio.run(run())
+    assert gateway.rejected_total == 1
+    assert gateway.in_flight["openai"] == 0 and gateway.stats()["queued"] == {}
+
+def test_empty_bucket_delays_admission(gateway, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_ENDPOINT_RPM", {**settings.LLM_ENDPOINT_RPM, "chat": 600})
+
+    async def run():
+        async def ok():
+            return "ok"
+
+        # Drain the 600 rpm endpoint bucket; the next call waits ~0.1s for one token
+        gateway._bucket("endpoint:chat", 600).take(600)
+        start = asyncio.get_running_loop().time()
+        await gateway.call("openai", "model", "chat", Priority.INTERACTIVE, ok)
+        return asyncio.get_running_loop().time() - start
+
+    assert 0.05 < asyncio.run(run()) < 0.2
@@ -0,0 +1,88 @@
+"""
+Unit tests for the local BM25 index.
+
+Run from the backend directory:
+    python -m pytest app/tests/test_local_index.py
+"""
+
+import json
+import math
+import pytest
+from app.services.local_index import BM25Index, tokenize, hit_to_result, index_saved_analyses, content_hash
+
+def test_tokenize_drops_stopwords_and_accents():
+    assert tokenize("El Presidente anunció que la inflación bajó 3%") == ["presidente", "anuncio", "inflacion", "bajo", "3"]
+
+def test_bm25_score_matches_formula():
+    index = BM25Index(k1=1.5, b=0.75)
+    index.add("a", "bridge bridge cost")
+    index.add("b", "school budget")
+    hits = index.search("bridge")
+    assert [hit["doc_id"] for hit in hits] == ["a"]
+    # n=2, df=1, tf=2, |a|=3, avgdl=2.5
+    idf = math.log(1 + (2 - 1 + 0.5) / (1 + 0.5))
+    norm = 1.5 * (1 - 0.75 + 0.75 * 3 / 2.5)
+    assert hits[0]["score"] == pytest.approx(idf * 2 * 2.5 / (2 + norm))
+
+def test_rare_terms_and_shorter_documents_rank_higher():
+    index = BM25Index()
+    index.add("common", "city council budget")
+    index.add("rare", "city council bridge")
+    index.add("other", "city school")
+    assert index.search("council bridge")[0]["doc_id"] == "rare"
+    index.add("long", "bridge " + " ".join(f"filler{i}" for i in range(50)))
+    index.add("short", "bridge report")
+    ranked = [hit["doc_id"] for hit in index.search("bridge", k=5)]
+    assert ranked.index("short") < ranked.index("long")
+
+def test_replacing_and_removing_documents():
+    index = BM25Index()
+    index.add("doc", "bridge cost")
+    index.add("doc", "school budget")
+    assert index.search("bridge") == []
+    assert index.search("school")[0]["doc_id"] == "doc"
+    index.remove("doc")
+    assert len(index) == 0 and index.postings == {} and index.total_length == 0
+
+def test_oldest_documents_are_evicted():
+    index = BM25Index(max_documents=2)
+    for doc_id in ("a", "b", "c"):
+        index.add(doc_id, f"bridge {doc_id}")
+    assert {hit["doc_id"] for hit in index.search("bridge")} == {"b", "c"}
+
+def test_coverage():
+    index = BM25Index()
+    index.add("a", "bridge cost million")
+    hits = index.search("bridge cost opening")
+    assert BM25Index.coverage("bridge cost opening", hits) == pytest.approx(2 / 3)
+    assert BM25Index.coverage("bridge", []) == 0.0
+
+def test_passages_point_at_the_relevant_part():
+    index = BM25Index()
+    text = "Schools reopened in the north. " * 40 + "\n\nThe bridge cost 40 million dollars."
+    index.add_passages("analysis:1", text, {"source": "analysis"})
+    hits = index.search("bridge cost")
+    assert len(index) > 1
+    assert hits[0]["doc_id"] != "analysis:0" and "bridge" in hits[0]["text"]
+
+def test_hit_to_result_uses_metadata():
+    index = BM25Index()
+    index.add("web:1", "Bridge\nIt cost a lot", {"source": "web", "title": "Bridge", "snippet": "It cost a lot", "url": "https://a.example"})
+    assert hit_to_result(index.search("bridge")[0]) == {"title": "Bridge", "snippet": "It cost a lot", "url": "https://a.example", "source": "web"}
+
+def test_seed_from_saved_analyses(tmp_path, monkeypatch):
+    from app.services import local_index as module
+    index = BM25Index()
+    monkeypatch.setattr(module, "local_index", index)
+    monkeypatch.setattr(module.settings, "LOCAL_INDEX_ENABLED", True)
+    article = "The bridge cost 40 million dollars."
+    (tmp_path / "20240101_000000_analysis.json").write_text(json.dumps({
+        "tipo_analisis": "texto", "input_original": article, "resultado": {}, "fecha": "2024-01-01T00:00:00"
+    }))
+    (tmp_path / "20240102_000000_analysis.json").write_text(json.dumps({
+        "tipo_analisis": "imagen", "input_original": "photo.png", "resultado": {}, "fecha": "2024-01-02T00:00:00"
+    }))
+    assert index_saved_analyses(str(tmp_path)) == 2
+    hit = index.search("bridge")[0]
+    assert hit["metadata"]["url"] == "truthlens://analysis/20240101_000000"
+    assert hit["metadata"]["content_hash"] == content_hash("  THE bridge cost 40 million dollars!")
@@ -0,0 +1,82 @@
+"""
+Unit tests for the voice relay queue drop and coalesce policy.
+
+Run from the backend directory:
+    python -m pytest app/tests/test_relay_queue.py
+"""
+
+import asyncio
+from app.websockets.relay_queue import RelayQueue
+
+def _drain(queue):
+    async def run():
+        return [await queue.get() for _ in range(len(queue))]
+    return asyncio.run(run())
+
+def test_fifo_order():
+    queue = RelayQueue("test", max_items=10, max_bytes=1000)
+    for frame in (b"a", "ctrl", b"b"):
+        queue.put(frame, audio=isinstance(frame, bytes))
+    assert _drain(queue) == [b"a", "ctrl", b"b"]
+    assert queue.stats()["sent"] == 3
+
+def test_oldest_audio_is_dropped_at_item_limit():
+    queue = RelayQueue("test", max_items=3, max_bytes=1000)
+    for i in range(5):
+        queue.put(bytes([i]), audio=True)
+    assert _drain(queue) == [b"\x02", b"\x03", b"\x04"]
+    assert queue.stats()["dropped"] == 2
+
+def test_oldest_audio_is_dropped_at_byte_limit():
+    queue = RelayQueue("test", max_items=100, max_bytes=10)
+    for i in range(4):
+        queue.put(bytes([i]) * 4, audio=True)
+    assert _drain(queue) == [b"\x02" * 4, b"\x03" * 4]
+    assert queue.stats()["dropped"] == 2
+
+def test_control_frames_are_never_dropped():
+    queue = RelayQueue("test", max_items=2, max_bytes=1000)
+    queue.put("start", audio=False)
+    queue.put(b"old", audio=True)
+    queue.put("mid", audio=False)
+    queue.put(b"new", audio=True)
+    queue.put("end", audio=False)
+    assert _drain(queue) == ["start", "mid", "end"]
+    assert queue.stats()["dropped"] == 2
+
+def test_only_control_frames_exceed_the_limit():
+    queue = RelayQueue("test", max_items=1, max_bytes=1000)
+    queue.put("a")
+    queue.put("b")
+    assert _drain(queue) == ["a", "b"]
+    assert queue.stats()["dropped"] == 0
+
+def test_backlogged_audio_is_coalesced():
+    queue = RelayQueue("test", max_items=10, max_bytes=1000, coalesce=True, coalesce_max_bytes=6)
+    for chunk in (b"ab", b"cd", b"ef", b"gh"):
+        queue.put(chunk, audio=True)
+    assert _drain(queue) == [b"abcdef", b"gh"]
+    assert queue.stats()["coalesced"] == 2
+
+def test_coalesce_only_merges_raw_audio_tails():
+    queue = RelayQueue("test", max_items=10, max_bytes=1000, coalesce=True)
+    queue.put(b"a", audio=True)
+    queue.put("ctrl", audio=False)
+    queue.put(b"b", audio=True)
+    queue.put('{"audio": "c"}', audio=True)
+    queue.put(b"d", audio=True)
+    assert _drain(queue) == [b"a", "ctrl", b"b", '{"audio": "c"}', b"d"]
+    assert queue.stats()["coalesced"] == 0
+
+def test_get_waits_for_a_frame():
+    queue = RelayQueue("test", max_items=10, max_bytes=1000)
+
+    async def run():
+        getter = asyncio.create_task(queue.get())
+        await asyncio.sleep(0.01)
+        assert not getter.done()
+        queue.put(b"late", audio=True)
+        return await asyncio.wait_for(getter, 1)
+
+    assert asyncio.run(run()) == b"late"
+    assert queue.stats()["depth"] == 0 and queue.stats()["bytes"] == 0
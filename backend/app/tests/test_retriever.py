@@ -0,0 +1,132 @@
+"""
+Unit tests for the async Serper client, run against the local FakeSerper server.
+
+Run from the backend directory:
+    python -m pytest app/tests/test_retriever.py
+"""
+
+import asyncio
+import pytest
+from aiohttp import web
+from app.core.config import settings
+from app.utils import retriever
+from app.utils.http_client import close_http_session
+from app.utils.search_cache import SearchCache
+from app.tests.fakes.serper import FakeSerper
+
+class CountingSerper(FakeSerper):
+    """FakeSerper recording the largest number of requests it served at once."""
+
+    def __init__(self, fail_batches: bool = False, fail_all: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self.fail_batches = fail_batches
+        self.fail_all = fail_all
+        self.active = 0
+        self.max_active = 0
+        self.payloads = []
+
+    async def _search(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        self.payloads.append(body)
+        if self.fail_all or (self.fail_batches and isinstance(body, list)):
+            return web.json_response({"message": "error"}, status=500)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await self.delay()
+            if isinstance(body, list):
+                return web.json_response([self._answer(query) for query in body])
+            return web.json_response(self._answer(body))
+        finally:
+            self.active -= 1
+
+@pytest.fixture
+def serper(monkeypatch):
+    monkeypatch.setattr(retriever, "search_cache", SearchCache())
+    monkeypatch.setattr(settings, "SERPER_BATCH_SIZE", 2)
+
+    def run(test, concurrency: int = 8, **server_kwargs):
+        server = CountingSerper(**server_kwargs)
+
+        async def main():
+            await server.start()
+            monkeypatch.setattr(settings, "SERPER_API_URL", server.search_url)
+            # Created in this test's event loop
+            monkeypatch.setattr(retriever, "_serper_semaphore", asyncio.Semaphore(concurrency))
+            try:
+                return await test(server)
+            finally:
+                await close_http_session()
+                await server.stop()
+
+        return asyncio.run(main())
+
+    return run
+
+def test_search_parses_and_caches(serper):
+    async def test(server):
+        first = await retriever.async_search_web("bridge cost", num_results=3)
+        second = await retriever.async_search_web("Bridge  COST?", num_results=2)
+        return server, first, second
+
+    server, first, second = serper(test)
+    assert len(first) == 3
+    assert set(first[0]) == {"title", "snippet", "url"}
+    assert first[0]["title"].startswith("Result 1 for bridge cost")
+    assert second == first[:2]
+    assert len(server.payloads) == 1
+
+def test_errors_return_empty_and_are_not_cached(serper):
+    async def test(server):
+        first = await retriever.async_search_web("query")
+        server.fail_all = False
+        second = await retriever.async_search_web("query")
+        return server, first, second
+
+    server, first, second = serper(test, fail_all=True)
+    assert first == []
+    assert len(second) == 5
+    assert len(server.payloads) == 2
+
+def test_batch_keeps_query_order(serper):
+    queries = [f"claim {i}" for i in range(5)]
+
+    async def test(server):
+        await retriever.async_search_web("claim 3")
+        return server, await retriever.async_search_web_batch(queries, num_results=2)
+
+    server, results = serper(test)
+    assert [r[0]["title"] for r in results] == [f"Result 1 for claim {i}" for i in range(5)]
+    # claim 3 came from the cache; the other 4 went out as two 2-query payloads
+    assert [len(p) if isinstance(p, list) else 1 for p in server.payloads] == [1, 2, 2]
+
+def test_failed_batch_falls_back_to_single_queries(serper):
+    queries = ["first claim", "second claim"]
+
+    async def test(server):
+        return server, await retriever.async_search_web_batch(queries, num_results=2)
+
+    server, results = serper(test, fail_batches=True)
+    assert [r[0]["title"] for r in results] == ["Result 1 for first claim", "Result 1 for second claim"]
+    assert sum(1 for p in server.payloads if isinstance(p, dict)) == 2
+
+def test_concurrent_searches_are_limited(serper):
+    async def test(server):
+        await asyncio.gather(*(retriever.async_search_web(f"query {i}") for i in range(6)))
+        return server
+
+    server = serper(test, concurrency=2, latency=0.05)
+    assert server.max_active == 2
+    assert len(server.payloads) == 6
+
+def test_cancellation_propagates(serper):
+    async def test(server):
+        task = asyncio.create_task(retriever.async_search_web("slow query"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return server
+
+    serper(test, latency=1.0)
+    assert retriever.search_cache.get("slow query", 5) is None
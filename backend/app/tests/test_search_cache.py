@@ -0,0 +1,105 @@
+"""
+Unit tests for the search result cache (memory TTL/LRU tier and disk tier).
+
+Run from the backend directory:
+    python -m pytest app/tests/test_search_cache.py
+"""
+
+import os
+import time
+import pytest
+from app.utils.search_cache import SearchCache
+from app.utils.text_normalize import normalize_query
+
+RESULTS = [{"title": f"Result {i}", "snippet": "...", "url": f"https://example.com/{i}"} for i in range(10)]
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time and time.monotonic."""
+    now = {"t": 1_000_000.0}
+    monkeypatch.setattr(time, "time", lambda: now["t"])
+    monkeypatch.setattr(time, "monotonic", lambda: now["t"])
+    return now
+
+def test_normalize_query():
+    assert normalize_query("  ¿Es  CIERTO que Ñandú subió? ") == "es cierto que nandu subio"
+
+def test_hit_ignores_case_spacing_and_accents():
+    cache = SearchCache()
+    cache.set("Inflación en España", 5, RESULTS[:5])
+    assert cache.get("  inflacion EN espana?", 5) == RESULTS[:5]
+    assert cache.get("inflacion en espana", 5, geo="us") is None
+
+def test_larger_entry_serves_smaller_requests():
+    cache = SearchCache()
+    cache.set("query", 10, RESULTS)
+    assert cache.get("query", 5) == RESULTS[:5]
+    # A smaller search does not replace the larger entry
+    cache.set("query", 3, RESULTS[:3])
+    assert cache.get("query", 10) == RESULTS
+
+def test_smaller_entry_serves_larger_request_only_when_exhausted():
+    cache = SearchCache()
+    cache.set("query", 5, RESULTS[:5])
+    assert cache.get("query", 10) is None
+    # The provider had only 2 results for a 5-result search: nothing more to fetch
+    cache.set("rare query", 5, RESULTS[:2])
+    assert cache.get("rare query", 10) == RESULTS[:2]
+
+def test_entries_expire(clock):
+    cache = SearchCache(ttl_seconds=60)
+    cache.set("query", 5, RESULTS[:5])
+    clock["t"] += 59
+    assert cache.get("query", 5) == RESULTS[:5]
+    clock["t"] += 2
+    assert cache.get("query", 5) is None
+
+def test_least_recently_used_entry_is_evicted():
+    cache = SearchCache(maxsize=2)
+    cache.set("a", 5, RESULTS[:5])
+    cache.set("b", 5, RESULTS[:5])
+    cache.get("a", 5)
+    cache.set("c", 5, RESULTS[:5])
+    assert cache.get("b", 5) is None
+    assert cache.get("a", 5) is not None and cache.get("c", 5) is not None
+    assert cache.stats()["evictions"] == 1
+
+def test_disk_tier_survives_restart(tmp_path, clock):
+    SearchCache(disk_dir=str(tmp_path), ttl_seconds=60).set("query", 5, RESULTS[:5])
+    restarted = SearchCache(disk_dir=str(tmp_path), ttl_seconds=60)
+    assert restarted.get("query", 5) == RESULTS[:5]
+    assert restarted.stats()["disk_hits"] == 1
+    # Promoted to memory, with the remaining lifetime of the disk entry
+    clock["t"] += 30
+    os.remove(restarted._disk_path(restarted.make_key("query")))
+    assert restarted.get("query", 5) == RESULTS[:5]
+    clock["t"] += 31
+    assert restarted.get("query", 5) is None
+
+def test_disk_tier_refills_evicted_entries(tmp_path):
+    cache = SearchCache(maxsize=1, disk_dir=str(tmp_path))
+    cache.set("a", 5, RESULTS[:5])
+    cache.set("b", 5, RESULTS[:5])
+    assert cache.get("a", 5) == RESULTS[:5]
+    assert cache.stats()["disk_hits"] == 1
+
+def test_expired_disk_entries_are_removed(tmp_path, clock):
+    cache = SearchCache(disk_dir=str(tmp_path), ttl_seconds=60)
+    cache.set("query", 5, RESULTS[:5])
+    path = cache._disk_path(cache.make_key("query"))
+    clock["t"] += 61
+    assert SearchCache(disk_dir=str(tmp_path), ttl_seconds=60).get("query", 5) is None
+    assert not os.path.exists(path)
+
+def test_corrupt_disk_entry_is_a_miss(tmp_path):
+    cache = SearchCache(disk_dir=str(tmp_path))
+    with open(cache._disk_path(cache.make_key("query")), "w") as f:
+        f.write("{not json")
+    assert cache.get("query", 5) is None
+
+def test_set_does_not_count_hits_or_misses():
+    cache = SearchCache()
+    cache.set("query", 5, RESULTS[:5])
+    cache.set("query", 10, RESULTS)
+    stats = cache.stats()
+    assert stats["hits"] == 0 and stats["misses"] == 0
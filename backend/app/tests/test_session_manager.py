@@ -0,0 +1,163 @@
+"""
+Unit tests for voice session admission control.
+
+Run from the backend directory:
+    python -m pytest app/tests/test_session_manager.py
+"""
+
+import asyncio
+from app.websockets.session_manager import VoiceSessionManager, CLOSE_TRY_AGAIN_LATER
+
+class FakeWebSocket:
+    """Accepted WebSocket stand-in that records what it is sent."""
+
+    def __init__(self, disconnected: bool = False):
+        self.sent = []
+        self.close_code = None
+        self.gone = asyncio.Event()
+        self.disconnected = disconnected
+
+    async def send_json(self, data):
+        if self.disconnected:
+            raise RuntimeError("Cannot call \"send\" once a close message has been sent.")
+        self.sent.append(data)
+
+    async def close(self, code=1000):
+        self.close_code = code
+
+    async def receive(self):
+        await self.gone.wait()
+        return {"type": "websocket.disconnect"}
+
+def _positions():
+    positions = []
+
+    async def on_position(position):
+        positions.append(position)
+
+    return positions, on_position
+
+def test_slots_are_taken_without_waiting():
+    manager = VoiceSessionManager(max_sessions=2, max_queue=0, queue_timeout=1)
+    assert manager.try_acquire() and manager.try_acquire()
+    assert not manager.try_acquire()
+    manager.release()
+    assert manager.try_acquire()
+    assert manager.stats()["admitted_total"] == 3
+
+def test_rejected_when_queue_is_full():
+    async def run():
+        manager = VoiceSessionManager(max_sessions=1, max_queue=1, queue_timeout=5)
+        assert manager.try_acquire()
+        _, on_position = _positions()
+        waiter = asyncio.create_task(manager.acquire(on_position))
+        await asyncio.sleep(0)
+        rejected = await manager.acquire(on_position)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        return manager, rejected
+
+    manager, rejected = asyncio.run(run())
+    assert rejected is False
+    assert manager.stats()["rejected_total"] == 1
+    assert manager.stats()["queued"] == 0
+
+def test_released_slot_goes_to_first_waiter():
+    async def run():
+        manager = VoiceSessionManager(max_sessions=1, max_queue=2, queue_timeout=5)
+        assert manager.try_acquire()
+        first_positions, first_cb = _positions()
+        second_positions, second_cb = _positions()
+        first = asyncio.create_task(manager.acquire(first_cb))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(manager.acquire(second_cb))
+        await asyncio.sleep(0)
+        # A new connection may not jump the queue
+        assert not manager.try_acquire()
+        manager.release()
+        assert await first is True
+        await asyncio.sleep(0)
+        assert not second.done()
+        manager.release()
+        assert await second is True
+        return manager, first_positions, second_positions
+
+    manager, first_positions, second_positions = asyncio.run(run())
+    assert first_positions == [1]
+    assert second_positions == [2, 1]
+    assert manager.active == 1
+
+def test_queue_timeout_rejects():
+    async def run():
+        manager = VoiceSessionManager(max_sessions=1, max_queue=1, queue_timeout=0.05)
+        assert manager.try_acquire()
+        _, on_position = _positions()
+        return manager, await manager.acquire(on_position)
+
+    manager, admitted = asyncio.run(run())
+    assert admitted is False
+    assert manager.stats()["queue_timeouts_total"] == 1
+    assert manager.stats()["queued"] == 0 and manager.active == 1
+
+def test_cancelled_waiter_leaves_queue():
+    async def run():
+        manager = VoiceSessionManager(max_sessions=1, max_queue=2, queue_timeout=5)
+        assert manager.try_acquire()
+        _, first_cb = _positions()
+        second_positions, second_cb = _positions()
+        first = asyncio.create_task(manager.acquire(first_cb))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(manager.acquire(second_cb))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.gather(first, return_exceptions=True)
+        await asyncio.sleep(0)
+        manager.release()
+        assert await second is True
+        return manager, second_positions
+
+    manager, second_positions = asyncio.run(run())
+    assert second_positions == [2, 1]
+    assert manager.active == 1
+
+def test_admit_rejects_with_capacity_error():
+    async def run():
+        manager = VoiceSessionManager(max_sessions=1, max_queue=0, queue_timeout=1)
+        assert await manager.admit(FakeWebSocket())
+        websocket = FakeWebSocket()
+        admitted = await manager.admit(websocket)
+        return manager, websocket, admitted
+
+    manager, websocket, admitted = asyncio.run(run())
+    assert admitted is False
+    assert websocket.sent[-1]["type"] == "error" and websocket.sent[-1]["code"] == "capacity"
+    assert websocket.close_code == CLOSE_TRY_AGAIN_LATER
+    assert manager.stats()["rejected_total"] == 1
+
+def test_admit_drops_client_that_leaves_the_queue():
+    async def run():
+        manager = VoiceSessionManager(max_sessions=1, max_queue=1, queue_timeout=5)
+        assert manager.try_acquire()
+        websocket = FakeWebSocket()
+        admit = asyncio.create_task(manager.admit(websocket))
+        await asyncio.sleep(0.01)
+        websocket.gone.set()
+        return manager, websocket, await admit
+
+    manager, websocket, admitted = asyncio.run(run())
+    assert admitted is False
+    assert websocket.sent == [{"type": "queued", "position": 1}]
+    assert manager.stats()["queued"] == 0 and manager.active == 1
+
+def test_admit_drops_queued_client_that_cannot_be_sent_its_position():
+    async def run():
+        manager = VoiceSessionManager(max_sessions=1, max_queue=1, queue_timeout=5)
+        assert manager.try_acquire()
+        admitted = await manager.admit(FakeWebSocket(disconnected=True))
+        queued = manager.stats()["queued"]
+        manager.release()
+        return manager, admitted, queued
+
+    manager, admitted, queued = asyncio.run(run())
+    assert admitted is False
+    assert queued == 0 and manager.active == 0
@@ -0,0 +1,42 @@
+"""
+Unit tests for the long-document text chunker.
+
+Run from the backend directory:
+    python -m pytest app/tests/test_text_chunker.py
+"""
+
+import pytest
+from app.utils.text_chunker import split_text_into_chunks, get_overlap_context
+
+def join(chunks):
+    return "".join(chunk + sep for chunk, sep in chunks)
+
+@pytest.mark.parametrize("text", [
+    "One paragraph. Two sentences.",
+    "\n\nleading blank lines",
+    "  leading spaces and trailing\n\n",
+    "First paragraph.\n\n\n\nSecond paragraph after several blank lines.",
+    "A sentence. " * 400,
+    "word" * 2000,
+    "An over-long sentence\nwith a line break,\ttabs and  double spaces " * 30,
+    "  leading spaces in a long sentence " * 30,
+])
+@pytest.mark.parametrize("max_chars", [50, 300, 3000])
+def test_round_trip_is_lossless(text, max_chars):
+    assert join(split_text_into_chunks(text, max_chars)) == text
+
+def test_chunks_respect_max_chars():
+    text = "\n\n".join("Sentence number %d is here. " % i * 5 for i in range(40))
+    for chunk, _ in split_text_into_chunks(text, 200):
+        assert len(chunk) <= 200
+
+def test_leading_separator_stays_with_first_chunk():
+    assert split_text_into_chunks("\n\nleading", 100) == [("\n\nleading", "")]
+
+def test_invalid_max_chars():
+    with pytest.raises(ValueError):
+        split_text_into_chunks("text", 0)
+
+def test_overlap_context_ends_on_boundary():
+    context = get_overlap_context("First sentence here. Second sentence is the tail.", 30)
+    assert context == "Second sentence is the tail."
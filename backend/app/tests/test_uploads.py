@@ -0,0 +1,47 @@
+"""
+Unit tests for the upload size limits.
+
+Run from the backend directory:
+    python -m pytest app/tests/test_uploads.py
+"""
+
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+from app.utils.uploads import UploadSizeLimitMiddleware
+
+def _client(limit):
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    @app.post("/other")
+    async def other(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    app.add_middleware(UploadSizeLimitMiddleware, limits={"/upload": limit})
+    return TestClient(app)
+
+def test_upload_within_limit():
+    response = _client(4096).post("/upload", files={"file": ("a.bin", b"x" * 1000)})
+    assert response.status_code == 200
+    assert response.json() == {"size": 1000}
+
+def test_content_length_over_limit():
+    response = _client(4096).post("/upload", files={"file": ("a.bin", b"x" * 10000)})
+    assert response.status_code == 413
+
+def test_chunked_body_over_limit():
+    def body():
+        yield b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.bin\"\r\n\r\n"
+        for _ in range(10):
+            yield b"x" * 1000
+        yield b"\r\n--b--\r\n"
+
+    response = _client(4096).post("/upload", content=body(), headers={"content-type": "multipart/form-data; boundary=b"})
+    assert response.status_code == 413
+
+def test_other_paths_are_not_limited():
+    response = _client(4096).post("/other", files={"file": ("a.bin", b"x" * 10000)})
+    assert response.status_code == 200
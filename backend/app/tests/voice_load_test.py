@@ -0,0 +1,310 @@
+"""
+Load test for the voice WebSocket proxy (/ws/voice).
+
+Starts a local fake ElevenLabs server, runs the API in a uvicorn subprocess pointed
+at it through ELEVENLABS_BASE_URL, and drives N synthetic clients streaming audio in
+real time. Each step reports per-chunk proxy latency (client -> fake ElevenLabs and
+back), the proxy's CPU per session and its dropped frames; the largest step within
+the latency budget with no errors or drops is the maximum sustainable session count.
+
+Usage (from the backend directory):
+    python -m app.tests.voice_load_test --steps 5,10,20,40 --duration 20
+    python -m app.tests.voice_load_test --protocol binary --audio-format webm --webm-file sample.webm --webm-seconds 10
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import math
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+import aiohttp
+import websockets
+from app.tests.benchmarks.harness import ServerProcess, percentile
+from app.tests.fakes.elevenlabs import FakeElevenLabs, read_stamp
+
+PCM_BYTES_PER_SECOND = 32000  # 16 kHz 16-bit mono
+
+def synthetic_pcm(seconds: float) -> bytes:
+    """A 440 Hz tone as 16 kHz 16-bit mono PCM."""
+    samples = int(seconds * 16000)
+    return b"".join(
+        int(8000 * math.sin(2 * math.pi * 440 * i / 16000)).to_bytes(2, "little", signed=True)
+        for i in range(samples)
+    )
+
+def process_cpu_seconds(pid: int) -> float:
+    """User + system CPU of a process and its reaped children (ffmpeg), from /proc."""
+    with open(f"/proc/{pid}/stat") as f:
+        fields = f.read().rsplit(")", 1)[1].split()
+    # utime, stime, cutime, cstime are fields 14-17 of /proc/<pid>/stat
+    return sum(int(v) for v in fields[11:15]) / os.sysconf("SC_CLK_TCK")
+
+class VoiceClient:
+    """
+    One synthetic voice client.
+
+    Streams audio in real-time chunks of chunk_ms and records when each chunk was
+    sent and when each stamped audio reply came back.
+    """
+
+    def __init__(self, label: str, url: str, audio: bytes, chunk_bytes: int, chunk_ms: int,
+                 duration: float, protocol: str, audio_format: str):
+        self.label = label
+        self.url = url
+        self.audio = audio
+        self.chunk_bytes = chunk_bytes
+        self.chunk_ms = chunk_ms
+        self.duration = duration
+        self.protocol = protocol
+        self.audio_format = audio_format
+        # (cumulative audio bytes after the chunk, monotonic send time)
+        self.sends: List[tuple] = []
+        self.downstream_ms: List[float] = []
+        self.connect_ms: Optional[float] = None
+        self.error: Optional[str] = None
+
+    async def run(self) -> None:
+        query = f"?protocol=binary&audio_format={self.audio_format}" if self.protocol == "binary" else ""
+        started = time.monotonic()
+        try:
+            async with websockets.connect(f"{self.url}/ws/voice{query}", max_size=None) as ws:
+                if not await self._wait_ready(ws):
+                    return
+                self.connect_ms = (time.monotonic() - started) * 1000
+                await ws.send(json.dumps({"type": "contextual_update", "text": self.label}))
+                receiver = asyncio.create_task(self._receive(ws))
+                await self._stream(ws)
+                # Let the replies to the last chunks arrive
+                await asyncio.sleep(0.5)
+                receiver.cancel()
+        except Exception as e:
+            self.error = self.error or f"{type(e).__name__}: {e}"
+
+    async def _wait_ready(self, ws) -> bool:
+        while True:
+            message = json.loads(await ws.recv())
+            if message.get("type") == "status":
+                return True
+            if message.get("type") == "error":
+                self.error = message.get("code") or message.get("message")
+                return False
+
+    async def _stream(self, ws) -> None:
+        chunk_seconds = self.chunk_ms / 1000
+        total = int(self.duration / chunk_seconds)
+        offset = sent_bytes = 0
+        start = time.monotonic()
+        for k in range(total):
+            chunk = self.audio[offset:offset + self.chunk_bytes]
+            offset += self.chunk_bytes
+            if offset >= len(self.audio):
+                # Loop the source; a webm source restarts with its stream header
+                offset = 0
+            if self.protocol == "binary":
+                await ws.send(chunk)
+            else:
+                await ws.send(json.dumps({
+                    "type": "user_audio_chunk",
+                    "audio": base64.b64encode(chunk).decode("utf-8"),
+                    "audio_format": self.audio_format
+                }))
+            sent_bytes += len(chunk)
+            self.sends.append((sent_bytes, time.monotonic()))
+            await asyncio.sleep(max(0.0, start + (k + 1) * chunk_seconds - time.monotonic()))
+
+    async def _receive(self, ws) -> None:
+        async for data in ws:
+            if isinstance(data, bytes):
+                continue
+            message = json.loads(data)
+            if message.get("type") in ("audio", "audio_response") and message.get("audio"):
+                sent_at = read_stamp(base64.b64decode(message["audio"]))
+                if sent_at is not None:
+                    self.downstream_ms.append((time.monotonic() - sent_at) * 1000)
+            elif message.get("type") == "error":
+                self.error = message.get("message")
+
+    def upstream_ms(self, arrivals: List[tuple]) -> List[float]:
+        """
+        Per-chunk latency from the client to the fake ElevenLabs server.
+
+        PCM passes through unchanged, so a chunk has arrived once the fake has received
+        as many bytes as were sent up to its end. Webm is transcoded, so arrivals are
+        placed on the audio clock instead: PCM ending at t seconds of audio is due at
+        the stream start plus t.
+        """
+        if not self.sends:
+            return []
+        if self.audio_format != "webm":
+            latencies, i = [], 0
+            for sent_bytes, sent_at in self.sends:
+                while i < len(arrivals) and arrivals[i][0] < sent_bytes:
+                    i += 1
+                if i == len(arrivals):
+                    break
+                latencies.append((arrivals[i][1] - sent_at) * 1000)
+            return latencies
+        stream_start = self.sends[0][1] - self.chunk_ms / 1000
+        return [max(0.0, (arrived_at - stream_start - pcm_bytes / PCM_BYTES_PER_SECOND) * 1000) for pcm_bytes, arrived_at in arrivals]
+
+async def proxy_drops(server_url: str, stats_token: str) -> int:
+    """Frames dropped by the relay queues of the live sessions."""
+    async with aiohttp.ClientSession(headers={"Authorization": f"Bearer {stats_token}"}) as session:
+        async with session.get(f"{server_url}/api/voice/sessions") as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+    return sum(s["upstream"]["dropped"] + s["downstream"]["dropped"] for s in data["sessions"].values())
+
+async def run_step(sessions: int, args, fake: FakeElevenLabs, server_url: str, server_pid: Optional[int], audio: bytes, chunk_bytes: int) -> Dict[str, Any]:
+    ws_url = server_url.replace("http", "ws", 1)
+    clients = [
+        VoiceClient(f"bench-{sessions}-{i}", ws_url, audio, chunk_bytes, args.chunk_ms, args.duration, args.protocol, args.audio_format)
+        for i in range(sessions)
+    ]
+
+    async def start_client(i: int, client: VoiceClient):
+        # Spread the connections over the ramp instead of dialing all at once
+        await asyncio.sleep(args.ramp_seconds * i / sessions)
+        await client.run()
+
+    cpu_before = process_cpu_seconds(server_pid) if server_pid else None
+    started = time.monotonic()
+    tasks = [asyncio.create_task(start_client(i, c)) for i, c in enumerate(clients)]
+    # Sample the relay queues while every session is still streaming
+    await asyncio.sleep(args.ramp_seconds + args.duration * 0.9)
+    drops = await proxy_drops(server_url, args.stats_token)
+    await asyncio.gather(*tasks)
+    elapsed = time.monotonic() - started
+    # Closing sessions reap their ffmpeg processes; give them a moment before reading CPU
+    await asyncio.sleep(1.0)
+    cpu = process_cpu_seconds(server_pid) - cpu_before if server_pid else None
+
+    conversations = fake.by_label()
+    upstream, downstream = [], []
+    for client in clients:
+        conversation = conversations.get(client.label)
+        if conversation is not None:
+            upstream.extend(client.upstream_ms(conversation.arrivals))
+        downstream.extend(client.downstream_ms)
+    errors = [c.error for c in clients if c.error]
+    connected = [c.connect_ms for c in clients if c.connect_ms is not None]
+
+    result = {
+        "sessions": sessions,
+        "connected": len(connected),
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:3],
+        "dropped_frames": drops,
+        "connect_ms_p95": percentile(connected, 95),
+        "upstream_ms": {f"p{p}": percentile(upstream, p) for p in (50, 95, 99)},
+        "downstream_ms": {f"p{p}": percentile(downstream, p) for p in (50, 95, 99)},
+        "chunks_measured": len(upstream),
+        "cpu_core_per_session": round(cpu / elapsed / sessions, 4) if cpu is not None else None
+    }
+    worst_p95 = max(result["upstream_ms"]["p95"] or math.inf, result["downstream_ms"]["p95"] or 0)
+    result["sustainable"] = not errors and drops == 0 and worst_p95 <= args.max_p95_ms
+    return result
+
+def print_result(result: Dict[str, Any]) -> None:
+    fmt = lambda v: "-" if v is None else f"{v:.1f}"
+    up, down = result["upstream_ms"], result["downstream_ms"]
+    cpu = result["cpu_core_per_session"]
+    print(
+        f"{result['sessions']:>5} sessions | connected {result['connected']:>4} | errors {result['errors']:>3} | drops {result['dropped_frames']:>4} | "
+        f"up ms p50/p95/p99 {fmt(up['p50'])}/{fmt(up['p95'])}/{fmt(up['p99'])} | "
+        f"down ms p50/p95/p99 {fmt(down['p50'])}/{fmt(down['p95'])}/{fmt(down['p99'])} | "
+        f"cpu/session {'-' if cpu is None else f'{cpu * 100:.2f}% core'} | {'OK' if result['sustainable'] else 'OVER'}"
+    )
+    if result["error_samples"]:
+        print(f"        errors: {result['error_samples']}")
+
+async def main(args) -> int:
+    if args.audio_format == "webm":
+        if not args.webm_file or not args.webm_seconds:
+            print("--audio-format webm needs --webm-file and --webm-seconds")
+            return 2
+        with open(args.webm_file, "rb") as f:
+            audio = f.read()
+        # Equal byte slices of the recording, one per chunk_ms of audio
+        chunk_bytes = max(1, int(len(audio) * args.chunk_ms / (args.webm_seconds * 1000)))
+    else:
+        audio = synthetic_pcm(10)
+        chunk_bytes = PCM_BYTES_PER_SECOND * args.chunk_ms // 1000
+
+    steps = [int(s) for s in args.steps.split(",")]
+    fake = FakeElevenLabs(
+        port=args.fake_port, response_delay=args.fake_response_ms / 1000,
+        response_bytes=args.fake_response_bytes, reply_every=args.fake_reply_every
+    )
+    await fake.start()
+    server = None
+    try:
+        if args.server_url:
+            server_url, server_pid = args.server_url.rstrip("/"), args.server_pid
+            print(f"Fake ElevenLabs at {fake.base_url}: start the server with ELEVENLABS_BASE_URL={fake.base_url}")
+        else:
+            server = ServerProcess(args.port, {
+                "ELEVENLABS_BASE_URL": fake.base_url,
+                "ELEVENLABS_AGENT_ID": "bench-agent",
+                # Measure the proxy itself, not the admission limits
+                "VOICE_MAX_SESSIONS": str(max(steps) * 2),
+                "VOICE_MAX_QUEUED": "0",
+                "VOICE_IDLE_TIMEOUT_SECONDS": str(args.duration + 60),
+                "VOICE_STATS_TOKEN": args.stats_token
+            }, args.server_log)
+            await server.start()
+            server_url, server_pid = server.url, server.process.pid
+
+        print(f"Voice load test: {args.protocol} protocol, {args.audio_format}, {args.chunk_ms} ms chunks, "
+              f"{args.duration:g}s per step, p95 budget {args.max_p95_ms:g} ms")
+        results = []
+        for sessions in steps:
+            result = await run_step(sessions, args, fake, server_url, server_pid, audio, chunk_bytes)
+            results.append(result)
+            print_result(result)
+            if not result["sustainable"] and not args.keep_going:
+                break
+
+        sustainable = [r["sessions"] for r in results if r["sustainable"]]
+        max_sessions = max(sustainable) if sustainable else 0
+        print(f"Maximum sustainable sessions: {max_sessions}")
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump({"config": vars(args), "steps": results, "max_sustainable_sessions": max_sessions}, f, indent=2)
+        return 0
+    finally:
+        if server is not None:
+            server.stop()
+        await fake.stop()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test for the voice WebSocket proxy")
+    parser.add_argument("--steps", default="5,10,20,40", help="Comma-separated concurrent session counts")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of audio streamed per session")
+    parser.add_argument("--chunk-ms", type=int, default=100, help="Audio per chunk in milliseconds")
+    parser.add_argument("--ramp-seconds", type=float, default=2.0, help="Spread of the session start times")
+    parser.add_argument("--protocol", choices=["json", "binary"], default="json")
+    parser.add_argument("--audio-format", choices=["pcm_16000", "webm"], default="pcm_16000")
+    parser.add_argument("--webm-file", help="MediaRecorder webm recording (webm format only)")
+    parser.add_argument("--webm-seconds", type=float, help="Duration of --webm-file in seconds")
+    parser.add_argument("--max-p95-ms", type=float, default=250.0, help="Latency budget for a sustainable step")
+    parser.add_argument("--keep-going", action="store_true", help="Run every step even after one is over budget")
+    parser.add_argument("--port", type=int, default=8765, help="Port of the server subprocess")
+    parser.add_argument("--server-log", help="File receiving the server subprocess output")
+    parser.add_argument("--server-url", help="Test an already running server instead of starting one")
+    parser.add_argument("--server-pid", type=int, help="PID of --server-url, for CPU measurements")
+    parser.add_argument("--stats-token", default=os.environ.get("VOICE_STATS_TOKEN") or "load-test",
+                        help="VOICE_STATS_TOKEN of the server, for reading its dropped frames")
+    parser.add_argument("--fake-port", type=int, default=0, help="Port of the fake ElevenLabs server")
+    parser.add_argument("--fake-response-ms", type=float, default=0.0, help="Delay before each fake audio reply")
+    parser.add_argument("--fake-response-bytes", type=int, default=4000, help="Size of each fake audio reply")
+    parser.add_argument("--fake-reply-every", type=int, default=1, help="Reply to one audio chunk out of this many")
+    parser.add_argument("--json", help="Write the results to this JSON file")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,129 @@
+"""
+Streaming audio transcoder.
+One long-lived ffmpeg process per voice session converts the browser's webm/opus
+stream to 16 kHz 16-bit mono PCM through pipes, with no temporary files.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Every webm stream (and so every restart point) begins with the EBML magic number
+EBML_MAGIC = b"\x1a\x45\xdf\xa3"
+
+class StreamingTranscoder:
+    """
+    Pipes webm chunks into a persistent ffmpeg subprocess and hands the PCM it
+    produces to on_pcm as soon as it is available.
+
+    MediaRecorder chunks after the first are continuations of a single stream, so
+    they are only decodable through one long-running decoder. If ffmpeg exits
+    (e.g. corrupt input), it is restarted when the client sends a new stream header;
+    continuation chunks arriving meanwhile are dropped.
+
+    Args:
+        on_pcm: Coroutine called with each block of PCM bytes
+        sample_rate: Output sample rate
+        read_size: Maximum PCM bytes handed over per call
+    """
+
+    def __init__(self, on_pcm: Callable[[bytes], Awaitable[None]], sample_rate: int = 16000, read_size: Optional[int] = None):
+        self.on_pcm = on_pcm
+        self.sample_rate = sample_rate
+        self.read_size = read_size or settings.VOICE_PCM_READ_BYTES
+        self.process: Optional[asyncio.subprocess.Process] = None
+        self._reader: Optional[asyncio.Task] = None
+        self._stderr: Optional[asyncio.Task] = None
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    async def start(self) -> None:
+        cmd = [
+            settings.FFMPEG_PATH, '-hide_banner', '-loglevel', 'error',
+            '-fflags', 'nobuffer', '-analyzeduration', '0',
+            '-f', 'webm', '-i', 'pipe:0',
+            '-ac', '1', '-ar', str(self.sample_rate), '-f', 's16le', '-flush_packets', '1', 'pipe:1'
+        ]
+        self.process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+        self._reader = asyncio.create_task(self._read_pcm(self.process))
+        self._stderr = asyncio.create_task(self._read_errors(self.process))
+        logger.info(f"Audio transcoder started (pid {self.process.pid})")
+
+    async def write(self, webm_chunk: bytes) -> bool:
+        """
+        Feed a webm chunk to ffmpeg.
+
+        Returns:
+            bool: False if the chunk was dropped (no running decoder for it)
+        """
+        if not self.running:
+            if not webm_chunk.startswith(EBML_MAGIC):
+                logger.warning("Dropping webm chunk: no stream header received yet")
+                return False
+            await self._stop()
+            await self.start()
+        try:
+            self.process.stdin.write(webm_chunk)
+            # Back-pressure: waits while ffmpeg is behind instead of buffering without limit
+            await self.process.stdin.drain()
+            self.bytes_in += len(webm_chunk)
+            return True
+        except (BrokenPipeError, ConnectionResetError) as e:
+            logger.error(f"Audio transcoder stopped accepting input: {e}")
+            return False
+
+    async def _read_pcm(self, process: asyncio.subprocess.Process) -> None:
+        try:
+            while chunk := await process.stdout.read(self.read_size):
+                self.bytes_out += len(chunk)
+                await self.on_pcm(chunk)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error forwarding transcoded audio: {e}")
+
+    async def _read_errors(self, process: asyncio.subprocess.Process) -> None:
+        while line := await process.stderr.readline():
+            logger.warning(f"[ffmpeg] {line.decode(errors='replace').rstrip()}")
+
+    async def close(self, timeout: float = 2.0) -> None:
+        """Flush the remaining audio and stop ffmpeg."""
+        await self._stop(timeout)
+        logger.info(f"Audio transcoder closed ({self.bytes_in} bytes in, {self.bytes_out} bytes out)")
+
+    async def _stop(self, timeout: float = 2.0) -> None:
+        process, reader, stderr = self.process, self._reader, self._stderr
+        self.process = self._reader = self._stderr = None
+        if process is None:
+            return
+        if process.returncode is None:
+            try:
+                process.stdin.close()
+                # EOF lets ffmpeg flush the last samples before exiting
+                await asyncio.wait_for(process.wait(), timeout)
+            except (asyncio.TimeoutError, BrokenPipeError, ConnectionResetError):
+                pass
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+        for task in (reader, stderr):
+            if task is None:
+                continue
+            try:
+                await asyncio.wait_for(task, timeout)
+            except asyncio.TimeoutError:
+                task.cancel()
+            except Exception:
+                pass
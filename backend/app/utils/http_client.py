@@ -0,0 +1,45 @@
+"""
+Shared HTTP client pool.
+A single keep-alive aiohttp session is reused by every outgoing HTTP call so
+connections (and TLS handshakes) are shared across requests.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+import aiohttp
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def create_http_session(**kwargs) -> aiohttp.ClientSession:
+    """Create a new pooled session. Callers own it and must close it."""
+    connector = aiohttp.TCPConnector(
+        limit=settings.HTTP_POOL_SIZE,
+        limit_per_host=settings.HTTP_POOL_PER_HOST,
+        keepalive_timeout=settings.HTTP_KEEPALIVE_SECONDS,
+        ttl_dns_cache=300
+    )
+    return aiohttp.ClientSession(connector=connector, **kwargs)
+
+async def get_http_session() -> aiohttp.ClientSession:
+    """Return the app-lifetime shared session, creating it on first use."""
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        _session = create_http_session()
+        _session_loop = loop
+        logger.info("Shared HTTP session created")
+    return _session
+
+async def close_http_session() -> None:
+    """Close the shared session (called on application shutdown)."""
+    global _session, _session_loop
+    if _session is not None and not _session.closed:
+        await _session.close()
+        logger.info("Shared HTTP session closed")
+    _session = None
+    _session_loop = None
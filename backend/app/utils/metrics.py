@@ -0,0 +1,118 @@
+"""
+Prometheus metrics, served at /metrics.
+
+HTTP request latency per route and in-flight requests (MetricsMiddleware), latency
+of the stages inside a request (prompt building, upstream calls, JSON parsing,
+storage writes, image CPU stages), in-flight upstream calls and upstream errors.
+Metrics live in the worker process, like the LLM gateway limits.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Iterator
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from .request_timing import record_stage
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Stages go down to sub-millisecond work such as JSON parsing
+STAGE_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+REQUEST_LATENCY = Histogram(
+    "truthlens_http_request_duration_seconds", "HTTP request latency by route",
+    ["method", "route", "status"], buckets=REQUEST_BUCKETS
+)
+REQUESTS_IN_FLIGHT = Gauge("truthlens_http_requests_in_flight", "HTTP requests being processed")
+STAGE_LATENCY = Histogram(
+    "truthlens_stage_duration_seconds", "Latency of a stage within a request",
+    ["stage"], buckets=STAGE_BUCKETS
+)
+UPSTREAM_IN_FLIGHT = Gauge("truthlens_upstream_in_flight", "Calls in progress to an upstream provider", ["provider"])
+UPSTREAM_ERRORS = Counter("truthlens_upstream_errors_total", "Failed upstream calls", ["provider", "error"])
+
+def observe_stage(name: str, seconds: float) -> None:
+    """Record a stage timed elsewhere (e.g. in an image worker process)."""
+    STAGE_LATENCY.labels(name).observe(seconds)
+    # Also reported to the client in the Server-Timing header
+    record_stage(name, seconds)
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the enclosed block as stage `name`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - start)
+
+@contextmanager
+def upstream(provider: str) -> Iterator[None]:
+    """
+    Time one call to an upstream provider as stage `provider`, count it as in flight
+    while it runs and count the exception it raises, if any, as an upstream error.
+    """
+    in_flight = UPSTREAM_IN_FLIGHT.labels(provider)
+    in_flight.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        UPSTREAM_ERRORS.labels(provider, type(e).__name__).inc()
+        raise
+    finally:
+        in_flight.dec()
+        observe_stage(provider, time.perf_counter() - start)
+
+def route_label(scope: Scope) -> str:
+    """
+    Route template of a routed request (path parameters put back as {name}) or the
+    mount point of a mounted app, so label values stay bounded.
+    """
+    if "endpoint" not in scope:
+        return "unmatched"
+    if "app_root_path" in scope:
+        # Mounted app (static files)
+        return scope["root_path"][len(scope["app_root_path"]):]
+    path = scope["path"]
+    for name, value in scope.get("path_params", {}).items():
+        head, found, tail = path.rpartition(str(value))
+        if found:
+            path = f"{head}{{{name}}}{tail}"
+    return path
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency (until the last body byte, so streams are
+    measured in full) and status of every HTTP request by route, and the number
+    of requests in flight.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            # The router fills in the matched route on the shared scope
+            REQUEST_LATENCY.labels(scope["method"], route_label(scope), str(status)).observe(time.perf_counter() - start)
+
+def metrics_response() -> Response:
+    """Current metrics in the Prometheus text format."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,285 @@
+"""
+Opt-in sampling profiler for individual requests.
+
+When PROFILING_ADMIN_TOKEN is set, a request is profiled if it sends that token in
+the X-Profile-Token header, or at random with PROFILING_SAMPLE_RATE if its path starts
+with one of PROFILING_PATHS. A background thread samples the event loop thread's stack
+every PROFILING_INTERVAL_MS while the request runs; the image pipeline samples its
+worker process the same way. Profiles are kept in memory (per worker process) as
+folded stacks and served as flame graphs by the admin routes. Requests that are not
+profiled pay for one header lookup.
+"""
+
+import asyncio
+import hmac
+import html
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+import zlib
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, List, Optional
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from ..core.config import settings
+from .request_timing import current_timings
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile-token"
+MAX_STACK_DEPTH = 128
+
+try:
+    # Running task per event loop, readable from the sampler thread (CPython)
+    from asyncio.tasks import _current_tasks
+except ImportError:
+    _current_tasks = None
+
+def _frame_label(code) -> str:
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler:
+    """
+    Samples the Python stack of one thread from a background thread and counts the
+    stacks in folded form ("root;outer;...;inner" -> samples).
+
+    Args:
+        thread_id: Thread to sample (threading.get_ident() of that thread)
+        interval: Seconds between samples
+        root: Optional callable naming the root frame of each sample
+        base: Optional frame where stacks stop (its callers are left out)
+    """
+
+    def __init__(self, thread_id: int, interval: float, root: Optional[Callable[[], str]] = None, base=None):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.root = root
+        self.base = base
+        self.stacks: Dict[str, int] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Dict[str, int]:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.stacks
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            labels: List[str] = []
+            while frame is not None and frame is not self.base and len(labels) < MAX_STACK_DEPTH:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            if self.root is not None:
+                labels.append(self.root())
+            stack = ";".join(reversed(labels))
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+class Profile:
+    """Folded stacks and stage timings of one profiled request."""
+
+    def __init__(self, method: str, path: str, interval: float, trigger: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.interval = interval
+        self.trigger = trigger
+        self.started_at = time.time()
+        self.duration_ms: Optional[float] = None
+        self.status: Optional[int] = None
+        self.stacks: Dict[str, int] = {}
+        self.stages_ms: Dict[str, float] = {}
+
+    def add_stacks(self, stacks: Dict[str, int], root: Optional[str] = None) -> None:
+        """Merge folded stacks (e.g. from a worker process), optionally under a root frame."""
+        for stack, count in stacks.items():
+            key = f"{root};{stack}" if root else stack
+            self.stacks[key] = self.stacks.get(key, 0) + count
+
+    def folded(self) -> str:
+        """Collapsed stacks, readable by flamegraph.pl and speedscope."""
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(self.stacks.items()))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "trigger": self.trigger,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "samples": sum(self.stacks.values()),
+            "interval_ms": round(self.interval * 1000, 2),
+            "stages_ms": {name: round(ms, 1) for name, ms in self.stages_ms.items()}
+        }
+
+# Profile of the request being handled, so the image pipeline can add its worker samples
+_active_profile: ContextVar[Optional[Profile]] = ContextVar("active_profile", default=None)
+
+def active_profile() -> Optional[Profile]:
+    return _active_profile.get()
+
+def sample_current_thread(func: Callable[..., Any], interval: float, *args) -> Dict[str, Any]:
+    """Run func(*args) in this thread while sampling it; returns {"result", "stacks"}."""
+    # Stacks start at func: forked workers would otherwise repeat the parent's call chain
+    sampler = StackSampler(threading.get_ident(), interval, base=sys._getframe())
+    sampler.start()
+    try:
+        result = func(*args)
+    finally:
+        stacks = sampler.stop()
+    return {"result": result, "stacks": stacks}
+
+def is_admin_token(value: str) -> bool:
+    """Whether value is the profiling admin token (always False while profiling is disabled)."""
+    return bool(settings.PROFILING_ADMIN_TOKEN) and hmac.compare_digest(value.encode(), settings.PROFILING_ADMIN_TOKEN.encode())
+
+class ProfileStore:
+    """The last PROFILING_MAX_PROFILES profiles, with one profile running at a time."""
+
+    def __init__(self, max_profiles: Optional[int] = None):
+        self.profiles: Deque[Profile] = deque(maxlen=max_profiles or settings.PROFILING_MAX_PROFILES)
+        self.running = False
+
+    def add(self, profile: Profile) -> None:
+        self.profiles.append(profile)
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        return next((p for p in self.profiles if p.id == profile_id), None)
+
+    def list(self) -> List[Dict[str, Any]]:
+        return [p.summary() for p in reversed(self.profiles)]
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware starting a profile for requests carrying the admin token or picked
+    by the sampling rate. Profiled responses carry an X-Profile-Id header.
+
+    Samples are rooted at "request" when the event loop was running this request's
+    task, "other_tasks" for any other task (other requests, and tasks this request
+    spawned) and "idle" while the loop waited for I/O. Install it inside middleware
+    that runs the app in a task of its own (BaseHTTPMiddleware), so the request's
+    task is the one running the endpoint.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+        self.store = profile_store
+
+    def _trigger(self, scope: Scope) -> Optional[str]:
+        if not settings.PROFILING_ADMIN_TOKEN:
+            return None
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                if is_admin_token(value.decode("latin-1")):
+                    return "header"
+                break
+        if settings.PROFILING_SAMPLE_RATE > 0 and scope["path"].startswith(tuple(settings.PROFILING_PATHS)):
+            if random.random() < settings.PROFILING_SAMPLE_RATE:
+                return "sampled"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        trigger = self._trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+        if self.store.running:
+            logger.info(f"Profiler busy, not profiling {scope['method']} {scope['path']}")
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope["method"], scope["path"], settings.PROFILING_INTERVAL_MS / 1000, trigger)
+        loop = asyncio.get_running_loop()
+        request_task = asyncio.current_task()
+
+        def root() -> str:
+            # Which task the event loop was running when sampled
+            if _current_tasks is None:
+                return "event_loop"
+            task = _current_tasks.get(loop)
+            if task is None:
+                return "idle"
+            return "request" if task is request_task else "other_tasks"
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]
+            await send(message)
+
+        self.store.running = True
+        token = _active_profile.set(profile)
+        sampler = StackSampler(threading.get_ident(), profile.interval, root)
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.add_stacks(sampler.stop())
+            # Read at the end, so stages of streamed responses are complete here
+            profile.stages_ms = current_timings()
+            profile.duration_ms = round((time.perf_counter() - start) * 1000, 1)
+            _active_profile.reset(token)
+            self.store.running = False
+            self.store.add(profile)
+            logger.info(f"Profiled {profile.method} {profile.path} ({profile.trigger}): {profile.id}, {profile.duration_ms} ms")
+
+def render_flamegraph(stacks: Dict[str, int], title: str, width: int = 1200, row_height: int = 16) -> str:
+    """Self-contained SVG flame graph of folded stacks (hover a frame for its samples)."""
+    tree: Dict[str, Any] = {"count": 0, "children": {}}
+    for stack, count in stacks.items():
+        node = tree
+        node["count"] += count
+        for frame in stack.split(";"):
+            node = node["children"].setdefault(frame, {"count": 0, "children": {}})
+            node["count"] += count
+    total = tree["count"] or 1
+
+    # (x, width, depth, frame, samples) of every frame wide enough to draw
+    boxes = []
+    pending = [(tree, 0.0, 0)]
+    while pending:
+        node, x, depth = pending.pop()
+        for frame, child in sorted(node["children"].items()):
+            w = child["count"] / total * width
+            if w >= 0.5:
+                boxes.append((x, w, depth, frame, child["count"]))
+                pending.append((child, x, depth + 1))
+            x += w
+
+    depth_count = max((box[2] for box in boxes), default=0) + 1
+    height = depth_count * row_height + 24
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" font-family="monospace" font-size="11">',
+        f'<text x="4" y="16" font-size="13">{html.escape(title)} ({sum(stacks.values())} samples)</text>'
+    ]
+    for x, w, depth, frame, count in boxes:
+        # Roots at the bottom, as in flamegraph.pl
+        y = height - (depth + 1) * row_height
+        hue = zlib.crc32(frame.split(" (")[0].encode()) % 60
+        chars = int(w / 7)
+        label = frame if len(frame) <= chars else (frame[:chars - 2] + ".." if chars > 3 else "")
+        parts.append(
+            f'<g><title>{html.escape(frame)} ({count} samples, {count / total:.1%})</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{w:.1f}" height="{row_height - 1}" fill="hsl({hue},80%,60%)"/>'
+            f'<text x="{x + 3:.1f}" y="{y + row_height - 4}">{html.escape(label)}</text></g>'
+        )
+    parts.append("</svg>")
+    return "".join(parts)
+
+# Global instance
+profile_store = ProfileStore()
@@ -0,0 +1,60 @@
+"""
+Per-request stage timings, reported in the Server-Timing response header.
+
+Every stage timed through app.utils.metrics (stage, upstream, observe_stage) is also
+added to a context-local dict set up by ServerTimingMiddleware. Tasks spawned by the
+request inherit the context, so their stages count too; repeated stages are summed.
+"""
+
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Stage name -> total milliseconds, for the request being handled (None outside requests)
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("request_timings", default=None)
+
+def record_stage(name: str, seconds: float) -> None:
+    """Add a stage duration to the current request's timings, if any."""
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds * 1000
+
+def current_timings() -> Dict[str, float]:
+    """Stage durations (ms) recorded so far for the current request."""
+    return dict(_timings.get() or {})
+
+def server_timing_header(timings: Dict[str, float], total_ms: float) -> str:
+    metrics = [f"{name};dur={ms:.1f}" for name, ms in timings.items()]
+    metrics.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(metrics)
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware adding a Server-Timing header with the stage durations and the
+    total time until the response started. Streaming responses send their headers
+    first, so stages that run while they stream are not included.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: Dict[str, float] = {}
+        token = _timings.set(timings)
+        start = time.perf_counter()
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                header = server_timing_header(timings, (time.perf_counter() - start) * 1000)
+                message["headers"] = [*message.get("headers", []), (b"server-timing", header.encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _timings.reset(token)
@@ -1,10 +1,14 @@
 import os
-import requests
-from typing import List, Dict
+import asyncio
+from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
 from pathlib import Path
 import logging
+import aiohttp
 from app.core.config import settings
+from app.utils.search_cache import SearchCache
+from app.utils.http_client import get_http_session, create_http_session
+from app.utils.metrics import upstream
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -16,48 +20,190 @@ if not settings.SERPER_API_KEY:
     logger.error("No se encontró SERPER_API_KEY en el entorno. Verificá tu archivo .env.")
     raise ValueError("No se encontró SERPER_API_KEY en el entorno. Verificá tu archivo .env.")
 
-def search_web(query: str, num_results: int = 5) -> List[Dict[str, str]]:
-    """
-    Realiza una búsqueda web usando Serper.dev y devuelve una lista de resultados relevantes.
-    
-    Args:
-        query (str): Consulta de búsqueda.
-        num_results (int): Cantidad de resultados deseados (máx sugerido: 10).
-    
-    Returns:
-        List[Dict[str, str]]: Lista de resultados con 'title', 'snippet' y 'url'.
-    """
-    headers = {
+# Cache compartido de resultados de búsqueda (memoria + disco opcional)
+search_cache = SearchCache(
+    maxsize=settings.SEARCH_CACHE_MAX_ENTRIES,
+    ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS,
+    disk_dir=settings.SEARCH_CACHE_DIR
+)
+
+# Límite de búsquedas simultáneas contra Serper.dev
+_serper_semaphore = asyncio.Semaphore(settings.SERPER_MAX_CONCURRENCY)
+
+# Timeouts explícitos de conexión y lectura
+SERPER_TIMEOUT = aiohttp.ClientTimeout(
+    total=settings.SERPER_CONNECT_TIMEOUT + settings.SERPER_READ_TIMEOUT,
+    connect=settings.SERPER_CONNECT_TIMEOUT,
+    sock_read=settings.SERPER_READ_TIMEOUT
+)
+
+def _serper_headers() -> Dict[str, str]:
+    return {
         "X-API-KEY": settings.SERPER_API_KEY,
         "Content-Type": "application/json"
     }
+
+def _parse_results(data: Dict[str, Any]) -> List[Dict[str, str]]:
+    """Convierte la respuesta de Serper.dev en la lista de resultados usada por el chat."""
+    return [
+        {
+            "title": r.get("title", ""),
+            "snippet": r.get("snippet", ""),
+            "url": r.get("link", "")
+        }
+        for r in data.get("organic", [])
+    ]
+
+async def _fetch_results(session: aiohttp.ClientSession, query: str, num_results: int) -> Optional[List[Dict[str, str]]]:
+    """
+    Ejecuta una búsqueda contra Serper.dev. Devuelve None si la consulta falló
+    (los errores no se guardan en cache). La cancelación se propaga al llamador.
+    """
     payload = {
         "q": query,
         "num": num_results,
         "gl": settings.SERPER_GEO_LOCATION  # Geo-localización configurable
     }
-
     try:
         logger.info(f"Enviando búsqueda a Serper.dev: {query}")
-        response = requests.post(settings.SERPER_API_URL, headers=headers, json=payload)
-        response.raise_for_status()
-        data = response.json()
-        results = data.get("organic", [])
-
-        if not results:
-            logger.warning("No se encontraron resultados en la búsqueda")
-            return []
+        with upstream("serper"):
+            async with session.post(settings.SERPER_API_URL, headers=_serper_headers(), json=payload, timeout=SERPER_TIMEOUT) as response:
+                response.raise_for_status()
+                data = await response.json()
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        logger.error(f"Error al consultar Serper.dev: {str(e) or type(e).__name__}", exc_info=True)
+        return None
 
+    results = _parse_results(data)
+    if not results:
+        logger.warning("No se encontraron resultados en la búsqueda")
+    else:
         logger.info(f"Se encontraron {len(results)} resultados")
-        return [
-            {
-                "title": r.get("title", ""),
-                "snippet": r.get("snippet", ""),
-                "url": r.get("link", "")
-            }
-            for r in results
-        ]
-
-    except requests.RequestException as e:
-        logger.error(f"Error al consultar Serper.dev: {str(e)}", exc_info=True)
-        return []
\ No newline at end of file
+    return results
+
+async def async_search_web(
+    query: str,
+    num_results: int = 5,
+    session: Optional[aiohttp.ClientSession] = None
+) -> List[Dict[str, str]]:
+    """
+    Realiza una búsqueda web usando Serper.dev sin bloquear el event loop.
+
+    Usa el pool HTTP compartido (keep-alive), timeouts explícitos y un límite de
+    búsquedas concurrentes. Si la tarea se cancela, la petición en curso se aborta.
+
+    Args:
+        query (str): Consulta de búsqueda.
+        num_results (int): Cantidad de resultados deseados (máx sugerido: 10).
+        session (aiohttp.ClientSession, opcional): Sesión a usar en lugar de la compartida.
+
+    Returns:
+        List[Dict[str, str]]: Lista de resultados con 'title', 'snippet' y 'url'.
+    """
+    cached = search_cache.get(query, num_results, settings.SERPER_GEO_LOCATION)
+    if cached is not None:
+        logger.info(f"Resultados de búsqueda servidos desde cache: {query}")
+        return cached
+
+    async with _serper_semaphore:
+        results = await _fetch_results(session or await get_http_session(), query, num_results)
+
+    if results is None:
+        return []
+    search_cache.set(query, num_results, results, settings.SERPER_GEO_LOCATION)
+    return results
+
+async def _fetch_batch(session: aiohttp.ClientSession, queries: List[str], num_results: int) -> Optional[List[List[Dict[str, str]]]]:
+    """
+    Envía varias consultas en un único payload multi-query de Serper.dev.
+    Devuelve None si la petición falló, para que el llamador pueda reintentar por separado.
+    """
+    payload = [
+        {"q": query, "num": num_results, "gl": settings.SERPER_GEO_LOCATION}
+        for query in queries
+    ]
+    try:
+        logger.info(f"Enviando {len(queries)} búsquedas en lote a Serper.dev")
+        with upstream("serper"):
+            async with session.post(settings.SERPER_API_URL, headers=_serper_headers(), json=payload, timeout=SERPER_TIMEOUT) as response:
+                response.raise_for_status()
+                data = await response.json()
+    except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+        logger.error(f"Error en búsqueda en lote a Serper.dev: {str(e) or type(e).__name__}")
+        return None
+
+    if not isinstance(data, list) or len(data) != len(queries):
+        logger.error("Respuesta inesperada de Serper.dev para la búsqueda en lote")
+        return None
+    return [_parse_results(item) for item in data]
+
+async def async_search_web_batch(queries: List[str], num_results: int = 5) -> List[List[Dict[str, str]]]:
+    """
+    Realiza varias búsquedas en paralelo, en el mismo orden que queries.
+
+    Las consultas en cache se sirven localmente; el resto se envía en payloads
+    multi-query de hasta SERPER_BATCH_SIZE consultas, ejecutados concurrentemente.
+    Si un lote falla, sus consultas se reintentan de forma individual.
+
+    Args:
+        queries (List[str]): Consultas de búsqueda.
+        num_results (int): Cantidad de resultados por consulta.
+
+    Returns:
+        List[List[Dict[str, str]]]: Resultados por consulta ('title', 'snippet', 'url').
+    """
+    results: List[Optional[List[Dict[str, str]]]] = [
+        search_cache.get(query, num_results, settings.SERPER_GEO_LOCATION) for query in queries
+    ]
+    missing = [idx for idx, cached in enumerate(results) if cached is None]
+    if not missing:
+        return results
+
+    session = await get_http_session()
+    batch_size = max(1, settings.SERPER_BATCH_SIZE)
+
+    async def run_batch(indices: List[int]) -> None:
+        batch_queries = [queries[idx] for idx in indices]
+        batch_results = None
+        if len(indices) > 1:
+            async with _serper_semaphore:
+                batch_results = await _fetch_batch(session, batch_queries, num_results)
+        if batch_results is not None:
+            for query, query_results in zip(batch_queries, batch_results):
+                search_cache.set(query, num_results, query_results, settings.SERPER_GEO_LOCATION)
+        else:
+            # Lote fallido o de una sola consulta: búsquedas individuales concurrentes
+            batch_results = await asyncio.gather(*(async_search_web(query, num_results, session) for query in batch_queries))
+        for idx, query_results in zip(indices, batch_results):
+            results[idx] = query_results
+
+    await asyncio.gather(*(
+        run_batch(missing[start:start + batch_size])
+        for start in range(0, len(missing), batch_size)
+    ))
+    return results
+
+def search_web(query: str, num_results: int = 5) -> List[Dict[str, str]]:
+    """
+    Versión síncrona de async_search_web para scripts (no usar dentro del event loop).
+
+    Args:
+        query (str): Consulta de búsqueda.
+        num_results (int): Cantidad de resultados deseados (máx sugerido: 10).
+
+    Returns:
+        List[Dict[str, str]]: Lista de resultados con 'title', 'snippet' y 'url'.
+    """
+    cached = search_cache.get(query, num_results, settings.SERPER_GEO_LOCATION)
+    if cached is not None:
+        return cached
+
+    async def _run() -> Optional[List[Dict[str, str]]]:
+        async with create_http_session() as session:
+            return await _fetch_results(session, query, num_results)
+
+    results = asyncio.run(_run())
+    if results is None:
+        return []
+    search_cache.set(query, num_results, results, settings.SERPER_GEO_LOCATION)
+    return results
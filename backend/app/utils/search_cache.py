@@ -0,0 +1,121 @@
+"""
+Cache for web search results.
+Entries are keyed by the normalized query and geo-location, kept in memory with
+TTL/LRU eviction and optionally persisted to disk so they survive restarts.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, List, Optional
+from .ttl_cache import TTLCache
+from .text_normalize import normalize_query
+
+logger = logging.getLogger(__name__)
+
+class SearchCache:
+    """
+    Query-normalized cache of search results.
+
+    A single entry per query serves any smaller num_results (e.g. a cached 10-result
+    search answers a 5-result request), and also larger ones when the provider
+    returned fewer results than were asked for.
+
+    Args:
+        maxsize: Maximum number of queries kept in memory
+        ttl_seconds: Lifetime of a cached search
+        disk_dir: Optional directory for the on-disk tier (disabled when empty)
+    """
+
+    def __init__(self, maxsize: int = 2048, ttl_seconds: float = 1800, disk_dir: Optional[str] = None):
+        self.ttl_seconds = ttl_seconds
+        self.memory = TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        self.disk_dir = disk_dir or None
+        self.disk_hits = 0
+        if self.disk_dir:
+            try:
+                os.makedirs(self.disk_dir, exist_ok=True)
+            except OSError as e:
+                logger.error(f"Search cache disk tier disabled, cannot create {self.disk_dir}: {e}")
+                self.disk_dir = None
+
+    @staticmethod
+    def make_key(query: str, geo: str = "") -> str:
+        return hashlib.sha256(f"{normalize_query(query)}\x00{geo}".encode("utf-8")).hexdigest()
+
+    def get(self, query: str, num_results: int, geo: str = "") -> Optional[List[Dict[str, str]]]:
+        """Return cached results for query, or None if there is no entry able to serve num_results."""
+        key = self.make_key(query, geo)
+        entry = self.memory.get(key)
+        if entry is None:
+            entry = self._read_disk(key)
+            if entry is not None:
+                self.disk_hits += 1
+                self.memory.set(key, entry, ttl_seconds=entry["expires_at"] - time.time())
+        if entry is None:
+            return None
+
+        results = entry["results"]
+        # Serve if we have enough results, or the provider already returned all it had
+        if len(results) >= num_results or len(results) < entry["num_results"]:
+            return results[:num_results]
+        return None
+
+    def set(self, query: str, num_results: int, results: List[Dict[str, str]], geo: str = "") -> None:
+        """Store results for query. A larger existing entry is not replaced by a smaller one."""
+        key = self.make_key(query, geo)
+        # Peek, so storing results does not count as a cache hit or miss
+        existing = self.memory.peek(key)
+        if existing is not None and existing["num_results"] > num_results:
+            return
+        entry = {
+            "query": normalize_query(query),
+            "num_results": num_results,
+            "results": results,
+            "expires_at": time.time() + self.ttl_seconds
+        }
+        self.memory.set(key, entry)
+        self._write_disk(key, entry)
+
+    def stats(self) -> Dict:
+        stats = self.memory.stats()
+        stats["disk_hits"] = self.disk_hits
+        stats["disk_dir"] = self.disk_dir
+        return stats
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"search_{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Dict]:
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.error(f"Error reading search cache file {path}: {e}")
+            return None
+        if entry.get("expires_at", 0) <= time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+        return entry
+
+    def _write_disk(self, key: str, entry: Dict) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Error writing search cache file {path}: {e}")
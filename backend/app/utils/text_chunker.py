@@ -0,0 +1,118 @@
+"""
+Text chunking helpers for long-document processing.
+Splits text on paragraph and sentence boundaries so each chunk can be
+processed independently and reassembled in the original order.
+"""
+
+import re
+from typing import List, Tuple
+
+PARAGRAPH_SPLIT_RE = re.compile(r"(\n\s*\n)")
+SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?…。！？])(\s+)")
+WORD_SPLIT_RE = re.compile(r"(\s+)")
+
+def _split_keep_separators(text: str, pattern: re.Pattern) -> List[Tuple[str, str]]:
+    """Split text with a capturing pattern, returning (piece, separator_after) pairs."""
+    parts = pattern.split(text)
+    pieces = []
+    for i in range(0, len(parts), 2):
+        piece = parts[i]
+        sep = parts[i + 1] if i + 1 < len(parts) else ""
+        if piece:
+            pieces.append((piece, sep))
+        elif pieces:
+            # Repeated separators are folded into the previous piece
+            prev, prev_sep = pieces[-1]
+            pieces[-1] = (prev, prev_sep + sep)
+        elif sep:
+            # A leading separator becomes an empty piece, so joining stays lossless
+            pieces.append(("", sep))
+    return pieces
+
+def _split_oversized(piece: str, sep: str, max_chars: int) -> List[Tuple[str, str]]:
+    """Break a single sentence longer than max_chars at whitespace (or hard cut as last resort)."""
+    units = []
+    current = ""
+    current_sep = ""
+    started = False
+    for word, word_sep in _split_keep_separators(piece, WORD_SPLIT_RE):
+        while len(word) > max_chars:
+            if started:
+                units.append((current, current_sep))
+                current, current_sep, started = "", "", False
+            units.append((word[:max_chars], ""))
+            word = word[max_chars:]
+        if started and len(current) + len(current_sep) + len(word) > max_chars:
+            units.append((current, current_sep))
+            current, current_sep, started = "", "", False
+        # The original whitespace between words is kept, so the round trip stays lossless
+        current = f"{current}{current_sep}{word}" if started else word
+        current_sep = word_sep
+        started = True
+    if started:
+        units.append((current, current_sep + sep))
+    return units
+
+def _split_units(text: str, max_chars: int) -> List[Tuple[str, str]]:
+    """Split text into units no larger than max_chars, preferring paragraph then sentence boundaries."""
+    units = []
+    for paragraph, para_sep in _split_keep_separators(text, PARAGRAPH_SPLIT_RE):
+        if len(paragraph) <= max_chars:
+            units.append((paragraph, para_sep))
+            continue
+        sentences = _split_keep_separators(paragraph, SENTENCE_SPLIT_RE)
+        for idx, (sentence, sent_sep) in enumerate(sentences):
+            # The last sentence of a paragraph also carries the paragraph separator
+            sep = sent_sep + para_sep if idx == len(sentences) - 1 else sent_sep
+            if len(sentence) <= max_chars:
+                units.append((sentence, sep))
+            else:
+                units.extend(_split_oversized(sentence, sep, max_chars))
+    return units
+
+def split_text_into_chunks(text: str, max_chars: int = 3000) -> List[Tuple[str, str]]:
+    """
+    Split text into chunks of at most max_chars characters.
+
+    Args:
+        text: The text to split
+        max_chars: Maximum size of each chunk in characters
+
+    Returns:
+        List[Tuple[str, str]]: (chunk, separator) pairs. Joining every chunk followed by
+        its separator reproduces the original layout.
+    """
+    if max_chars <= 0:
+        raise ValueError("max_chars must be positive")
+
+    chunks: List[Tuple[str, str]] = []
+    current = ""
+    current_sep = ""
+    started = False
+    for unit, sep in _split_units(text, max_chars):
+        if current and len(current) + len(current_sep) + len(unit) > max_chars:
+            chunks.append((current, current_sep))
+            current, current_sep, started = "", "", False
+        # A leading empty unit carries the text's leading separator into the first chunk
+        current = f"{current}{current_sep}{unit}" if started else unit
+        current_sep = sep
+        started = True
+    if started:
+        chunks.append((current, current_sep))
+    return chunks
+
+def get_overlap_context(text: str, max_chars: int = 300) -> str:
+    """
+    Return the tail of a chunk, trimmed to a sentence or word boundary, for use as
+    context when processing the following chunk.
+    """
+    if max_chars <= 0 or not text:
+        return ""
+    if len(text) <= max_chars:
+        return text.strip()
+    tail = text[-max_chars:]
+    sentence_start = SENTENCE_SPLIT_RE.search(tail)
+    if sentence_start and sentence_start.end() < len(tail):
+        return tail[sentence_start.end():].strip()
+    word_start = tail.find(" ")
+    return tail[word_start + 1:].strip() if word_start != -1 else tail.strip()
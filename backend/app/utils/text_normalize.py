@@ -0,0 +1,18 @@
+"""
+Text normalization shared by the caches, the web search trigger and the retrieval index.
+"""
+
+import unicodedata
+
+_EDGE_PUNCTUATION = " \t\n\"'¿?¡!.,;:«»“”"
+
+def normalize(text: str) -> str:
+    """Lowercase and strip accents."""
+    return ''.join(
+        c for c in unicodedata.normalize('NFD', text.lower())
+        if unicodedata.category(c) != 'Mn'
+    )
+
+def normalize_query(text: str) -> str:
+    """Lowercase, strip accents and surrounding punctuation, and collapse whitespace (cache keys)."""
+    return " ".join(normalize(text).split()).strip(_EDGE_PUNCTUATION)
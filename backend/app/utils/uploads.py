@@ -0,0 +1,108 @@
+"""
+Bounded uploads.
+UploadSizeLimitMiddleware caps the request body of upload routes while it is received,
+before Starlette spools the multipart form. spool_upload then copies each file to a
+temporary file in fixed-size chunks, so a request never holds a whole file in memory.
+"""
+
+import logging
+import os
+import tempfile
+from typing import Dict
+from fastapi import HTTPException, UploadFile
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Room for multipart boundaries and part headers on top of the file bytes
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware rejecting oversized request bodies on upload routes with 413.
+
+    A Content-Length above the limit is rejected before any byte is read; bodies
+    without one (chunked) are counted as they arrive and rejected once they pass it.
+
+    Args:
+        app: The wrapped application
+        limits: Maximum body size in bytes per request path
+    """
+
+    def __init__(self, app: ASGIApp, limits: Dict[str, int]):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        detail = f"Request too large (max {limit} bytes)"
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > limit:
+                    logger.warning(f"Upload to {scope['path']} rejected: Content-Length {int(value)} > {limit}")
+                    await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+                    return
+                break
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    logger.warning(f"Upload to {scope['path']} rejected after {received} bytes (max {limit})")
+                    # Raised inside the form parsing, so FastAPI answers with this status
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+async def spool_upload(upload: UploadFile, max_bytes: int = None, chunk_size: int = None) -> str:
+    """
+    Copy an upload to a temporary file, enforcing a per-file size cap.
+
+    Starlette has already received the form when this runs, so max_bytes checks each
+    file after the fact; UploadSizeLimitMiddleware is what bounds the request body.
+
+    Args:
+        upload: The incoming file
+        max_bytes: Maximum accepted file size (defaults to IMAGE_MAX_UPLOAD_BYTES)
+        chunk_size: Read size (defaults to UPLOAD_CHUNK_BYTES)
+
+    Returns:
+        str: Path of the temporary file; the caller must remove it (see discard_upload)
+
+    Raises:
+        HTTPException: 413 if the upload exceeds max_bytes
+    """
+    max_bytes = max_bytes or settings.IMAGE_MAX_UPLOAD_BYTES
+    chunk_size = chunk_size or settings.UPLOAD_CHUNK_BYTES
+    suffix = os.path.splitext(upload.filename or "")[1][:10]
+    fd, path = tempfile.mkstemp(prefix="upload_", suffix=suffix)
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            while chunk := await upload.read(chunk_size):
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(status_code=413, detail=f"File too large (max {max_bytes} bytes)")
+                f.write(chunk)
+    except BaseException:
+        discard_upload(path)
+        raise
+    logger.info(f"Upload {upload.filename!r} spooled ({size} bytes)")
+    return path
+
+def discard_upload(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
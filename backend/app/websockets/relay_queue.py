@@ -0,0 +1,108 @@
+"""
+Bounded relay queues for the voice proxy.
+Each direction of a voice session has a reader that keeps its socket drained and a
+writer that sends to the other side; the queue between them is bounded in items and
+bytes, so a slow peer costs dropped or merged audio instead of unbounded memory and delay.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Union
+
+Payload = Union[str, bytes]
+
+class RelayQueue:
+    """
+    Bounded FIFO of outgoing frames.
+
+    Control frames (audio=False) are always queued and never dropped. When the queue
+    reaches its high-water mark (max_items or max_bytes), the oldest queued audio
+    frames are dropped first. With coalesce=True, a raw-bytes audio frame is appended
+    to a raw-bytes audio frame still waiting at the tail (up to coalesce_max_bytes),
+    which merges backlogged PCM into fewer, larger messages.
+
+    Args:
+        name: Label used in stats
+        max_items: High-water mark in frames
+        max_bytes: High-water mark in payload bytes
+        coalesce: Merge consecutive raw-bytes audio frames while they wait
+        coalesce_max_bytes: Largest merged frame
+    """
+
+    def __init__(self, name: str, max_items: int, max_bytes: int, coalesce: bool = False, coalesce_max_bytes: int = 32000):
+        self.name = name
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.coalesce = coalesce
+        self.coalesce_max_bytes = coalesce_max_bytes
+        # Entries: [enqueued_at, payload, audio]
+        self._items: Deque[list] = deque()
+        self._bytes = 0
+        self._ready = asyncio.Event()
+        self.enqueued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.max_depth = 0
+        self.latency_ms_avg = 0.0
+        self.latency_ms_max = 0.0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def put(self, payload: Payload, audio: bool = False) -> None:
+        """Queue a frame without blocking, applying the drop/coalesce policy."""
+        self.enqueued += 1
+        size = len(payload)
+        tail = self._items[-1] if self._items else None
+        if (self.coalesce and audio and isinstance(payload, bytes) and tail is not None and tail[2]
+                and isinstance(tail[1], bytes) and len(tail[1]) + size <= self.coalesce_max_bytes):
+            # Keeps the tail's timestamp, so latency reflects the oldest merged audio
+            tail[1] += payload
+            self._bytes += size
+            self.coalesced += 1
+            return
+
+        self._items.append([time.monotonic(), payload, audio])
+        self._bytes += size
+        self._shed()
+        self.max_depth = max(self.max_depth, len(self._items))
+        self._ready.set()
+
+    def _shed(self) -> None:
+        # Drop the oldest (stalest) audio until both high-water marks are respected
+        while len(self._items) > self.max_items or self._bytes > self.max_bytes:
+            stale = next((item for item in self._items if item[2]), None)
+            if stale is None:
+                return
+            self._items.remove(stale)
+            self._bytes -= len(stale[1])
+            self.dropped += 1
+
+    async def get(self) -> Payload:
+        """Wait for the next frame."""
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        enqueued_at, payload, _ = self._items.popleft()
+        self._bytes -= len(payload)
+        self.sent += 1
+        latency_ms = (time.monotonic() - enqueued_at) * 1000
+        self.latency_ms_max = max(self.latency_ms_max, latency_ms)
+        # Exponential moving average over roughly the last 20 frames
+        self.latency_ms_avg += (latency_ms - self.latency_ms_avg) / min(self.sent, 20)
+        return payload
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": len(self._items),
+            "bytes": self._bytes,
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "latency_ms_avg": round(self.latency_ms_avg, 2),
+            "latency_ms_max": round(self.latency_ms_max, 2)
+        }
@@ -0,0 +1,200 @@
+"""
+Voice session admission control.
+Limits how many voice sessions (each with an ElevenLabs socket and an ffmpeg process)
+run at once in this worker, queues a few more with position updates, and rejects
+the rest gracefully instead of exhausting file descriptors and CPU.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+from fastapi import WebSocket
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PositionCallback = Callable[[int], Awaitable[None]]
+
+# WebSocket close code "Try Again Later"
+CLOSE_TRY_AGAIN_LATER = 1013
+
+class VoiceSessionManager:
+    """
+    Admission control for voice sessions in one worker process.
+
+    Up to max_sessions sessions are active at once. Further connections wait in a FIFO
+    of at most max_queue entries for up to queue_timeout seconds, receiving
+    {"type": "queued", "position": n} messages as they move up; a freed slot is handed
+    directly to the first waiter. Connections beyond the queue are rejected.
+
+    Args:
+        max_sessions: Maximum concurrent sessions
+        max_queue: Maximum waiting connections
+        queue_timeout: Maximum wait in seconds for a slot
+    """
+
+    def __init__(self, max_sessions: Optional[int] = None, max_queue: Optional[int] = None, queue_timeout: Optional[float] = None):
+        self.max_sessions = max_sessions or settings.VOICE_MAX_SESSIONS
+        self.max_queue = settings.VOICE_MAX_QUEUED if max_queue is None else max_queue
+        self.queue_timeout = queue_timeout or settings.VOICE_QUEUE_TIMEOUT_SECONDS
+        self.active = 0
+        self.waiters: Deque[Tuple[asyncio.Future, PositionCallback]] = deque()
+        self.admitted_total = 0
+        self.queued_total = 0
+        self.rejected_total = 0
+        self.queue_timeouts_total = 0
+        self.idle_closed_total = 0
+        self.peak_active = 0
+
+    def _admit(self) -> None:
+        self.admitted_total += 1
+        self.peak_active = max(self.peak_active, self.active)
+
+    def try_acquire(self) -> bool:
+        """Take a free slot without waiting, if there is one and nobody is queued."""
+        if self.active < self.max_sessions and not self.waiters:
+            self.active += 1
+            self._admit()
+            return True
+        return False
+
+    async def acquire(self, on_position: PositionCallback) -> bool:
+        """
+        Wait for a session slot.
+
+        Returns:
+            bool: True if a slot was acquired (call release() when the session ends),
+            False if the connection was rejected, timed out in the queue or could not
+            be sent its position
+        """
+        if self.try_acquire():
+            return True
+        if len(self.waiters) >= self.max_queue:
+            self.rejected_total += 1
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        entry = (future, on_position)
+        self.waiters.append(entry)
+        self.queued_total += 1
+        try:
+            await on_position(len(self.waiters))
+            await asyncio.wait_for(future, self.queue_timeout)
+            self._admit()
+            return True
+        except asyncio.TimeoutError:
+            self.queue_timeouts_total += 1
+            self.rejected_total += 1
+            self._return_handed_slot(future)
+            return False
+        except asyncio.CancelledError:
+            self._return_handed_slot(future)
+            raise
+        except Exception as e:
+            # The client went away before its position update could be sent
+            logger.info(f"Queued voice client unreachable: {e}")
+            self._return_handed_slot(future)
+            return False
+        finally:
+            if entry in self.waiters:
+                self.waiters.remove(entry)
+                self._notify_positions()
+
+    def _return_handed_slot(self, future: asyncio.Future) -> None:
+        # A slot handed over just as the wait ended must be passed on, not leaked
+        if future.done() and not future.cancelled():
+            self.release()
+
+    def release(self) -> None:
+        """Free a slot, handing it to the first waiter if any."""
+        while self.waiters:
+            future, _ = self.waiters.popleft()
+            if not future.done():
+                # The slot moves to the waiter: active stays the same
+                future.set_result(True)
+                self._notify_positions()
+                return
+        self.active = max(0, self.active - 1)
+
+    def _notify_positions(self) -> None:
+        for position, (future, on_position) in enumerate(list(self.waiters), 1):
+            if not future.done():
+                asyncio.create_task(self._safe_notify(on_position, position))
+
+    @staticmethod
+    async def _safe_notify(on_position: PositionCallback, position: int) -> None:
+        try:
+            await on_position(position)
+        except Exception:
+            pass
+
+    async def admit(self, websocket: WebSocket) -> bool:
+        """
+        Admit an accepted WebSocket, queueing it if needed.
+
+        While queued the client gets position updates; if it disconnects it leaves the
+        queue. Rejected connections get an error message and are closed with 1013.
+
+        Returns:
+            bool: True if the session may start (call release() when it ends)
+        """
+        async def send_position(position: int):
+            await websocket.send_json({"type": "queued", "position": position})
+
+        if self.try_acquire():
+            return True
+
+        acquire = asyncio.create_task(self.acquire(send_position))
+        # Watch for the client leaving while it waits (anything it sends now is discarded)
+        disconnect = asyncio.create_task(self._wait_disconnect(websocket))
+        done, _ = await asyncio.wait([acquire, disconnect], return_when=asyncio.FIRST_COMPLETED)
+        if acquire not in done:
+            acquire.cancel()
+            try:
+                await acquire
+            except asyncio.CancelledError:
+                pass
+            logger.info("Queued voice client disconnected")
+            return False
+        disconnect.cancel()
+        if acquire.result():
+            return True
+
+        logger.warning(f"Voice session rejected: {self.stats()}")
+        try:
+            await websocket.send_json({
+                "type": "error",
+                "code": "capacity",
+                "message": "The voice assistant is at capacity, please try again in a moment"
+            })
+            await websocket.close(code=CLOSE_TRY_AGAIN_LATER)
+        except Exception:
+            pass
+        return False
+
+    @staticmethod
+    async def _wait_disconnect(websocket: WebSocket) -> None:
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        except Exception:
+            # A failing receive means the client is gone as well
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "queued": len(self.waiters),
+            "max_sessions": self.max_sessions,
+            "max_queue": self.max_queue,
+            "peak_active": self.peak_active,
+            "admitted_total": self.admitted_total,
+            "queued_total": self.queued_total,
+            "rejected_total": self.rejected_total,
+            "queue_timeouts_total": self.queue_timeouts_total,
+            "idle_closed_total": self.idle_closed_total
+        }
+
+# Global instance (one per worker process)
+session_manager = VoiceSessionManager()
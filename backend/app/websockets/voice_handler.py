@@ -8,19 +8,43 @@ import json
 import logging
 import os
 import base64
+import re
+import time
+import uuid
 import websockets
 from typing import Optional, Dict, Any
-import aiohttp
 from fastapi import WebSocket, WebSocketDisconnect
 from fastapi.websockets import WebSocketState
-import tempfile
-import subprocess
 from app.core.config import settings
+from app.utils.audio_transcoder import StreamingTranscoder
+from app.utils.http_client import get_http_session
+from app.services.signed_url_pool import SignedUrlPool
+from app.services.llm_gateway import llm_gateway, Priority
+from app.websockets.relay_queue import RelayQueue
+from app.websockets.session_manager import session_manager
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Top-level "type" as the first or the last key of a JSON object
+_LEADING_TYPE_RE = re.compile(r'^\s*\{\s*"type"\s*:\s*"([^"\\]*)"')
+_TRAILING_TYPE_RE = re.compile(r'"type"\s*:\s*"([^"\\]*)"\s*\}\s*$')
+
+def peek_message_type(data: str) -> Optional[str]:
+    """
+    Read the top-level "type" of a JSON message without parsing the payload.
+    Falls back to a full parse when "type" is neither the first nor the last key.
+    """
+    match = _LEADING_TYPE_RE.match(data[:128]) or _TRAILING_TYPE_RE.search(data[-128:])
+    if match:
+        return match.group(1)
+    try:
+        message = json.loads(data)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    return message.get("type") if isinstance(message, dict) else None
+
 class VoiceAssistantManager:
     """Manages voice assistant connections and ElevenLabs integration"""
     
@@ -29,6 +53,10 @@ class VoiceAssistantManager:
         self.elevenlabs_agent_id = settings.ELEVENLABS_AGENT_ID
         self.elevenlabs_base_url = settings.ELEVENLABS_BASE_URL
         self.model_id = settings.ELEVENLABS_MODEL_ID  # Low-latency model
+        # Prefetched signed URLs: a new session dials ElevenLabs without waiting for the API
+        self.signed_urls = SignedUrlPool(lambda: self._fetch_signed_url())
+        # Live sessions and their relay queues (see session_stats)
+        self.sessions: Dict[str, Dict[str, Any]] = {}
         
         # System prompt for the voice assistant
         self.system_prompt = """You are Alex, the voice assistant for TruthLens. 
@@ -39,9 +67,22 @@ class VoiceAssistantManager:
         You help users understand news analysis, bias detection, and fact-checking."""
     
     async def handle_websocket_connection(self, websocket: WebSocket):
-        """Handle a new WebSocket connection for voice chat"""
+        """
+        Handle a new WebSocket connection for voice chat.
+
+        With ?protocol=binary the client sends its audio as raw binary frames (format
+        given by ?audio_format=webm|pcm_16000, or later by an "audio_config" message)
+        and ElevenLabs messages are passed through unchanged; otherwise audio travels
+        as base64 in JSON messages.
+        """
         await websocket.accept()
-        logger.info("Voice WebSocket connection established")
+        passthrough = websocket.query_params.get("protocol") == "binary"
+        audio_format = websocket.query_params.get("audio_format", "webm")
+        logger.info(f"Voice WebSocket connection established (protocol: {'binary' if passthrough else 'json'})")
+
+        # Admission control: wait in the queue or get rejected when the worker is at capacity
+        if not await session_manager.admit(websocket):
+            return
         
         try:
             # 1. Get signed_url from ElevenLabs
@@ -61,109 +102,200 @@ class VoiceAssistantManager:
                     "type": "status",
                     "message": "Voice assistant connected and ready"
                 }))
-                # 3. Launch tasks to forward messages in both directions
-                user_to_eleven = asyncio.create_task(self._forward_user_to_eleven(websocket, eleven_ws))
-                eleven_to_user = asyncio.create_task(self._forward_eleven_to_user(websocket, eleven_ws))
-                done, pending = await asyncio.wait(
-                    [user_to_eleven, eleven_to_user],
-                    return_when=asyncio.FIRST_COMPLETED
+                # Bounded queues between the readers and the writers of each direction
+                upstream = RelayQueue(
+                    "upstream", settings.VOICE_UPSTREAM_MAX_ITEMS, settings.VOICE_UPSTREAM_MAX_BYTES,
+                    coalesce=True, coalesce_max_bytes=settings.VOICE_COALESCE_MAX_BYTES
                 )
-                for task in pending:
-                    task.cancel()
+                downstream = RelayQueue("downstream", settings.VOICE_DOWNSTREAM_MAX_ITEMS, settings.VOICE_DOWNSTREAM_MAX_BYTES)
+
+                # One ffmpeg process per session turns the webm stream into PCM for ElevenLabs
+                async def queue_pcm(pcm_bytes: bytes):
+                    upstream.put(pcm_bytes, audio=True)
+                transcoder = StreamingTranscoder(queue_pcm)
+
+                session_id = uuid.uuid4().hex[:12]
+                self.sessions[session_id] = {
+                    "started_at": time.time(),
+                    "protocol": "binary" if passthrough else "json",
+                    "upstream": upstream,
+                    "downstream": downstream,
+                    "transcoder": transcoder,
+                    "last_activity": time.monotonic()
+                }
+
+                # 3. Launch tasks to forward messages in both directions
+                tasks = [
+                    asyncio.create_task(self._forward_user_to_eleven(websocket, upstream, transcoder, audio_format, self.sessions[session_id])),
+                    asyncio.create_task(self._send_to_eleven(eleven_ws, upstream)),
+                    asyncio.create_task(self._forward_eleven_to_user(eleven_ws, downstream, passthrough)),
+                    asyncio.create_task(self._send_to_user(websocket, downstream)),
+                    asyncio.create_task(self._idle_watchdog(websocket, self.sessions[session_id]))
+                ]
+                try:
+                    done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                    for task in pending:
+                        task.cancel()
+                finally:
+                    await transcoder.close()
+                    stats = self._session_stats(self.sessions.pop(session_id))
+                    logger.info(f"Voice session {session_id} ended: {stats}")
         except WebSocketDisconnect:
             logger.info("Voice WebSocket client disconnected")
         except Exception as e:
             logger.error(f"WebSocket error: {e}")
         finally:
+            session_manager.release()
             if websocket.client_state != WebSocketState.DISCONNECTED:
                 await websocket.close()
     
     async def _get_signed_url(self):
+        return await self.signed_urls.acquire()
+
+    async def _fetch_signed_url(self):
         url = f"{self.elevenlabs_base_url}/convai/conversation/get-signed-url?agent_id={self.elevenlabs_agent_id}"
         headers = {"xi-api-key": self.elevenlabs_api_key}
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        return data.get("signed_url")
-                    else:
-                        logger.error(f"Failed to get signed_url: {resp.status} {await resp.text()}")
-                        return None
+            session = await get_http_session()
+            async with session.get(url, headers=headers) as resp:
+                if resp.status == 200:
+                    data = await resp.json()
+                    return data.get("signed_url")
+                else:
+                    logger.error(f"Failed to get signed_url: {resp.status} {await resp.text()}")
+                    return None
         except Exception as e:
             logger.error(f"Exception getting signed_url: {e}")
             return None
 
-    async def _forward_user_to_eleven(self, websocket: WebSocket, eleven_ws):
+    @staticmethod
+    def _session_stats(session: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "protocol": session["protocol"],
+            "duration_s": round(time.time() - session["started_at"], 1),
+            "upstream": session["upstream"].stats(),
+            "downstream": session["downstream"].stats(),
+            "transcoder": {"bytes_in": session["transcoder"].bytes_in, "bytes_out": session["transcoder"].bytes_out}
+        }
+
+    def session_stats(self) -> Dict[str, Any]:
+        """Buffer depth, drops and queueing latency of every live voice session."""
+        return {session_id: self._session_stats(session) for session_id, session in list(self.sessions.items())}
+
+    async def _forward_user_audio(self, upstream: RelayQueue, transcoder: StreamingTranscoder, audio: bytes, audio_format: str):
+        """Queue one chunk of raw client audio for ElevenLabs."""
+        # Webm is streamed through the session transcoder; the PCM it produces is queued
+        # as soon as ffmpeg emits it
+        if audio_format == "webm":
+            if not await transcoder.write(audio):
+                logger.error("Error converting webm to PCM")
+        elif audio_format == "pcm_16000":
+            upstream.put(audio, audio=True)
+        else:
+            logger.error(f"[PROXY] Unsupported audio format: {audio_format}")
+
+    async def _idle_watchdog(self, websocket: WebSocket, session: Dict[str, Any]):
+        """Ends the session when the client has sent nothing for VOICE_IDLE_TIMEOUT_SECONDS."""
+        timeout = settings.VOICE_IDLE_TIMEOUT_SECONDS
+        while True:
+            idle = time.monotonic() - session["last_activity"]
+            if idle >= timeout:
+                break
+            await asyncio.sleep(timeout - idle)
+        session_manager.idle_closed_total += 1
+        logger.info(f"Closing voice session after {timeout:g}s without client activity")
+        try:
+            await websocket.send_text(json.dumps({
+                "type": "status",
+                "message": "Session closed due to inactivity"
+            }))
+        except Exception:
+            pass
+
+    async def _send_to_eleven(self, eleven_ws, upstream: RelayQueue):
+        """Writer: sends queued frames to ElevenLabs (raw PCM is wrapped as a user_audio_chunk)."""
+        while True:
+            try:
+                payload = await upstream.get()
+                if isinstance(payload, bytes):
+                    payload = json.dumps({
+                        "type": "user_audio_chunk",
+                        "audio": base64.b64encode(payload).decode('utf-8'),
+                        "audio_format": "pcm_16000"
+                    })
+                await eleven_ws.send(payload)
+            except Exception as e:
+                logger.error(f"Error sending to ElevenLabs: {e}")
+                break
+
+    async def _send_to_user(self, websocket: WebSocket, downstream: RelayQueue):
+        """Writer: sends queued frames to the client."""
+        while True:
+            try:
+                payload = await downstream.get()
+                if isinstance(payload, bytes):
+                    await websocket.send_bytes(payload)
+                else:
+                    await websocket.send_text(payload)
+            except Exception as e:
+                logger.error(f"Error sending to user: {e}")
+                break
+
+    async def _forward_user_to_eleven(self, websocket: WebSocket, upstream: RelayQueue, transcoder: StreamingTranscoder, audio_format: str = "webm", session: Optional[Dict[str, Any]] = None):
         while True:
             try:
-                data = await websocket.receive_text()
+                frame = await websocket.receive()
+                if frame["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(frame.get("code", 1000))
+                if session is not None:
+                    session["last_activity"] = time.monotonic()
+
+                # Binary frame: raw audio in the session's audio format, no base64/JSON
+                if frame.get("bytes") is not None:
+                    await self._forward_user_audio(upstream, transcoder, frame["bytes"], audio_format)
+                    continue
+
+                data = frame.get("text") or ""
                 logger.info(f"[PROXY] Message received from user: {data[:100]}...")
                 message = json.loads(data)
 
-                if message.get("type") == "user_audio_chunk":
+                if message.get("type") == "audio_config":
+                    audio_format = message.get("audio_format", audio_format)
+                    logger.info(f"[PROXY] Binary audio format set to {audio_format}")
+                elif message.get("type") == "user_audio_chunk":
                     if not all(k in message for k in ["audio", "audio_format"]):
                         logger.error("Incomplete audio message")
                         continue
 
-                    # If audio comes in webm format, convert to PCM 16kHz 16-bit
-                    if message["audio_format"] == "webm":
-                        logger.info("Converting webm audio to PCM 16kHz 16-bit...")
-                        pcm_b64 = self._convert_webm_base64_to_pcm_base64(message["audio"])
-                        if not pcm_b64:
-                            logger.error("Error converting webm to PCM")
-                            continue
-                        await eleven_ws.send(json.dumps({
-                            "type": "user_audio_chunk",
-                            "audio": pcm_b64,
-                            "audio_format": "pcm_16000"
-                        }))
-                        logger.info("[PROXY] PCM audio chunk sent to ElevenLabs")
-                    elif message["audio_format"] == "pcm_16000":
-                        await eleven_ws.send(json.dumps({
-                            "type": "user_audio_chunk",
-                            "audio": message["audio"],
-                            "audio_format": "pcm_16000"
-                        }))
-                        logger.info("[PROXY] PCM audio chunk sent to ElevenLabs (already in correct format)")
-                    else:
-                        logger.error(f"[PROXY] Unsupported audio format: {message['audio_format']}")
-                        continue
+                    await self._forward_user_audio(upstream, transcoder, base64.b64decode(message["audio"]), message["audio_format"])
                 else:
-                    await eleven_ws.send(data)
-                    logger.info(f"[PROXY] Other type of message sent to ElevenLabs: {message.get('type')}")
+                    upstream.put(data)
+                    logger.info(f"[PROXY] Other type of message queued for ElevenLabs: {message.get('type')}")
+            except WebSocketDisconnect:
+                logger.info("Voice WebSocket client disconnected")
+                break
             except Exception as e:
                 logger.error(f"Error forwarding user->eleven: {e}")
                 break
 
-    def _convert_webm_base64_to_pcm_base64(self, webm_b64: str) -> str:
-        try:
-            webm_bytes = base64.b64decode(webm_b64)
-            with tempfile.NamedTemporaryFile(suffix='.webm', delete=False) as webm_file:
-                webm_file.write(webm_bytes)
-                webm_path = webm_file.name
-            pcm_path = webm_path.replace('.webm', '.pcm')
-            # ffmpeg: convert to PCM 16kHz 16-bit mono
-            cmd = [
-                'ffmpeg', '-y', '-i', webm_path,
-                '-ac', '1', '-ar', '16000', '-f', 's16le', pcm_path
-            ]
-            subprocess.run(cmd, check=True)
-            with open(pcm_path, 'rb') as pcm_file:
-                pcm_bytes = pcm_file.read()
-            # Clean temporary files
-            os.remove(webm_path)
-            os.remove(pcm_path)
-            return base64.b64encode(pcm_bytes).decode('utf-8')
-        except Exception as e:
-            logger.error(f"Error in ffmpeg conversion: {e}")
-            return None
-
-    async def _forward_eleven_to_user(self, websocket: WebSocket, eleven_ws):
+    async def _forward_eleven_to_user(self, eleven_ws, downstream: RelayQueue, passthrough: bool = False):
         while True:
             try:
                 data = await eleven_ws.recv()
                 logger.info(f"[PROXY] Message received from ElevenLabs: {data[:100]}...")  # Only log first 100 characters
+
+                if passthrough:
+                    # Forward the original frame; only its type is read, the payload is never re-serialized
+                    if isinstance(data, bytes):
+                        downstream.put(data, audio=True)
+                        continue
+                    message_type = peek_message_type(data)
+                    if message_type == "ping":
+                        continue
+                    if message_type == "error":
+                        logger.error(f"[PROXY] ElevenLabs error: {data[:500]}")
+                    downstream.put(data, audio=message_type == "audio")
+                    continue
                 
                 # Parse the JSON message
                 message = json.loads(data)
@@ -187,21 +319,21 @@ class VoiceAssistantManager:
                         "audio_format": message.get("audio_format", "mp3_44100_128")
                     }
                     logger.info(f"[PROXY] Sending audio response to user (size: {len(audio_data)})")
-                    await websocket.send_text(json.dumps(response))
+                    downstream.put(json.dumps(response), audio=True)
                 elif message_type == "error":
                     error_msg = message.get("message", "Error from ElevenLabs")
                     logger.error(f"[PROXY] ElevenLabs error: {error_msg}")
-                    await websocket.send_text(json.dumps({
+                    downstream.put(json.dumps({
                         "type": "error",
                         "message": error_msg
                     }))
                 elif message_type == "conversation_initiation_metadata":
                     logger.info("[PROXY] Initialization metadata received")
-                    await websocket.send_text(data)
+                    downstream.put(data)
                 else:
                     # Log and re-send other types of messages
                     logger.info(f"[PROXY] Unhandled message type: {message_type}")
-                    await websocket.send_text(data)
+                    downstream.put(data)
                 
             except json.JSONDecodeError as e:
                 logger.error(f"Error decoding JSON from ElevenLabs: {e}")
@@ -286,21 +418,21 @@ class VoiceAssistantManager:
                 }
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, headers=headers, json=payload) as response:
-                    if response.status == 200:
-                        response_data = await response.json()
-                        
-                        # Extract audio from response
-                        if "audio" in response_data:
-                            return response_data["audio"]
-                        else:
-                            logger.error("No audio in ElevenLabs response")
-                            return None
+            session = await get_http_session()
+            async with session.post(url, headers=headers, json=payload) as response:
+                if response.status == 200:
+                    response_data = await response.json()
+                    
+                    # Extract audio from response
+                    if "audio" in response_data:
+                        return response_data["audio"]
                     else:
-                        error_text = await response.text()
-                        logger.error(f"ElevenLabs API error {response.status}: {error_text}")
+                        logger.error("No audio in ElevenLabs response")
                         return None
+                else:
+                    error_text = await response.text()
+                    logger.error(f"ElevenLabs API error {response.status}: {error_text}")
+                    return None
                         
         except Exception as e:
             logger.error(f"Error calling ElevenLabs API: {e}")
@@ -334,15 +466,20 @@ class VoiceAssistantManager:
                 }
             }
             
-            async with aiohttp.ClientSession() as session:
+            async def synthesize() -> bytes:
+                session = await get_http_session()
                 async with session.post(url, headers=headers, json=payload) as response:
-                    if response.status == 200:
-                        audio_bytes = await response.read()
-                        return base64.b64encode(audio_bytes).decode('utf-8')
-                    else:
+                    if response.status != 200:
                         error_text = await response.text()
                         logger.error(f"ElevenLabs TTS error {response.status}: {error_text}")
-                        return None
+                    # Raised errors let the gateway retry (429/5xx) and track the circuit
+                    response.raise_for_status()
+                    return await response.read()
+
+            audio_bytes = await llm_gateway.call(
+                "elevenlabs", payload["model_id"], "tts", Priority.INTERACTIVE, synthesize
+            )
+            return base64.b64encode(audio_bytes).decode('utf-8')
                         
         except Exception as e:
             logger.error(f"Error in fallback TTS: {e}")
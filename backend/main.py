@@ -1,4 +1,4 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from fastapi.staticfiles import StaticFiles
@@ -7,16 +7,26 @@ from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 from app.core.config import settings
-from app.api.routes import analyze, chat, translator
+from app.api.routes import analyze, chat, translator, profiles
+import hmac
 import logging
 import os
 from fastapi import WebSocket
-from app.websockets.voice_handler import handle_voice_websocket
+from app.websockets.voice_handler import handle_voice_websocket, voice_manager
+from app.websockets.session_manager import session_manager
+from app.services.llm_gateway import llm_gateway
 from dotenv import load_dotenv
 from pathlib import Path
 from app.routes import image_analysis
 from app.services.storage_service import StorageService
 from app.services.cache_manager import CacheManager
+from app.utils.http_client import close_http_session
+from app.services.local_index import index_saved_analyses
+from app.services.image_pipeline import image_pipeline
+from app.utils.metrics import MetricsMiddleware, metrics_response
+from app.utils.request_timing import ServerTimingMiddleware
+from app.utils.profiler import ProfilingMiddleware
+from app.utils.uploads import UploadSizeLimitMiddleware, MULTIPART_OVERHEAD_BYTES
 import asyncio
 from typing import Optional
 
@@ -43,6 +53,14 @@ class VoiceAssistantManager:
 # Global cache manager instance
 cache_manager: Optional[CacheManager] = None
 
+def require_bearer_token(token: str, authorization: str) -> None:
+    """Operator routes answer 404 while their token is unset and 403 without the right token."""
+    if not token:
+        raise HTTPException(status_code=404, detail="Not found")
+    scheme, _, value = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(value.strip().encode(), token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid token")
+
 def create_app() -> FastAPI:
     """
     Create and configure the FastAPI application with all necessary middleware and routes.
@@ -62,6 +80,19 @@ def create_app() -> FastAPI:
         redoc_url=redoc_url
     )
 
+    # Request profiling, innermost so it runs in the task that runs the endpoint
+    if settings.PROFILING_ADMIN_TOKEN:
+        app.add_middleware(ProfilingMiddleware)
+
+    # Reject oversized image uploads while they are received, not after they are spooled
+    app.add_middleware(
+        UploadSizeLimitMiddleware,
+        limits={
+            "/api/analyze_image": settings.IMAGE_MAX_UPLOAD_BYTES + MULTIPART_OVERHEAD_BYTES,
+            "/api/analyze_images": settings.IMAGE_MAX_UPLOAD_BYTES * settings.IMAGE_MAX_BATCH + MULTIPART_OVERHEAD_BYTES
+        }
+    )
+
     # Configure rate limiting middleware to protect API endpoints
     app.state.limiter = limiter
     app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
@@ -76,6 +107,14 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
 
+    # Stage durations of every request in the Server-Timing header
+    if settings.SERVER_TIMING_ENABLED:
+        app.add_middleware(ServerTimingMiddleware)
+
+    # Outermost, so request latency includes every other middleware
+    if settings.METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+
     # Mount static files directory for audio files using StorageService
     storage_service = StorageService()
     static_dir = storage_service.storage_dir
@@ -95,6 +134,18 @@ def create_app() -> FastAPI:
             logger.info("Cache cleanup scheduler started")
         except Exception as e:
             logger.error(f"Error starting cache cleanup scheduler: {e}")
+        try:
+            # Seed the local retrieval index with saved analyses (off the event loop)
+            if settings.LOCAL_INDEX_ENABLED:
+                await asyncio.to_thread(index_saved_analyses, storage_service.storage_dir)
+        except Exception as e:
+            logger.error(f"Error seeding local index: {e}")
+        try:
+            # Keep ElevenLabs signed URLs ready for new voice sessions
+            if settings.ELEVENLABS_AGENT_ID:
+                voice_manager.signed_urls.start()
+        except Exception as e:
+            logger.error(f"Error starting signed URL prefetch: {e}")
 
     @app.on_event("shutdown")
     async def shutdown_event():
@@ -105,6 +156,20 @@ def create_app() -> FastAPI:
                 logger.info("Cache cleanup scheduler stopped")
         except Exception as e:
             logger.error(f"Error stopping cache cleanup scheduler: {e}")
+        try:
+            # Stop the image analysis worker processes
+            image_pipeline.shutdown()
+        except Exception as e:
+            logger.error(f"Error stopping image process pool: {e}")
+        try:
+            await voice_manager.signed_urls.stop()
+        except Exception as e:
+            logger.error(f"Error stopping signed URL prefetch: {e}")
+        try:
+            # Close pooled keep-alive HTTP connections
+            await close_http_session()
+        except Exception as e:
+            logger.error(f"Error closing shared HTTP session: {e}")
 
     @app.get("/")
     async def root():
@@ -153,6 +218,7 @@ def create_app() -> FastAPI:
     app.include_router(chat.router, prefix=settings.API_V1_STR, tags=["chat"])
     app.include_router(translator.router, prefix=settings.API_V1_STR, tags=["translator"])
     app.include_router(image_analysis.router, prefix="/api", tags=["image-analysis"])
+    app.include_router(profiles.router, prefix=settings.API_V1_STR)
 
     # Voice WebSocket endpoint
     @app.websocket("/ws/voice")
@@ -160,6 +226,28 @@ def create_app() -> FastAPI:
         """WebSocket endpoint for voice assistant"""
         await handle_voice_websocket(websocket)
 
+    @app.get("/api/voice/sessions", include_in_schema=False)
+    async def voice_sessions(authorization: str = Header("")):
+        """Admission metrics plus relay buffer depth, dropped audio and queueing latency of live voice sessions."""
+        require_bearer_token(settings.VOICE_STATS_TOKEN, authorization)
+        return {
+            "capacity": session_manager.stats(),
+            "sessions": voice_manager.session_stats()
+        }
+
+    @app.get("/api/llm/stats", include_in_schema=False)
+    async def llm_stats(authorization: str = Header("")):
+        """LLM gateway in-flight calls, queued calls by priority, rate-limit buckets and circuit breakers."""
+        require_bearer_token(settings.LLM_STATS_TOKEN, authorization)
+        return llm_gateway.stats()
+
+    if settings.METRICS_ENABLED:
+        @app.get("/metrics", include_in_schema=False)
+        async def metrics(authorization: str = Header("")):
+            """Prometheus metrics: route latency, stage latency, in-flight requests and upstream errors."""
+            require_bearer_token(settings.METRICS_TOKEN, authorization)
+            return metrics_response()
+
     return app
 
 app = create_app()